@@ -2,22 +2,30 @@ import os
 import logging
 import json
 import time
-import asyncio
 import threading
+import queue
 from flask import Flask, request, jsonify, send_from_directory, Response
 from flask_cors import CORS
-from backup.descuentos.backend.scrapping.ripley import buscar_en_ripley
-from backup.descuentos.backend.scrapping.falabella import buscar_en_falabella
-from backup.descuentos.backend.scrapping.oechsle import buscar_en_oechsle
-from backup.descuentos.backend.scrapping.estilos import buscar_en_estilos   
-from backup.descuentos.backend.scrapping.tailoy import buscar_en_tailoy
-from backup.descuentos.backend.scrapping.realplaza import buscar_en_realplaza
-from backup.descuentos.backend.scrapping.plazavea import buscar_en_plazavea
-from backup.descuentos.backend.scrapping.hiraoka import buscar_en_hiraoka
-from backup.descuentos.backend.scrapping.metro import buscar_en_metro
+from werkzeug.middleware.proxy_fix import ProxyFix
+from backup.descuentos.backend.motores import TIENDAS, TIENDAS_ACTIVAS, enviar_tienda, usa_navegador, puede_usar_navegador
+from backup.descuentos.backend.cache import obtener_cache, normalizar_consulta, MISS, STALE
+from backup.descuentos.backend.singleflight import obtener_singleflight
+from backup.descuentos.backend.agrupacion import agrupar_ofertas
+from backup.descuentos.backend.historial import obtener_historial
+from backup.descuentos.backend.cola_trabajos import obtener_despachador, COLA_TRABAJOS
+from backup.descuentos.backend.precrawl import obtener_planificador, PRECRAWL_ACTIVO
+from backup.descuentos.backend.admision import obtener_admision
+from backup.descuentos.backend.perfilado import obtener_almacen_perfiles, perfilar, token_valido, PERFILADO_ACTIVO
+from backup.descuentos.backend.resultados import obtener_almacen_resultados, RECOMENDADOS, POR_PAGINA, POR_PAGINA_MAX
 from backup.descuentos.backend.notifications import enviar_notificacion_async, validar_numero_telefono
-from backup.descuentos.backend.scrapping.ripley_playwright import buscar_en_ripley_async_wrapper
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from backup.descuentos.backend.scrapping.playwright_runtime import obtener_runtime
+from backup.descuentos.backend.scrapping.driver_pool import obtener_pool
+from backup.descuentos.backend.scrapping.gobernador import obtener_gobernador
+from backup.descuentos.backend.scrapping.esperas import obtener_registro_esperas
+from backup.descuentos.backend.scrapping.control_host import estadisticas_hosts
+from backup.descuentos.backend.scrapping.control_busqueda import ControlBusqueda, LIMITE, DEADLINE, RECURSOS
+from backup.descuentos.backend.scrapping.metricas import obtener_metricas
+from concurrent.futures import ThreadPoolExecutor
 
 # Configurar logging
 logging.getLogger().setLevel(logging.ERROR)
@@ -31,6 +39,13 @@ app = Flask(__name__,
             static_url_path='')
 CORS(app)
 
+# Proxies de confianza delante de la app (ej: 1 con nginx): solo entonces se
+# usa X-Forwarded-For para identificar al cliente; sin proxy, un cliente
+# podría cambiar la cabecera en cada petición para saltarse su cola
+PROXIES_CONFIABLES = int(os.environ.get('PROXIES_CONFIABLES', 0))
+if PROXIES_CONFIABLES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXIES_CONFIABLES)
+
 # Asegurarse de que las rutas sean absolutas
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATIC_FOLDER = os.path.join(BASE_DIR, 'backup/descuentos/frontend')
@@ -38,7 +53,30 @@ STATIC_FOLDER = os.path.join(BASE_DIR, 'backup/descuentos/frontend')
 # Configuración de recursos y timeouts
 MAX_WORKERS = 2  # Reducir workers
 TIMEOUT = 600  # Aumentar timeout a 10 minutos
-MAX_TIENDAS = 3  # Limitar número de tiendas simultáneas
+MAX_TIENDAS = int(os.environ.get('MAX_TIENDAS', 3))  # Búsquedas con navegador simultáneas entre todas las peticiones
+MAX_PAGINAS = 10  # Páginas que recorre cada scraper (parte de la clave del cache)
+GRACIA_DEADLINE = 2  # Segundos extra para que un scraper que llegó al deadline entregue lo obtenido
+INTERVALO_COLA = 1.0  # Cada cuánto se informa la posición de las tiendas que esperan un cupo
+FONDO = 'fondo'  # Cliente de las búsquedas de segundo plano (refresco del cache y pre-crawl)
+
+SCRAPING_WORKERS = int(os.environ.get('SCRAPING_WORKERS', 8))  # Hilos para API HTTP y Selenium
+
+# Executor compartido por todas las peticiones: las búsquedas pueden sobrevivir a la
+# petición que las lanzó (otras peticiones se unen a ellas o las usa el cache)
+_executor_scraping = ThreadPoolExecutor(max_workers=SCRAPING_WORKERS)
+
+# Con COLA_TRABAJOS las búsquedas las corren workers (en hilos con 'local', o en
+# otros procesos/máquinas con socket:// o redis://) y /buscar solo orquesta
+_despachador = obtener_despachador()
+
+# Lanzar los navegadores del pool en segundo plano para que la primera búsqueda no pague el arranque
+if _despachador is None or COLA_TRABAJOS == 'local':
+    threading.Thread(target=obtener_pool().precalentar, daemon=True).start()
+    threading.Thread(target=obtener_runtime().precalentar, daemon=True).start()
+
+# Cupos de navegador repartidos entre todas las peticiones (con workers remotos
+# la concurrencia la fija cada worker)
+_admision = obtener_admision(MAX_TIENDAS) if _despachador is None or COLA_TRABAJOS == 'local' else None
 
 @app.route('/<path:path>')
 def serve_static(path):
@@ -51,20 +89,174 @@ def index():
         return send_from_directory(STATIC_FOLDER, 'index.html')
     return "No index.html file found in the static folder."
 
+def _evento_progreso(tienda, completed, total, tiempo, status, num_resultados, motor, estado_cache,
+                     compartida=False, parcial=False, motivo=None, desglose=None):
+    """
+    Serializa un evento de progreso NDJSON para una tienda. `parcial` indica
+    que la tienda se cortó por límite de productos, deadline o porque su
+    navegador excedió el presupuesto de recursos (`motivo`). `desglose` trae
+    los segundos por etapa del scrape y sus contadores (páginas, productos...).
+    """
+    esperas_tienda = obtener_registro_esperas().estadisticas().get(tienda, {})
+    desglose = desglose or {}
+    return json.dumps({
+        'type': 'progress',
+        'store': tienda.title(),
+        'completed': completed,
+        'total': total,
+        'tiempo': tiempo,
+        'status': status,
+        'resultados': num_resultados,
+        'motor': motor,
+        'cache': estado_cache,
+        'compartida': compartida,
+        'parcial': parcial,
+        'motivo': motivo,
+        'espera': esperas_tienda.get('total', 0),  # Segundos acumulados esperando en la tienda
+        'etapas': desglose.get('etapas', {}),
+        'contadores': desglose.get('contadores', {})
+    }, ensure_ascii=False).strip() + '\n'
+
+def _evento_items(tienda, productos):
+    """Serializa un lote de productos recién extraídos de una página."""
+    return json.dumps({
+        'type': 'items',
+        'store': tienda.title(),
+        'items': productos
+    }, ensure_ascii=False).strip() + '\n'
+
+def lanzar_busqueda_tienda(tienda, producto, limite=None, deadline=None, cliente=FONDO):
+    """
+    Lanza la búsqueda de una tienda o se une a la que ya está en curso para la
+    misma consulta y límites (single-flight). Cada motor con navegador, también
+    el de fallback cuando falla la API, espera un cupo de la admisión global en
+    la cola de `cliente`.
+    Al terminar, el resultado se guarda en cache solo si está completo (no
+    cortado por límite o deadline) y siempre se registra en el historial de precios.
+    Retorna (trabajo, es_nuevo).
+    """
+    cache = obtener_cache()
+    clave = (tienda, normalizar_consulta(producto), MAX_PAGINAS, limite, deadline)
+    control = ControlBusqueda(limite, deadline)
+
+    def _guardar(future):
+        if future.cancelled() or future.exception() or not future.result():
+            return
+        obtener_historial().registrar(producto, future.result())
+        if not control.parcial:
+            cache.guardar(tienda, producto, MAX_PAGINAS, future.result())
+
+    def _lanzar():
+        if _despachador is None:
+            admitir = (lambda lanzar: _admision.solicitar(cliente, lanzar, control)) if _admision is not None else None
+            future = enviar_tienda(tienda, producto, _executor_scraping, control, admitir)
+        elif _admision is not None and puede_usar_navegador(tienda):
+            # Los workers locales eligen motor y fallback: se reserva el cupo
+            # si cualquiera de los motores de la tienda abre un navegador
+            future = _admision.solicitar(cliente, lambda: _despachador.enviar(tienda, producto, control), control)
+            future.control = control
+        else:
+            future = _despachador.enviar(tienda, producto, control)
+        future.add_done_callback(_guardar)
+        return future
+
+    return obtener_singleflight().ejecutar(clave, _lanzar, control)
+
+# Pre-crawl de las consultas populares por las mismas búsquedas que /buscar (PRECRAWL=1)
+_planificador = obtener_planificador(TIENDAS_ACTIVAS, lanzar_busqueda_tienda)
+if PRECRAWL_ACTIVO:
+    _planificador.iniciar()
+
+def refrescar_en_segundo_plano(tienda, producto):
+    """Vuelve a buscar una entrada vencida del cache sin bloquear la respuesta."""
+    try:
+        lanzar_busqueda_tienda(tienda, producto)
+    except Exception as e:
+        logging.error(f"Error refrescando cache de {tienda}: {e}")
+
+def _cliente(req):
+    """Identifica al cliente para el reparto de cupos (IP remota; ProxyFix la toma de X-Forwarded-For tras un proxy confiable)."""
+    return req.remote_addr or 'anonimo'
+
+def _posiciones_en_cola(pendientes):
+    """{tienda: (posición, segundos estimados)} de las búsquedas que aún esperan un cupo."""
+    posiciones = {}
+    for tienda, trabajo in pendientes.values():
+        turno = trabajo.turno
+        posicion = _admision.posicion(turno) if turno is not None else None
+        if posicion is not None:
+            posiciones[tienda] = posicion
+    return posiciones
+
+def _desglose(trabajo):
+    """Etapas y contadores de la búsqueda de una tienda, más la espera por un cupo de navegador ('cola')."""
+    desglose = trabajo.control.desglose() if trabajo.control is not None else {'etapas': {}, 'contadores': {}}
+    turno = trabajo.turno
+    if turno is not None:
+        desglose['etapas']['cola'] = round((turno.concedido or time.time()) - turno.creado, 2)
+    return desglose
+
+def _evento_cola(tienda, posicion, espera):
+    """Serializa la posición de una tienda que espera un cupo de navegador."""
+    return json.dumps({
+        'type': 'queued',
+        'store': tienda.title(),
+        'posicion': posicion + 1,
+        'espera_estimada': espera
+    }, ensure_ascii=False).strip() + '\n'
+
+def _token_perfilado(req):
+    """Token de perfilado de la petición (cabecera X-Perfilado-Token o parámetro `perfilar`)."""
+    return req.headers.get('X-Perfilado-Token') or req.args.get('perfilar')
+
+def _perfil_autorizado(id=None):
+    """
+    (perfil, None) o (None, respuesta de error) para los endpoints de
+    /debug/perfiles: 404 si el perfilado está apagado o el perfil no existe,
+    403 sin el token.
+    """
+    if not PERFILADO_ACTIVO:
+        return None, (jsonify({'error': 'Perfilado desactivado'}), 404)
+    if not token_valido(_token_perfilado(request)):
+        return None, (jsonify({'error': 'Token de perfilado inválido'}), 403)
+    if id is None:
+        return None, None
+    perfil = obtener_almacen_perfiles().obtener(id)
+    if perfil is None:
+        return None, (jsonify({'error': 'Perfil no encontrado'}), 404)
+    return perfil, None
+
+def _parametros_pagina(args):
+    """Orden, filtros y tamaño de página de la petición (mismos nombres que los controles del frontend)."""
+    return {
+        'orden': args.get('ordenarPor') or RECOMENDADOS,
+        'tienda': args.get('tienda') or None,
+        'minimo': args.get('min', type=float),
+        'maximo': args.get('max', type=float),
+        'por_pagina': max(1, min(args.get('porPagina', POR_PAGINA, type=int), POR_PAGINA_MAX)),
+    }
+
 # Función para ejecutar scrapers asíncronos en el ThreadPoolExecutor
 def run_async_scraper(scraper_func, product):
-    """Ejecuta un scraper asíncrono en un contexto síncrono."""
-    return asyncio.run(scraper_func(product))
+    """Ejecuta un scraper asíncrono en el loop del runtime de Playwright compartido."""
+    return obtener_runtime().ejecutar(scraper_func(product))
 
 @app.route('/buscar', methods=['GET'])
 def buscar():
     producto = request.args.get('producto')
     telefono = request.args.get('telefono', '').strip()
     notificar = request.args.get('notificarWsp', '').lower() == 'true'
+    agrupar = request.args.get('agrupar', 'true').lower() != 'false'
     
     if not producto:
         return jsonify({'error': 'No se ingresó un producto'}), 400
 
+    # Límites opcionales: máximo de productos por tienda y segundos por tienda
+    limite = request.args.get('limite', type=int)
+    deadline = request.args.get('deadline', type=float)
+    if (limite is not None and limite <= 0) or (deadline is not None and deadline <= 0):
+        return jsonify({'error': 'limite y deadline deben ser mayores que cero'}), 400
+
     # Validar teléfono si se solicita notificación
     if notificar and telefono:
         es_valido, telefono_limpio, error = validar_numero_telefono(telefono)
@@ -72,65 +264,169 @@ def buscar():
             return jsonify({'error': f'Número de teléfono inválido: {error}'}), 400
         telefono = telefono_limpio
 
+    pagina = _parametros_pagina(request.args)
+    cliente = _cliente(request)
+
+    # Perfilado a pedido: solo con PERFILADO activo y el token correcto
+    token = _token_perfilado(request)
+    if token and PERFILADO_ACTIVO and not token_valido(token):
+        return jsonify({'error': 'Token de perfilado inválido'}), 403
+    perfil = obtener_almacen_perfiles().crear(producto) if token_valido(token) else None
+
+    # Las tiendas con navegador corren como tareas del loop de Playwright;
+    # el executor compartido se usa para la API HTTP y los motores Selenium
+    tiendas = list(TIENDAS_ACTIVAS)
+    cache = obtener_cache()
+    estados = {tienda: cache.obtener(tienda, producto, MAX_PAGINAS) for tienda in tiendas}
+
+    # Sin lugar en la cola de cupos de navegador se rechaza antes de empezar
+    if _admision is not None:
+        nuevas = sum(1 for tienda in tiendas if estados[tienda][0] == MISS and usa_navegador(tienda))
+        reintentar = _admision.rechazo(cliente, nuevas) if nuevas else None
+        if reintentar is not None:
+            respuesta = jsonify({'error': 'Demasiadas búsquedas en espera, intenta de nuevo en unos segundos',
+                                 'reintentar': reintentar})
+            respuesta.headers['Retry-After'] = str(reintentar)
+            return respuesta, 429
+    if PRECRAWL_ACTIVO:
+        _planificador.anotar(producto)
+
     def generate():
         resultados = []
-        
-        # Configurar tiendas con opción de usar Playwright
-        tiendas = [
-            ('ripley_playwright', buscar_en_ripley_async_wrapper),  # Usar Playwright para Ripley
-            ('falabella', buscar_en_falabella),
-            ('oechsle', buscar_en_oechsle)
-        ]
+        inicio = time.time()
 
         completed = 0
         futures = {}
-        start_times = {}
-
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            for tienda, funcion in tiendas:
-                if tienda == 'ripley_playwright':
-                    # Para scrapers asíncronos, usar el wrapper
-                    future = executor.submit(run_async_scraper, buscar_en_ripley_async_wrapper, producto)
-                else:
-                    future = executor.submit(funcion, producto)
-                    
-                futures[future] = tienda.replace('_playwright', '')  # Mostrar nombre limpio
-                start_times[tienda] = time.time()
-
-            for future in as_completed(futures):
-                tienda_display = futures[future]
+        cacheadas = []
+
+        for tienda in tiendas:
+            estado_cache, resultados_cache = estados[tienda]
+            if estado_cache == MISS:
+                trabajo, _ = lanzar_busqueda_tienda(tienda, producto, limite, deadline, cliente)
+                futures[trabajo.future] = (tienda, trabajo)
+                if perfil is not None:
+                    perfil.seguir(trabajo.control, tienda)
+            else:
+                cacheadas.append((tienda, estado_cache, resultados_cache))
+                if estado_cache == STALE:
+                    refrescar_en_segundo_plano(tienda, producto)
+
+        # Los productos de cada página llegan como eventos 'items' apenas se extraen,
+        # y cada tienda reporta el mismo resultado a todas las peticiones unidas a su
+        # búsqueda. Con deadline no se espera más allá de él: las tiendas pendientes
+        # se reportan como parciales con lo que alcanzaron a publicar y siguen en
+        # segundo plano (su resultado llega al cache).
+        eventos = queue.Queue()
+        pendientes = dict(futures)
+        publicados = {tienda: [] for tienda, _ in futures.values()}
+        links = {tienda: set() for tienda in publicados}  # Un motor de fallback vuelve a publicar lo ya enviado
+        oyentes = []
+        for future, (tienda, trabajo) in futures.items():
+            if trabajo.control is not None:
+                oyente = lambda lote, tienda=tienda: eventos.put(('items', tienda, lote))
+                trabajo.control.suscribir(oyente)
+                oyentes.append((trabajo.control, oyente))
+            future.add_done_callback(lambda f: eventos.put(('fin', f, None)))
+
+        espera_maxima = deadline + GRACIA_DEADLINE if deadline else TIMEOUT
+        informadas = {}
+        try:
+            # Las tiendas en cache responden de inmediato
+            for tienda, estado_cache, resultados_tienda in cacheadas:
+                completed += 1
+                recortados = resultados_tienda[:limite] if limite else resultados_tienda
+                resultados.extend(recortados)
+                if recortados:
+                    yield _evento_items(tienda, recortados)
+                yield _evento_progreso(tienda, completed, len(tiendas), 0.0,
+                                       "✓" if recortados else "Sin resultados",
+                                       len(recortados), 'cache', estado_cache,
+                                       parcial=len(recortados) < len(resultados_tienda),
+                                       motivo=LIMITE if len(recortados) < len(resultados_tienda) else None)
+
+            while pendientes:
+                # Las tiendas que esperan un cupo informan su posición cuando cambia
+                # (una tienda puede entrar a la cola tarde, al pasar de la API al navegador)
+                posiciones = _posiciones_en_cola(pendientes) if _admision is not None else {}
+                for tienda, (posicion, espera) in posiciones.items():
+                    if informadas.get(tienda) != posicion:
+                        informadas[tienda] = posicion
+                        yield _evento_cola(tienda, posicion, espera)
+
+                restante = max(0.0, inicio + espera_maxima - time.time())
+                try:
+                    tipo, dato, lote = eventos.get(timeout=min(restante, INTERVALO_COLA) if _admision is not None else restante)
+                except queue.Empty:
+                    if time.time() >= inicio + espera_maxima:
+                        break
+                    continue
+
+                if tipo == 'items':
+                    vistos = links[dato]
+                    nuevos = [p for p in lote if p['link'] not in vistos and not vistos.add(p['link'])]
+                    publicados[dato].extend(nuevos)
+                    if nuevos:
+                        yield _evento_items(dato, nuevos)
+                    continue
+
+                tienda_display, trabajo = pendientes.pop(dato)
                 completed += 1
-                tiempo_busqueda = round(time.time() - start_times.get(tienda_display, time.time()), 2)
+                tiempo_busqueda = round(time.time() - trabajo.inicio, 2)
+                control = trabajo.control
+                parcial = bool(control and control.parcial)
                 
                 try:
-                    resultados_tienda = future.result()
-                    status = "✓" if resultados_tienda else "Sin resultados"
+                    resultados_tienda = dato.result()
+                    if control is not None and control.motivo == RECURSOS:
+                        status = "Límite de recursos"
+                    else:
+                        status = "✓" if resultados_tienda else "Sin resultados"
                     num_resultados = len(resultados_tienda) if resultados_tienda else 0
                     if resultados_tienda:
                         resultados.extend(resultados_tienda)
 
-                    progress = {
-                        'type': 'progress',
-                        'store': tienda_display.title(),
-                        'completed': completed,
-                        'total': len(tiendas),
-                        'tiempo': tiempo_busqueda,
-                        'status': status,
-                        'resultados': num_resultados
-                    }
-                    yield json.dumps(progress, ensure_ascii=False).strip() + '\n'
+                    yield _evento_progreso(tienda_display, completed, len(tiendas), tiempo_busqueda,
+                                           status, num_resultados, trabajo.motor, MISS,
+                                           compartida=trabajo.suscriptores > 1,
+                                           parcial=parcial, motivo=control.motivo if parcial else None,
+                                           desglose=_desglose(trabajo))
 
                 except Exception as e:
                     logging.error(f"Error en {tienda_display}: {e}")
-                    yield json.dumps({
-                        'type': 'progress',
-                        'store': tienda_display.title(),
-                        'completed': completed,
-                        'total': len(tiendas),
-                        'tiempo': tiempo_busqueda,
-                        'status': 'Error',
-                        'resultados': 0
-                    }, ensure_ascii=False).strip() + '\n'
+                    if control is not None and control.motivo == RECURSOS:
+                        # El gobernador mató el navegador: se usa lo que alcanzó a publicar
+                        parciales = publicados[tienda_display]
+                        resultados.extend(parciales)
+                        yield _evento_progreso(tienda_display, completed, len(tiendas), tiempo_busqueda,
+                                               'Límite de recursos', len(parciales), trabajo.motor, MISS,
+                                               compartida=trabajo.suscriptores > 1,
+                                               parcial=True, motivo=RECURSOS, desglose=_desglose(trabajo))
+                        continue
+                    yield _evento_progreso(tienda_display, completed, len(tiendas), tiempo_busqueda,
+                                           'Error', 0, trabajo.motor, MISS,
+                                           compartida=trabajo.suscriptores > 1,
+                                           desglose=_desglose(trabajo))
+        finally:
+            for control, oyente in oyentes:
+                control.desuscribir(oyente)
+            # Si nadie más espera una tienda pendiente (la petición se desconectó
+            # o pasó el deadline), su turno deja la cola de navegadores; la que
+            # ya tiene cupo sigue y su resultado llega al cache
+            for _, trabajo in pendientes.values():
+                if obtener_singleflight().abandonar(trabajo) and trabajo.turno is not None:
+                    _admision.cancelar(trabajo.turno)
+
+        for tienda_display, trabajo in pendientes.values():
+            completed += 1
+            # Lo ya publicado por la tienda
+            parciales = publicados[tienda_display]
+            resultados.extend(parciales)
+            logging.error(f"{tienda_display} no respondió antes del deadline")
+            yield _evento_progreso(tienda_display, completed, len(tiendas),
+                                   round(time.time() - trabajo.inicio, 2),
+                                   'Tiempo agotado', len(parciales), trabajo.motor, MISS,
+                                   compartida=trabajo.suscriptores > 1,
+                                   parcial=True, motivo=DEADLINE, desglose=_desglose(trabajo))
 
         # Ordenar resultados finales
         final_results_list = sorted(resultados, key=lambda x: x['precio'])
@@ -143,15 +439,64 @@ def buscar():
             except Exception as e:
                 logging.error(f"Error programando notificación WhatsApp: {e}")
 
-        # Enviar resultados finales
+        # El mismo producto en varias tiendas queda como una entrada con sus `ofertas`
+        productos_finales = agrupar_ofertas(final_results_list) if agrupar else final_results_list
+
+        # Enviar resultados finales: la lista completa queda en el servidor y solo
+        # viaja la primera página; el resto se pide a /resultados/<resultset>
+        primera = obtener_almacen_resultados().guardar(producto, productos_finales).pagina(**pagina)
         final_results = {
             'type': 'results',
-            'results': final_results_list,
+            **primera,
+            'results': primera['items'],
             'notificacion_enviada': notificar and telefono and bool(final_results_list)
         }
         yield json.dumps(final_results, ensure_ascii=False).strip() + '\n'
 
-    return Response(generate(), mimetype='application/json')
+    if perfil is None:
+        return Response(generate(), mimetype='application/json')
+    respuesta = Response(perfilar(perfil, generate()), mimetype='application/json')
+    respuesta.headers['X-Perfil-Id'] = perfil.id
+    return respuesta
+
+@app.route('/resultados/<resultset>')
+def resultados_paginados(resultset):
+    """
+    Una página filtrada y ordenada de una búsqueda terminada. Acepta los
+    filtros (ordenarPor, tienda, min, max, porPagina) con `pagina`, o el
+    cursor opaco `cursor` que devuelve la página anterior.
+    """
+    conjunto = obtener_almacen_resultados().obtener(resultset)
+    if conjunto is None:
+        return jsonify({'error': 'Los resultados vencieron; vuelve a buscar'}), 404
+
+    cursor = request.args.get('cursor')
+    try:
+        if cursor:
+            return jsonify(conjunto.pagina_desde_cursor(cursor))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    parametros = _parametros_pagina(request.args)
+    pagina = request.args.get('pagina', 1, type=int)
+    return jsonify(conjunto.pagina(desde=(pagina - 1) * parametros['por_pagina'], **parametros))
+
+@app.route('/historial-precios')
+def historial_precios():
+    """Precios registrados de un producto (tienda y link); `dias` acota la ventana."""
+    tienda = request.args.get('tienda')
+    link = request.args.get('link')
+    if not tienda or not link:
+        return jsonify({'error': 'Se requieren tienda y link'}), 400
+    return jsonify(obtener_historial().historial(tienda, link, request.args.get('dias', type=float)))
+
+@app.route('/precios-minimos')
+def precios_minimos():
+    """Precio más bajo por tienda para una consulta en los últimos `dias` (7 por defecto)."""
+    producto = request.args.get('producto')
+    if not producto:
+        return jsonify({'error': 'No se ingresó un producto'}), 400
+    return jsonify(obtener_historial().minimos_por_tienda(producto, request.args.get('dias', 7, type=float)))
 
 @app.route('/validar-telefono', methods=['POST'])
 def validar_telefono():
@@ -167,11 +512,91 @@ def validar_telefono():
         'mensaje': mensaje
     })
 
+@app.route('/metrics')
+def metricas():
+    """Tiempos por etapa de los scrapers y contadores por tienda, en formato de Prometheus."""
+    return Response(obtener_metricas().exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/debug/perfiles')
+def listar_perfiles():
+    """Perfiles guardados de búsquedas perfiladas: consulta, duración, muestras y tiempos por tienda."""
+    _, error = _perfil_autorizado()
+    if error:
+        return error
+    return jsonify(obtener_almacen_perfiles().listar())
+
+@app.route('/debug/perfiles/<id>')
+def ver_perfil(id):
+    """Metadatos de un perfil y su resumen: muestras por hilo (Python vs. espera) y funciones más vistas."""
+    perfil, error = _perfil_autorizado(id)
+    if error:
+        return error
+    return jsonify({**perfil.metadatos(), **perfil.resumen()})
+
+@app.route('/debug/perfiles/<id>/folded')
+def descargar_perfil(id):
+    """Pilas colapsadas del perfil, para flamegraph.pl o speedscope."""
+    perfil, error = _perfil_autorizado(id)
+    if error:
+        return error
+    respuesta = Response(perfil.colapsado(), content_type='text/plain; charset=utf-8')
+    respuesta.headers['Content-Disposition'] = f'attachment; filename=perfil-{perfil.id}.folded'
+    return respuesta
+
+@app.route('/estadisticas-pool')
+def estadisticas_pool():
+    """Endpoint con el tamaño del pool de drivers, los tiempos de espera y el consumo de cada navegador."""
+    estadisticas = obtener_pool().estadisticas()
+    estadisticas['navegadores'] = obtener_gobernador().estadisticas()
+    return jsonify(estadisticas)
+
+@app.route('/estadisticas-cache')
+def estadisticas_cache():
+    """Endpoint con el hit ratio y el uso de memoria del cache de resultados."""
+    estadisticas = obtener_cache().estadisticas()
+    estadisticas['busquedas'] = obtener_singleflight().estadisticas()
+    estadisticas['conjuntos'] = obtener_almacen_resultados().estadisticas()
+    return jsonify(estadisticas)
+
+@app.route('/estadisticas-esperas')
+def estadisticas_esperas():
+    """Endpoint con el tiempo acumulado de espera por tienda (cortesía, condiciones, pausas fijas)."""
+    return jsonify(obtener_registro_esperas().estadisticas())
+
+@app.route('/estadisticas-hosts')
+def estadisticas_control_hosts():
+    """Endpoint con la concurrencia AIMD actual, el backoff y las señales de cada host."""
+    return jsonify(estadisticas_hosts())
+
+@app.route('/estadisticas-historial')
+def estadisticas_historial():
+    """Endpoint con las filas escritas, pendientes y descartadas del historial de precios."""
+    return jsonify(obtener_historial().estadisticas())
+
+@app.route('/estadisticas-admision')
+def estadisticas_admision():
+    """Endpoint con los cupos de navegador ocupados y las búsquedas en espera por cliente."""
+    if _admision is None:
+        return jsonify({'cupos': None})
+    return jsonify(_admision.estadisticas())
+
+@app.route('/estadisticas-trabajos')
+def estadisticas_trabajos():
+    """Endpoint con los trabajos en cola, en curso y terminados por los workers (si hay COLA_TRABAJOS)."""
+    if _despachador is None:
+        return jsonify({'cola': None})
+    return jsonify(_despachador.estadisticas())
+
+@app.route('/estadisticas-precrawl')
+def estadisticas_precrawl():
+    """Endpoint con las consultas calientes, la duración y frescura de su último crawl por tienda y el presupuesto usado."""
+    return jsonify(_planificador.estadisticas())
+
 @app.route('/test-playwright')
 def test_playwright():
     """Endpoint para probar el scraper de Playwright."""
     try:
-        productos = buscar_en_ripley_async_wrapper("laptop")
+        productos = run_async_scraper(TIENDAS['ripley']['playwright'], "laptop")
         return jsonify({
             'success': True,
             'productos_encontrados': len(productos),
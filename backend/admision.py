@@ -0,0 +1,205 @@
+import os
+import math
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from .scrapping.control_busqueda import ABANDONADA
+
+# Control de admisión global: cupos de navegador repartidos entre todas las peticiones
+ADMISION_COLA_MAX = int(os.environ.get('ADMISION_COLA_MAX', 30))  # Búsquedas en espera antes de responder 429
+ADMISION_COLA_CLIENTE = int(os.environ.get('ADMISION_COLA_CLIENTE', 6))  # En espera por cliente
+DURACION_INICIAL = 20.0  # Segundos estimados por búsqueda hasta tener mediciones
+SUAVIZADO = 0.2  # Peso de cada búsqueda nueva en el promedio móvil de duración
+
+
+class Turno:
+    """Una búsqueda de tienda esperando (o usando) un cupo de navegador."""
+
+    def __init__(self, cliente, lanzar, control=None):
+        self.cliente = cliente
+        self.lanzar = lanzar
+        self.control = control
+        self.creado = time.time()
+        self.concedido = None
+        self.future = Future()
+        self.future.turno = self
+        self.future.motor = None
+
+    def vigente(self):
+        """False si el deadline de la búsqueda ya venció (o se abortó): no vale la pena darle un cupo."""
+        return self.control is None or not self.control.vencido()
+
+
+class Admision:
+    """
+    Reparte `cupos` búsquedas con navegador simultáneas entre todas las
+    peticiones. Las que no caben esperan en una cola por cliente y los cupos
+    que se liberan se conceden por turnos (round-robin entre clientes), así
+    un cliente con muchas búsquedas no deja esperando a los demás. Si la cola
+    está llena, `rechazo` indica cuántos segundos esperar antes de reintentar.
+    """
+
+    def __init__(self, cupos, cola_max=ADMISION_COLA_MAX, cola_cliente=ADMISION_COLA_CLIENTE):
+        self.cupos = max(1, cupos)
+        self.cola_max = cola_max
+        self.cola_cliente = cola_cliente
+        self._clientes = OrderedDict()  # cliente -> deque de Turno, en orden de atención
+        self._ocupados = 0
+        self._duracion = DURACION_INICIAL
+        self._lock = threading.Lock()
+        self._concedidas = 0
+        self._rechazadas = 0
+        self._descartadas = 0
+        self._espera_total = 0.0
+
+    def _en_cola(self):
+        return sum(len(cola) for cola in self._clientes.values())
+
+    def _espera(self, posicion):
+        """Segundos estimados hasta que se conceda el turno en `posicion` (0 = el siguiente)."""
+        return round((posicion // self.cupos + 1) * self._duracion, 1)
+
+    def rechazo(self, cliente, nuevas=1):
+        """
+        Segundos sugeridos para Retry-After si `nuevas` búsquedas más del
+        cliente no caben en la cola, o None si se admiten.
+        """
+        with self._lock:
+            espera_cliente = len(self._clientes.get(cliente, ()))
+            if self._ocupados + nuevas <= self.cupos and not self._clientes:
+                return None
+            if self._en_cola() + nuevas <= self.cola_max and espera_cliente + nuevas <= self.cola_cliente:
+                return None
+            self._rechazadas += 1
+            return max(1, math.ceil(self._espera(self._en_cola())))
+
+    def solicitar(self, cliente, lanzar, control=None):
+        """
+        Encola `lanzar()` (que retorna un concurrent.futures.Future) hasta que
+        haya un cupo. Retorna de inmediato un Future con el mismo resultado;
+        `future.turno` permite consultar la posición mientras espera. Si el
+        deadline de `control` vence antes de que llegue su turno, el Future
+        falla sin lanzar la búsqueda.
+        """
+        turno = Turno(cliente, lanzar, control)
+        with self._lock:
+            self._clientes.setdefault(cliente, deque()).append(turno)
+        self._despachar()
+        return turno.future
+
+    def cancelar(self, turno):
+        """
+        Saca de la cola un turno que ya nadie espera (la petición se
+        desconectó) y aborta su búsqueda para que no pruebe otro motor.
+        Retorna False si el turno ya tenía cupo: esa búsqueda sigue.
+        """
+        with self._lock:
+            cola = self._clientes.get(turno.cliente)
+            if cola is None or turno not in cola:
+                return False
+            cola.remove(turno)
+            if not cola:
+                del self._clientes[turno.cliente]
+        if turno.control is not None:
+            turno.control.abortar(ABANDONADA)
+        turno.future.set_exception(RuntimeError("Búsqueda cancelada"))
+        return True
+
+    def _despachar(self):
+        conceder = []
+        vencidos = []
+        with self._lock:
+            while self._ocupados < self.cupos and self._clientes:
+                cliente, cola = next(iter(self._clientes.items()))
+                turno = cola.popleft()
+                # El cliente atendido pasa al final de la ronda
+                if cola:
+                    self._clientes.move_to_end(cliente)
+                else:
+                    del self._clientes[cliente]
+                if not turno.vigente():
+                    vencidos.append(turno)
+                    continue
+                conceder.append(turno)
+                self._ocupados += 1
+            self._descartadas += len(vencidos)
+        for turno in vencidos:
+            turno.future.set_exception(RuntimeError("Deadline vencido esperando un cupo de navegador"))
+        for turno in conceder:
+            self._iniciar(turno)
+
+    def _iniciar(self, turno):
+        turno.concedido = time.time()
+        with self._lock:
+            self._concedidas += 1
+            self._espera_total += turno.concedido - turno.creado
+        try:
+            interno = turno.lanzar()
+        except Exception as e:
+            self._terminar(turno, None, e)
+            return
+        turno.future.motor = getattr(interno, 'motor', None)
+        interno.add_done_callback(lambda f: self._terminar(turno, f))
+
+    def _terminar(self, turno, interno, error=None):
+        with self._lock:
+            self._ocupados -= 1
+            duracion = time.time() - turno.concedido
+            self._duracion += SUAVIZADO * (duracion - self._duracion)
+        if interno is not None:
+            turno.future.motor = getattr(interno, 'motor', turno.future.motor)
+            if interno.cancelled():
+                error = RuntimeError("Búsqueda cancelada")
+            else:
+                error = interno.exception()
+        if error is None:
+            turno.future.set_result(interno.result())
+        else:
+            turno.future.set_exception(error)
+        self._despachar()
+
+    def posicion(self, turno):
+        """
+        (posición, segundos estimados) de un turno en espera, o None si ya se
+        concedió. La posición sigue el orden round-robin en que se atenderá.
+        """
+        with self._lock:
+            if turno.concedido is not None:
+                return None
+            colas = [list(cola) for cola in self._clientes.values()]
+            posicion = 0
+            for ronda in range(max((len(cola) for cola in colas), default=0)):
+                for cola in colas:
+                    if ronda < len(cola):
+                        if cola[ronda] is turno:
+                            return posicion, self._espera(posicion)
+                        posicion += 1
+            return None
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'cupos': self.cupos,
+                'ocupados': self._ocupados,
+                'en_cola': self._en_cola(),
+                'cola_max': self.cola_max,
+                'por_cliente': {cliente: len(cola) for cliente, cola in self._clientes.items()},
+                'duracion_estimada': round(self._duracion, 1),
+                'concedidas': self._concedidas,
+                'rechazadas': self._rechazadas,
+                'descartadas': self._descartadas,
+                'espera_promedio': round(self._espera_total / self._concedidas, 2) if self._concedidas else 0.0,
+            }
+
+
+_admision = None
+_admision_lock = threading.Lock()
+
+def obtener_admision(cupos=None):
+    """Retorna el control de admisión compartido por todo el proceso (la primera llamada fija los cupos)."""
+    global _admision
+    with _admision_lock:
+        if _admision is None:
+            _admision = Admision(cupos or 1)
+        return _admision
@@ -0,0 +1,226 @@
+import os
+import re
+import time
+import numpy as np
+from .ranking import tokenizar
+
+# Agrupación de ofertas del mismo producto en varias tiendas (MinHash + LSH).
+# Con BANDAS x FILAS = PERMUTACIONES, dos nombres con similitud de Jaccard J
+# quedan como candidatos con probabilidad 1 - (1 - J^FILAS)^BANDAS
+# (J=0.5 -> 64%, J=0.7 -> 98%); luego se verifica la similitud estimada.
+PERMUTACIONES = 64
+BANDAS = 16
+FILAS = PERMUTACIONES // BANDAS
+UMBRAL_SIMILITUD = float(os.environ.get('AGRUPACION_UMBRAL', 0.6))
+RAZON_PRECIO_MAX = 3.0  # Precios más distintos que esto no son el mismo producto (ej. funda vs. celular)
+PRESUPUESTO_AGRUPACION = float(os.environ.get('AGRUPACION_PRESUPUESTO', 1.0))  # Segundos
+LOTE_FIRMAS = 2000  # Productos por lote al calcular firmas (acota la memoria de la matriz de hashes)
+
+# Códigos de modelo (letras y dígitos, ej. "un55cu7000", "15fd0001la"); las
+# medidas como "256gb" o "55pulgadas" no cuentan como código
+_UNIDADES = re.compile(r'^\d+(gb|tb|mb|mah|mhz|ghz|hz|w|v|k|p|cm|mm|kg|ml|l|pulgada)?$')
+
+# Permutaciones h(x) = a*x + b (mod 2^32) con `a` impar: biyectivas en uint32,
+# y numpy hace el módulo gratis al desbordar
+_aleatorio = np.random.default_rng(20240601)
+_A = _aleatorio.integers(1, 2 ** 32, PERMUTACIONES, dtype=np.uint32) | np.uint32(1)
+_B = _aleatorio.integers(0, 2 ** 32, PERMUTACIONES, dtype=np.uint32)
+
+
+def texto_normalizado(tokens):
+    """Tokens sin repetir y en orden alfabético: el orden de las palabras varía por tienda."""
+    return ' '.join(sorted(set(tokens)))
+
+
+def codigos(tokens):
+    return {
+        t for t in tokens
+        if len(t) >= 5 and not t.isdigit() and not t.isalpha() and not _UNIDADES.match(t)
+    }
+
+
+def _mezclar(x):
+    """Finalizador de murmur3 sobre uint32: reparte los bits antes de las permutaciones lineales."""
+    x = x ^ (x >> np.uint32(16))
+    x = x * np.uint32(0x85EBCA6B)
+    x = x ^ (x >> np.uint32(13))
+    x = x * np.uint32(0xC2B2AE35)
+    return x ^ (x >> np.uint32(16))
+
+
+def _firmas(textos):
+    """
+    Firmas MinHash (len(textos) x PERMUTACIONES) sobre los trigramas de bytes
+    de cada texto (todos de al menos 3 bytes). Los trigramas de todos los
+    textos salen de un solo arreglo de bytes y el mínimo por texto se saca con
+    np.minimum.reduceat, sin bucles por shingle en Python. Repetir un trigrama
+    no cambia el mínimo, así que no hace falta armar conjuntos.
+
+    Se recorre una permutación a la vez: reduceat sobre un vector es unas
+    siete veces más rápido que sobre la matriz (trigramas x PERMUTACIONES)
+    con axis=0, que además no cabe en cache.
+    """
+    codificados = [texto.encode('utf-8') for texto in textos]
+    datos = np.frombuffer(b'\0\0'.join(codificados), dtype=np.uint8).astype(np.uint32)
+    trigramas = (datos[:-2] << np.uint32(16)) | (datos[1:-1] << np.uint32(8)) | datos[2:]
+    # Los trigramas que tocan el separador \0\0 no pertenecen a ningún texto
+    trigramas = trigramas[(datos[:-2] != 0) & (datos[1:-1] != 0) & (datos[2:] != 0)]
+    cantidades = np.fromiter(map(len, codificados), dtype=np.int64, count=len(codificados)) - 2
+    inicios = np.concatenate(([0], np.cumsum(cantidades)[:-1]))
+    mezclados = _mezclar(trigramas)
+    firmas = np.empty((len(textos), PERMUTACIONES), dtype=np.uint32)
+    for k in range(PERMUTACIONES):
+        firmas[:, k] = np.minimum.reduceat(mezclados * _A[k] + _B[k], inicios)
+    return firmas
+
+
+class _Grupos:
+    """
+    Union-find sobre índices de productos. Cada grupo lleva la unión de los
+    códigos de modelo de sus miembros: dos grupos se juntan solo si comparten
+    un código o si ninguno tiene. Un nombre sin código ("Laptop HP Core i5
+    8GB") se parece a muchos modelos a la vez y no debe servir de puente.
+    """
+
+    def __init__(self, modelos):
+        self.padre = list(range(len(modelos)))
+        self.modelos = list(modelos)
+
+    def raiz(self, i):
+        while self.padre[i] != i:
+            self.padre[i] = self.padre[self.padre[i]]
+            i = self.padre[i]
+        return i
+
+    def unir(self, i, j):
+        ri, rj = self.raiz(i), self.raiz(j)
+        if ri == rj:
+            return
+        if (self.modelos[ri] or self.modelos[rj]) and self.modelos[ri].isdisjoint(self.modelos[rj]):
+            return
+        raiz, otra = min(ri, rj), max(ri, rj)
+        self.padre[otra] = raiz
+        self.modelos[raiz] = self.modelos[raiz] | self.modelos[otra]
+
+
+def _candidatos(firmas, precios, banda):
+    """
+    Pares (i, j) que comparten bucket en la banda y pasan la similitud estimada
+    y la razón de precios, calculado en bloque con numpy. Cada producto se
+    compara solo con el primero de su bucket, así un bucket grande sigue
+    costando lineal.
+    """
+    columnas = firmas[:, banda * FILAS:(banda + 1) * FILAS]
+    claves = np.ascontiguousarray(columnas).view(np.dtype((np.void, columnas.dtype.itemsize * FILAS))).ravel()
+    orden = np.argsort(claves, kind='stable')
+    nuevo_bucket = np.empty(len(orden), dtype=bool)
+    nuevo_bucket[0] = True
+    nuevo_bucket[1:] = claves[orden[1:]] != claves[orden[:-1]]
+    primeros = orden[np.flatnonzero(nuevo_bucket)][np.cumsum(nuevo_bucket) - 1]
+    miembros = ~nuevo_bucket
+    i, j = primeros[miembros], orden[miembros]
+
+    similitud = np.count_nonzero(firmas[i] == firmas[j], axis=1) / PERMUTACIONES
+    menor, mayor = np.minimum(precios[i], precios[j]), np.maximum(precios[i], precios[j])
+    validos = (similitud >= UMBRAL_SIMILITUD) & (mayor <= RAZON_PRECIO_MAX * menor)
+    return zip(i[validos].tolist(), j[validos].tolist())
+
+
+def agrupar_ofertas(productos, presupuesto=PRESUPUESTO_AGRUPACION):
+    """
+    Junta los productos casi iguales (de la misma o de distintas tiendas) en
+    una sola entrada: el producto más barato del grupo, con `ofertas` =
+    [{tienda, precio, link, descuento}, ...] ordenadas por precio. Los
+    productos sin pareja quedan igual. Si se acaba el presupuesto de tiempo
+    se retorna con los grupos encontrados hasta ese momento.
+    """
+    return _agrupar(productos, presupuesto)[0]
+
+
+def _agrupar(productos, presupuesto):
+    """agrupar_ofertas más un bool: False si el presupuesto cortó la agrupación."""
+    inicio = time.time()
+    limite = inicio + presupuesto
+    tokens = [tokenizar(p.get('nombre')) for p in productos]
+    textos = [texto_normalizado(t) for t in tokens]
+    validos = [i for i, texto in enumerate(textos) if len(texto) >= 3]
+    if len(validos) < 2:
+        return productos, True
+
+    firmas = np.empty((len(validos), PERMUTACIONES), dtype=np.uint32)
+    for desde in range(0, len(validos), LOTE_FIRMAS):
+        if time.time() > limite:
+            print(f"Agrupación: presupuesto agotado calculando firmas ({desde}/{len(validos)})")
+            return productos, False
+        firmas[desde:desde + LOTE_FIRMAS] = _firmas([textos[i] for i in validos[desde:desde + LOTE_FIRMAS]])
+
+    # De aquí en adelante los índices son posiciones en `validos`
+    precios = np.array([productos[i]['precio'] for i in validos], dtype=float)
+    grupos = _Grupos([codigos(tokens[i]) for i in validos])
+    completo = True
+    for banda in range(BANDAS):
+        if time.time() > limite:
+            print(f"Agrupación: presupuesto agotado en la banda {banda}/{BANDAS}")
+            completo = False
+            break
+        for i, j in _candidatos(firmas, precios, banda):
+            grupos.unir(i, j)
+
+    miembros = {}
+    for posicion, i in enumerate(validos):
+        miembros.setdefault(grupos.raiz(posicion), []).append(i)
+
+    agrupados = [p for p, texto in zip(productos, textos) if len(texto) < 3]
+    for indices_grupo in miembros.values():
+        if len(indices_grupo) == 1:
+            agrupados.append(productos[indices_grupo[0]])
+            continue
+        ofertas = sorted(
+            ({'tienda': productos[i]['tienda'], 'precio': productos[i]['precio'],
+              'link': productos[i]['link'], 'descuento': productos[i].get('descuento')}
+             for i in indices_grupo),
+            key=lambda oferta: oferta['precio']
+        )
+        mas_barato = min(indices_grupo, key=lambda i: productos[i]['precio'])
+        agrupados.append({**productos[mas_barato], 'ofertas': ofertas})
+
+    print(f"Agrupación: {len(productos)} productos en {len(agrupados)} entradas ({time.time() - inicio:.2f}s)")
+    return agrupados, completo
+
+
+# Benchmark con el presupuesto real: python -m backend.agrupacion [cantidad]
+if __name__ == '__main__':
+    import sys
+    import random
+
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tiendas = ['ripley', 'falabella', 'oechsle', 'hiraoka', 'plazavea']
+    marcas = ['HP', 'Lenovo', 'Samsung', 'Xiaomi', 'Asus', 'LG', 'Acer']
+    tipos = ['Laptop', 'Celular', 'Televisor', 'Audífonos', 'Monitor', 'Tablet']
+    extras = ['8GB RAM', '256GB', 'Bluetooth', 'Smart TV 4K', 'Negro', 'Core i5', '15.6"']
+    random.seed(0)
+
+    # Productos base con un código de modelo; cada tienda lo publica con variaciones en el nombre
+    productos = []
+    while len(productos) < cantidad:
+        modelo = f"{random.choice('ABCDEFGH')}{random.randint(1000, 99999)}X"
+        base = [random.choice(tipos), random.choice(marcas), modelo] + random.sample(extras, 3)
+        precio = random.uniform(50, 5000)
+        for tienda in random.sample(tiendas, random.randint(1, 4)):
+            palabras = base[:]
+            random.shuffle(palabras[3:])
+            if random.random() < 0.3:
+                palabras.pop()
+            productos.append({
+                'nombre': ' '.join(palabras), 'precio': round(precio * random.uniform(0.9, 1.1), 2),
+                'tienda': tienda, 'link': f'https://{tienda}.pe/{len(productos)}', 'imagen': None, 'descuento': None,
+            })
+
+    inicio = time.perf_counter()
+    agrupados, completo = _agrupar(productos[:cantidad], PRESUPUESTO_AGRUPACION)
+    print(f"{cantidad} productos -> {len(agrupados)} entradas en {(time.perf_counter() - inicio) * 1000:.0f} ms "
+          f"({'completa' if completo else 'cortada'} con presupuesto de {PRESUPUESTO_AGRUPACION:.1f}s)")
+    for entrada in agrupados:
+        if 'ofertas' in entrada:
+            print(entrada['nombre'], [(o['tienda'], o['precio']) for o in entrada['ofertas']])
+            break
@@ -0,0 +1,383 @@
+import os
+import ssl
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Benchmark offline de los scrapers de Selenium contra búsquedas grabadas.
+#
+#   grabar:     el scraper corre contra la tienda real a través de un proxy local
+#               que guarda cada respuesta (documentos, JS, XHR, paginación)
+#   reproducir: el mismo proxy responde solo desde lo grabado, sin red
+#
+# El navegador llega al proxy con --host-resolver-rules (todos los hosts apuntan
+# a 127.0.0.1) y --ignore-certificate-errors (certificado autofirmado), pasados
+# por NAVEGADOR_ARGS. Por cada tienda se reporta páginas/seg, ms por producto,
+# viajes al WebDriver y RSS pico; la línea base permite a CI detectar retrocesos.
+#
+# python -m backup.descuentos.backend.benchmark_scrapers grabar metro tailoy --producto televisor
+# python -m backup.descuentos.backend.benchmark_scrapers reproducir --comparar
+# python -m backup.descuentos.backend.benchmark_scrapers reproducir --guardar-linea-base
+SNAPSHOTS_DIR = os.environ.get(
+    'SNAPSHOTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+)
+LINEA_BASE = os.path.join(SNAPSHOTS_DIR, 'linea_base.json')
+PUERTO = int(os.environ.get('BENCHMARK_PUERTO', 8443))
+TOLERANCIA = float(os.environ.get('BENCHMARK_TOLERANCIA', 0.25))  # Empeoramiento relativo aceptado
+PRODUCTO = 'televisor'
+
+# Encabezados que no se reenvían ni se guardan
+_SALTO = {'connection', 'keep-alive', 'transfer-encoding', 'content-encoding', 'content-length',
+          'proxy-connection', 'upgrade', 'alt-svc', 'strict-transport-security', 'te', 'trailer'}
+
+
+def _tiendas():
+    """Scrapers de Selenium a medir, por nombre de tienda."""
+    from .scrapping.ripley import buscar_en_ripley
+    from .scrapping.falabella import buscar_en_falabella
+    from .scrapping.oechsle import buscar_en_oechsle
+    from .scrapping.oechsle_refactored import OechsleScraper
+    from .scrapping.metro import buscar_en_metro
+    from .scrapping.tailoy import buscar_en_tailoy
+    from .scrapping.hiraoka import buscar_en_hiraoka
+    from .scrapping.plazavea import buscar_en_plazavea
+    from .scrapping.estilos import buscar_en_estilos
+    from .scrapping.realplaza import buscar_en_realplaza
+    return {
+        'ripley': buscar_en_ripley,
+        'falabella': buscar_en_falabella,
+        'oechsle': buscar_en_oechsle,
+        'oechsle_scraper': lambda producto, control=None: OechsleScraper().buscar(producto, control=control),
+        'metro': buscar_en_metro,
+        'tailoy': buscar_en_tailoy,
+        'hiraoka': buscar_en_hiraoka,
+        'plazavea': buscar_en_plazavea,
+        'estilos': buscar_en_estilos,
+        'realplaza': buscar_en_realplaza,
+    }
+
+
+class Grabacion:
+    """Respuestas grabadas de una tienda: un índice JSON y un archivo por cuerpo."""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, 'indice.json')
+        self.producto = PRODUCTO
+        self.respuestas = {}  # clave -> entrada
+        self._lock = threading.Lock()
+        if os.path.exists(self.ruta_indice):
+            with open(self.ruta_indice, encoding='utf-8') as f:
+                datos = json.load(f)
+            self.producto = datos['producto']
+            self.respuestas = {entrada['clave']: entrada for entrada in datos['respuestas']}
+
+    @staticmethod
+    def clave(metodo, host, ruta, cuerpo):
+        resumen = hashlib.sha1(cuerpo).hexdigest()[:12] if cuerpo else ''
+        return f'{metodo} {host}{ruta} {resumen}'
+
+    def guardar(self, metodo, host, ruta, cuerpo_pedido, estado, encabezados, cuerpo):
+        archivo = hashlib.sha1(cuerpo).hexdigest() + '.bin'
+        with open(os.path.join(self.directorio, archivo), 'wb') as f:
+            f.write(cuerpo)
+        with self._lock:
+            clave = self.clave(metodo, host, ruta, cuerpo_pedido)
+            self.respuestas[clave] = {
+                'clave': clave, 'metodo': metodo, 'host': host, 'ruta': ruta,
+                'estado': estado, 'encabezados': encabezados, 'archivo': archivo,
+            }
+
+    def buscar(self, metodo, host, ruta, cuerpo_pedido):
+        """La respuesta exacta o, si la consulta cambió (marcas de tiempo, etc.), la de más parámetros en común."""
+        entrada = self.respuestas.get(self.clave(metodo, host, ruta, cuerpo_pedido))
+        if entrada is not None:
+            return entrada
+        camino, _, consulta = ruta.partition('?')
+        parametros = set(parse_qsl(consulta))
+        candidatas = [
+            e for e in self.respuestas.values()
+            if e['metodo'] == metodo and e['host'] == host and e['ruta'].partition('?')[0] == camino
+        ]
+        if not candidatas:
+            return None
+        return max(candidatas, key=lambda e: len(parametros & set(parse_qsl(e['ruta'].partition('?')[2]))))
+
+    def cuerpo(self, entrada):
+        with open(os.path.join(self.directorio, entrada['archivo']), 'rb') as f:
+            return f.read()
+
+    def escribir_indice(self):
+        with self._lock:
+            datos = {'producto': self.producto, 'respuestas': sorted(self.respuestas.values(), key=lambda e: e['clave'])}
+        with open(self.ruta_indice, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=1)
+
+
+class _Proxy(BaseHTTPRequestHandler):
+    """Atiende lo que el navegador pide a cualquier host: lo reenvía y graba, o lo reproduce."""
+
+    protocol_version = 'HTTP/1.1'
+    grabacion = None
+    grabando = False
+    faltantes = 0
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+    def _atender(self):
+        host = (self.headers.get('Host') or '').split(':')[0]
+        largo = int(self.headers.get('Content-Length') or 0)
+        cuerpo_pedido = self.rfile.read(largo) if largo else b''
+
+        if self.grabando:
+            respuesta = self._reenviar(host, cuerpo_pedido)
+        else:
+            entrada = self.grabacion.buscar(self.command, host, self.path, cuerpo_pedido)
+            respuesta = (entrada['estado'], entrada['encabezados'], self.grabacion.cuerpo(entrada)) if entrada else None
+        if respuesta is None:
+            _Proxy.faltantes += 1
+            respuesta = (404, [], b'')
+
+        estado, encabezados, cuerpo = respuesta
+        self.send_response(estado)
+        for nombre, valor in encabezados:
+            self.send_header(nombre, valor)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(cuerpo)
+
+    def _reenviar(self, host, cuerpo_pedido):
+        encabezados = {k: v for k, v in self.headers.items() if k.lower() not in _SALTO}
+        encabezados['Accept-Encoding'] = 'identity'  # Guardar los cuerpos sin comprimir
+        conexion = http.client.HTTPSConnection(host, timeout=30, context=ssl.create_default_context())
+        try:
+            conexion.request(self.command, self.path, body=cuerpo_pedido or None, headers=encabezados)
+            respuesta = conexion.getresponse()
+            cuerpo = respuesta.read()
+        except OSError as e:
+            print(f"  No se pudo grabar {host}{self.path[:80]}: {e}")
+            return None
+        finally:
+            conexion.close()
+        guardados = [(k, v) for k, v in respuesta.getheaders() if k.lower() not in _SALTO and k.lower() != 'set-cookie']
+        self.grabacion.guardar(self.command, host, self.path, cuerpo_pedido, respuesta.status, guardados, cuerpo)
+        # Las cookies se entregan al navegador pero no se graban
+        return respuesta.status, guardados + [(k, v) for k, v in respuesta.getheaders() if k.lower() == 'set-cookie'], cuerpo
+
+    do_GET = do_POST = do_HEAD = do_PUT = do_OPTIONS = _atender
+
+
+def _certificado(directorio):
+    """Certificado autofirmado para el proxy (el navegador corre con --ignore-certificate-errors)."""
+    certificado, clave = os.path.join(directorio, 'cert.pem'), os.path.join(directorio, 'clave.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=benchmark', '-keyout', clave, '-out', certificado],
+        check=True, capture_output=True,
+    )
+    return certificado, clave
+
+def iniciar_proxy(grabacion, grabando, puerto=PUERTO):
+    """Levanta el proxy HTTPS local en un hilo y retorna el servidor."""
+    _Proxy.grabacion = grabacion
+    _Proxy.grabando = grabando
+    _Proxy.faltantes = 0
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), _Proxy)
+    directorio = tempfile.mkdtemp(prefix='benchmark-')
+    try:
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        contexto.load_cert_chain(*_certificado(directorio))
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    servidor.socket = contexto.wrap_socket(servidor.socket, server_side=True)
+    threading.Thread(target=servidor.serve_forever, name='benchmark-proxy', daemon=True).start()
+    return servidor
+
+
+class _Viajes:
+    """Cuenta los comandos enviados al WebDriver (cada uno es un viaje HTTP a chromedriver)."""
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def instalar(self):
+        from selenium.webdriver.remote.webdriver import WebDriver
+        original = WebDriver.execute
+        contador = self
+
+        def execute(driver, *argumentos, **opciones):
+            with contador._lock:
+                contador.total += 1
+            return original(driver, *argumentos, **opciones)
+
+        WebDriver.execute = execute
+
+
+class _MedidorRss:
+    """Muestrea el RSS del proceso y sus hijos (chromedriver, Chrome) y guarda el pico."""
+
+    def __init__(self, intervalo=0.2):
+        self.intervalo = intervalo
+        self.pico = 0
+        self._detener = threading.Event()
+
+    def __enter__(self):
+        from .scrapping.gobernador import rss_arbol
+
+        def muestrear():
+            while not self._detener.wait(self.intervalo):
+                self.pico = max(self.pico, rss_arbol(os.getpid()))
+
+        threading.Thread(target=muestrear, daemon=True).start()
+        return self
+
+    def __exit__(self, *error):
+        self._detener.set()
+
+
+def medir_tienda(tienda, buscar, producto, viajes):
+    from .scrapping.control_busqueda import ControlBusqueda, activar
+
+    control = ControlBusqueda()
+    viajes_previos = viajes.total
+    with _MedidorRss() as rss:
+        inicio = time.perf_counter()
+        with activar(control, tienda.split('_')[0]):
+            productos = buscar(producto, control=control) or []
+        duracion = time.perf_counter() - inicio
+    paginas = len(control.lotes)
+    return {
+        'productos': len(productos),
+        'paginas': paginas,
+        'segundos': round(duracion, 2),
+        'paginas_por_segundo': round(paginas / duracion, 3) if duracion else 0.0,
+        'ms_por_producto': round(duracion * 1000 / len(productos), 1) if productos else None,
+        'viajes_webdriver': viajes.total - viajes_previos,
+        'rss_pico_mb': round(rss.pico / 1024 / 1024, 1),
+        'faltantes': _Proxy.faltantes,
+    }
+
+
+def comparar(medidas, linea_base, tolerancia=TOLERANCIA):
+    """Retrocesos respecto a la línea base: [(tienda, descripción)]."""
+    retrocesos = []
+    for tienda, actual in medidas.items():
+        base = linea_base.get(tienda)
+        if not base:
+            continue
+        if actual['productos'] < base['productos']:
+            retrocesos.append((tienda, f"productos {base['productos']} -> {actual['productos']}"))
+        if actual['paginas_por_segundo'] < base['paginas_por_segundo'] * (1 - tolerancia):
+            retrocesos.append((tienda, f"páginas/seg {base['paginas_por_segundo']} -> {actual['paginas_por_segundo']}"))
+        for clave in ('ms_por_producto', 'viajes_webdriver', 'rss_pico_mb'):
+            if base.get(clave) and actual.get(clave) and actual[clave] > base[clave] * (1 + tolerancia):
+                retrocesos.append((tienda, f"{clave} {base[clave]} -> {actual[clave]}"))
+    return retrocesos
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Benchmark offline de los scrapers de Selenium')
+    parser.add_argument('modo', choices=('grabar', 'reproducir'))
+    parser.add_argument('tiendas', nargs='*', help='Tiendas a medir (por defecto todas las grabadas)')
+    parser.add_argument('--producto', default=PRODUCTO, help='Búsqueda a grabar')
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--comparar', action='store_true', help='Falla (código 1) si hay retrocesos')
+    parser.add_argument('--guardar-linea-base', action='store_true')
+    opciones = parser.parse_args(argumentos)
+
+    # Configuración antes de importar los scrapers: sin esperas de cortesía
+    # (no hay tienda real del otro lado) y el navegador apuntando al proxy
+    os.environ.setdefault('INTERVALO_CORTESIA', '0')
+    os.environ['NAVEGADOR_ARGS'] = (
+        f'--host-resolver-rules="MAP * 127.0.0.1:{opciones.puerto}, EXCLUDE localhost" '
+        '--ignore-certificate-errors --disable-quic ' + os.environ.get('NAVEGADOR_ARGS', '')
+    )
+    from .scrapping.driver_pool import obtener_pool
+
+    scrapers = _tiendas()
+    grabadas = sorted(t for t in scrapers if os.path.exists(os.path.join(SNAPSHOTS_DIR, t, 'indice.json')))
+    tiendas = opciones.tiendas or (list(scrapers) if opciones.modo == 'grabar' else grabadas)
+    desconocidas = [t for t in tiendas if t not in scrapers]
+    if desconocidas:
+        parser.error(f"Tiendas desconocidas: {', '.join(desconocidas)}")
+    if not tiendas:
+        parser.error(f"No hay grabaciones en {SNAPSHOTS_DIR}; usa el modo grabar primero")
+
+    viajes = _Viajes()
+    viajes.instalar()
+    medidas = {}
+    try:
+        for tienda in tiendas:
+            directorio = os.path.join(SNAPSHOTS_DIR, tienda)
+            if opciones.modo == 'grabar':
+                shutil.rmtree(directorio, ignore_errors=True)
+                os.makedirs(directorio)
+            grabacion = Grabacion(directorio)
+            if opciones.modo == 'grabar':
+                grabacion.producto = opciones.producto
+            servidor = iniciar_proxy(grabacion, opciones.modo == 'grabar', opciones.puerto)
+            try:
+                print(f"{tienda}: {opciones.modo} '{grabacion.producto}'")
+                medidas[tienda] = medir_tienda(tienda, scrapers[tienda], grabacion.producto, viajes)
+            except Exception as e:
+                print(f"  Error: {e}")
+                medidas[tienda] = {'error': str(e)}
+            finally:
+                servidor.shutdown()
+                servidor.server_close()
+                if opciones.modo == 'grabar':
+                    grabacion.escribir_indice()
+    finally:
+        obtener_pool().cerrar()
+
+    print(f"\n{'tienda':<16}{'productos':>10}{'páginas':>9}{'pág/s':>8}{'ms/prod':>9}{'viajes':>8}{'RSS MB':>9}{'404':>6}")
+    for tienda, m in medidas.items():
+        if 'error' in m:
+            print(f"{tienda:<16}  error: {m['error']}")
+            continue
+        print(f"{tienda:<16}{m['productos']:>10}{m['paginas']:>9}{m['paginas_por_segundo']:>8}"
+              f"{m['ms_por_producto'] or '-':>9}{m['viajes_webdriver']:>8}{m['rss_pico_mb']:>9}{m['faltantes']:>6}")
+
+    if opciones.modo != 'reproducir':
+        return 0
+    validas = {t: m for t, m in medidas.items() if 'error' not in m}
+    if opciones.guardar_linea_base:
+        linea_base = {}
+        if os.path.exists(LINEA_BASE):
+            with open(LINEA_BASE, encoding='utf-8') as f:
+                linea_base = json.load(f)
+        linea_base.update(validas)
+        with open(LINEA_BASE, 'w', encoding='utf-8') as f:
+            json.dump(linea_base, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\nLínea base guardada en {LINEA_BASE}")
+    if opciones.comparar:
+        if not os.path.exists(LINEA_BASE):
+            print(f"\nNo hay línea base en {LINEA_BASE}")
+            return 1
+        with open(LINEA_BASE, encoding='utf-8') as f:
+            retrocesos = comparar(validas, json.load(f))
+        fallidas = [t for t in medidas if 'error' in medidas[t]]
+        for tienda, descripcion in retrocesos:
+            print(f"RETROCESO {tienda}: {descripcion}")
+        for tienda in fallidas:
+            print(f"RETROCESO {tienda}: el scraper falló")
+        if retrocesos or fallidas:
+            return 1
+        print("\nSin retrocesos respecto a la línea base")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
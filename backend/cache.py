@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Configuración (segundos / cantidades) ajustable con variables de entorno
+CACHE_TTL = float(os.environ.get('CACHE_TTL', 900))  # Tiempo en que una entrada es fresca
+CACHE_STALE = float(os.environ.get('CACHE_STALE', 3600))  # Tiempo extra en que se sirve vencida
+CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', 500))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+HIT = 'hit'
+MISS = 'miss'
+STALE = 'stale'
+
+
+def normalizar_consulta(consulta):
+    """Minúsculas, sin tildes y con espacios colapsados ("  Laptóp  HP" -> "laptop hp")."""
+    texto = unicodedata.normalize('NFKD', consulta or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+class CacheResultados:
+    """
+    Cache TTL + LRU de resultados por (tienda, consulta normalizada, max_paginas).
+    Cada tienda puede tener su propio TTL (CACHE_TTL_<TIENDA>). Una entrada
+    vencida se sigue sirviendo durante CACHE_STALE segundos como 'stale'
+    (stale-while-revalidate) mientras el llamador la refresca en segundo plano.
+    El tamaño está acotado por número de entradas y por bytes aproximados.
+    """
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, max_bytes=CACHE_MAX_BYTES):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # clave -> (guardado_en, ttl, resultados, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    def _clave(self, tienda, consulta, max_paginas):
+        return (tienda, normalizar_consulta(consulta), max_paginas)
+
+    def ttl_de(self, tienda):
+        return float(os.environ.get(f'CACHE_TTL_{tienda.upper()}', CACHE_TTL))
+
+    def obtener(self, tienda, consulta, max_paginas):
+        """Retorna (estado, resultados) con estado 'hit', 'stale' o 'miss'."""
+        clave = self._clave(tienda, consulta, max_paginas)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self._misses += 1
+                return MISS, None
+
+            guardado_en, ttl, resultados, tamano = entrada
+            edad = ahora - guardado_en
+            if edad > ttl + CACHE_STALE:
+                self._eliminar(clave)
+                self._misses += 1
+                return MISS, None
+
+            self._entradas.move_to_end(clave)
+            if edad > ttl:
+                self._stale += 1
+                return STALE, resultados
+            self._hits += 1
+            return HIT, resultados
+
+    def guardar(self, tienda, consulta, max_paginas, resultados):
+        """Guarda los resultados de una tienda y aplica los límites de tamaño."""
+        clave = self._clave(tienda, consulta, max_paginas)
+        tamano = len(json.dumps(resultados, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            if clave in self._entradas:
+                self._eliminar(clave)
+            self._entradas[clave] = (time.time(), self.ttl_de(tienda), resultados, tamano)
+            self._bytes += tamano
+            while self._entradas and (len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes):
+                clave_lru = next(iter(self._entradas))
+                self._eliminar(clave_lru)
+                self._evictions += 1
+
+    def _eliminar(self, clave):
+        entrada = self._entradas.pop(clave, None)
+        if entrada:
+            self._bytes -= entrada[3]
+
+    def estadisticas(self):
+        """Retorna hit ratio, tamaño y uso de memoria aproximado del cache."""
+        with self._lock:
+            consultas = self._hits + self._misses + self._stale
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_entradas': self.max_entradas,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'stale': self._stale,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_ratio': round((self._hits + self._stale) / consultas, 3) if consultas else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def obtener_cache():
+    """Retorna el cache de resultados compartido por todo el proceso."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheResultados()
+        return _cache
@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import hmac
+import queue
+import uuid
+import socket
+import secrets
+import hashlib
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlparse
+from .scrapping.control_busqueda import ControlBusqueda
+
+# Cola de trabajos (tienda, consulta) para scrapear fuera del proceso web.
+# COLA_TRABAJOS vacío: /buscar scrapea en el propio proceso (como siempre).
+#   local                  cola en memoria con workers en hilos del mismo proceso
+#   socket://host:puerto   la app sirve la cola por socket; los workers se conectan
+#                          (necesita COLA_CLAVE, compartida por la app y los workers)
+#   redis://host:puerto/0  cola en Redis (o compatible); necesita el paquete redis
+COLA_TRABAJOS = os.environ.get('COLA_TRABAJOS', '').strip()
+COLA_CLAVE = os.environ.get('COLA_CLAVE', '').encode('utf-8')  # Secreto del socket (sin valor por defecto)
+COLA_PREFIJO = os.environ.get('COLA_PREFIJO', 'descuentos')  # Prefijo de las claves en Redis
+TRABAJO_TIMEOUT = float(os.environ.get('TRABAJO_TIMEOUT', 600))  # Sin noticias del worker en este tiempo = error
+EVENTOS_TTL = 3600  # Segundos que Redis guarda los eventos no leídos de un canal
+MENSAJE_MAX = 16 * 1024 * 1024  # Bytes de una línea JSON del socket (los resultados de una tienda caben de sobra)
+MENSAJE_AUTENTICACION_MAX = 4096  # Bytes de las líneas del reto, antes de verificar la firma
+
+# Eventos que publica un worker por cada trabajo
+TOMADO = 'tomado'
+ITEMS = 'items'
+FIN = 'fin'
+ERROR = 'error'
+
+
+class ColaLocal:
+    """Cola en memoria: trabajos en una queue.Queue y una queue.Queue por canal de eventos."""
+
+    def __init__(self):
+        self._trabajos = queue.Queue()
+        self._canales = {}
+        self._lock = threading.Lock()
+
+    def _canal(self, canal):
+        with self._lock:
+            if canal not in self._canales:
+                self._canales[canal] = queue.Queue()
+            return self._canales[canal]
+
+    def encolar(self, trabajo):
+        self._trabajos.put(trabajo)
+
+    def tomar(self, timeout=None):
+        """Retorna el siguiente trabajo o None si no llegó ninguno en `timeout` segundos."""
+        try:
+            return self._trabajos.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def publicar(self, canal, evento):
+        self._canal(canal).put(evento)
+
+    def recibir(self, canal, timeout=None):
+        try:
+            return self._canal(canal).get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def pendientes(self):
+        return self._trabajos.qsize()
+
+
+def _enviar_json(archivo, mensaje):
+    archivo.write(json.dumps(mensaje, ensure_ascii=False).encode('utf-8') + b'\n')
+    archivo.flush()
+
+def _leer_json(archivo, maximo=MENSAJE_MAX):
+    linea = archivo.readline(maximo + 1)
+    if not linea:
+        raise EOFError("Conexión cerrada")
+    if len(linea) > maximo:
+        raise ValueError("Mensaje demasiado grande")
+    return json.loads(linea)
+
+def _firma(clave, reto):
+    return hmac.new(clave, reto.encode('ascii'), hashlib.sha256).hexdigest()
+
+
+class ServidorCola:
+    """
+    Expone una ColaLocal por socket TCP para workers en otros procesos o
+    máquinas. Los mensajes son líneas JSON (nunca pickle): al conectarse, el
+    worker firma un reto con COLA_CLAVE (HMAC-SHA256) y después cada pedido
+    {"op", "args"} recibe {"r": resultado}. Un hilo por conexión.
+    """
+
+    OPERACIONES = ('encolar', 'tomar', 'publicar', 'recibir', 'pendientes')
+
+    def __init__(self, cola, direccion, clave=COLA_CLAVE):
+        if not clave:
+            raise RuntimeError("COLA_TRABAJOS=socket://... necesita COLA_CLAVE (un secreto compartido con los workers)")
+        self.cola = cola
+        self.direccion = direccion
+        self.clave = clave
+        self._socket = socket.create_server(direccion)
+        self.conexiones = 0
+        threading.Thread(target=self._aceptar, name='cola-servidor', daemon=True).start()
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion, origen = self._socket.accept()
+            except OSError as e:
+                print(f"Cola: error aceptando conexiones: {e}")
+                continue
+            threading.Thread(target=self._atender, args=(conexion, origen), daemon=True).start()
+
+    def _autenticar(self, archivo):
+        reto = secrets.token_hex(16)
+        _enviar_json(archivo, {'reto': reto})
+        respuesta = _leer_json(archivo, MENSAJE_AUTENTICACION_MAX)
+        firma = respuesta.get('firma') if isinstance(respuesta, dict) else None
+        valida = isinstance(firma, str) and hmac.compare_digest(firma, _firma(self.clave, reto))
+        _enviar_json(archivo, {'ok': valida})
+        return valida
+
+    def _atender(self, conexion, origen):
+        self.conexiones += 1
+        archivo = conexion.makefile('rwb')
+        try:
+            conexion.settimeout(10)
+            if not self._autenticar(archivo):
+                print(f"Cola: conexión rechazada de {origen[0]}: clave incorrecta")
+                return
+            conexion.settimeout(None)
+            while True:
+                pedido = _leer_json(archivo)
+                if not isinstance(pedido, dict):
+                    pedido = {}
+                operacion, argumentos = pedido.get('op'), pedido.get('args', [])
+                if operacion not in self.OPERACIONES or not isinstance(argumentos, list):
+                    _enviar_json(archivo, {'r': None})
+                    continue
+                _enviar_json(archivo, {'r': getattr(self.cola, operacion)(*argumentos)})
+        except (EOFError, OSError, ValueError, TypeError):
+            pass
+        finally:
+            self.conexiones -= 1
+            archivo.close()
+            conexion.close()
+
+
+class ClienteCola:
+    """Cliente de ServidorCola con la misma interfaz que ColaLocal (una conexión por hilo)."""
+
+    def __init__(self, direccion, clave=COLA_CLAVE):
+        if not clave:
+            raise RuntimeError("COLA_TRABAJOS=socket://... necesita COLA_CLAVE (la misma que usa la app)")
+        self.direccion = direccion
+        self.clave = clave
+        self._local = threading.local()
+
+    def _conectar(self):
+        conexion = socket.create_connection(self.direccion)
+        archivo = conexion.makefile('rwb')
+        try:
+            reto = _leer_json(archivo, MENSAJE_AUTENTICACION_MAX)['reto']
+            _enviar_json(archivo, {'firma': _firma(self.clave, reto)})
+            if not _leer_json(archivo, MENSAJE_AUTENTICACION_MAX).get('ok'):
+                raise PermissionError("La cola rechazó COLA_CLAVE")
+        except Exception:
+            archivo.close()
+            conexion.close()
+            raise
+        return conexion, archivo
+
+    def _pedir(self, operacion, *argumentos):
+        actual = getattr(self._local, 'conexion', None)
+        if actual is None:
+            actual = self._local.conexion = self._conectar()
+        conexion, archivo = actual
+        try:
+            _enviar_json(archivo, {'op': operacion, 'args': list(argumentos)})
+            return _leer_json(archivo)['r']
+        except (EOFError, OSError, ValueError):
+            self._local.conexion = None
+            archivo.close()
+            conexion.close()
+            raise
+
+    def encolar(self, trabajo):
+        self._pedir('encolar', trabajo)
+
+    def tomar(self, timeout=None):
+        return self._pedir('tomar', timeout)
+
+    def publicar(self, canal, evento):
+        self._pedir('publicar', canal, evento)
+
+    def recibir(self, canal, timeout=None):
+        return self._pedir('recibir', canal, timeout)
+
+    def pendientes(self):
+        return self._pedir('pendientes')
+
+
+class ColaRedis:
+    """
+    Cola sobre Redis (o un servidor compatible): los trabajos en una lista
+    (LPUSH/BRPOP) y los eventos en una lista por canal (RPUSH/BLPOP), en JSON.
+    """
+
+    def __init__(self, url, prefijo=COLA_PREFIJO):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("COLA_TRABAJOS=redis://... necesita el paquete 'redis' (pip install redis)") from e
+        self._redis = redis.Redis.from_url(url)
+        self._clave_trabajos = f'{prefijo}:trabajos'
+        self._prefijo_eventos = f'{prefijo}:eventos:'
+
+    def encolar(self, trabajo):
+        self._redis.lpush(self._clave_trabajos, json.dumps(trabajo, ensure_ascii=False))
+
+    def tomar(self, timeout=None):
+        respuesta = self._redis.brpop(self._clave_trabajos, timeout=timeout or 0)
+        return json.loads(respuesta[1]) if respuesta else None
+
+    def publicar(self, canal, evento):
+        clave = self._prefijo_eventos + canal
+        with self._redis.pipeline() as pipeline:
+            pipeline.rpush(clave, json.dumps(evento, ensure_ascii=False))
+            pipeline.expire(clave, EVENTOS_TTL)
+            pipeline.execute()
+
+    def recibir(self, canal, timeout=None):
+        respuesta = self._redis.blpop(self._prefijo_eventos + canal, timeout=timeout or 0)
+        return json.loads(respuesta[1]) if respuesta else None
+
+    def pendientes(self):
+        return self._redis.llen(self._clave_trabajos)
+
+
+def _direccion(url):
+    # Sin host explícito solo se escucha en la máquina local (socket://:6010)
+    partes = urlparse(url)
+    return (partes.hostname or '127.0.0.1', partes.port or 6010)
+
+def crear_cola(url, servidor=False):
+    """
+    Crea la cola descrita por `url`. Con socket://, `servidor=True` (la app)
+    crea la cola en memoria y la expone; `servidor=False` (un worker) se
+    conecta a ella.
+    """
+    if url == 'local':
+        return ColaLocal()
+    if url.startswith('socket://'):
+        if servidor:
+            cola = ColaLocal()
+            ServidorCola(cola, _direccion(url))
+            return cola
+        return ClienteCola(_direccion(url))
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return ColaRedis(url)
+    raise ValueError(f"COLA_TRABAJOS no reconocida: {url}")
+
+
+class Despachador:
+    """
+    Lado de la app: encola búsquedas de tiendas y las expone como el Future
+    de motores.enviar_tienda (`future.motor`, `future.control`), así /buscar,
+    el single-flight y el cache no distinguen un worker remoto de uno local.
+    Un hilo recibe los eventos del canal propio de la app y los reparte: los
+    lotes de productos van al ControlBusqueda del trabajo y el evento final
+    resuelve el Future.
+    """
+
+    def __init__(self, cola):
+        self.cola = cola
+        self.canal = f'app-{uuid.uuid4().hex}'
+        self._trabajos = {}  # id -> (future, control, ultima_noticia)
+        self._lock = threading.Lock()
+        self._enviados = 0
+        self._completados = 0
+        self._fallidos = 0
+        threading.Thread(target=self._recibir, name='cola-despachador', daemon=True).start()
+
+    def enviar(self, tienda, producto, control=None):
+        control = control or ControlBusqueda()
+        future = Future()
+        future.control = control
+        future.motor = None
+        trabajo = {
+            'id': uuid.uuid4().hex,
+            'tienda': tienda,
+            'producto': producto,
+            'limite': control.limite,
+            # Absoluto: el tiempo que el trabajo pasa en la cola también cuenta
+            # (asume relojes sincronizados entre la app y los workers)
+            'fin': control.fin,
+            'canal': self.canal,
+        }
+        with self._lock:
+            self._trabajos[trabajo['id']] = (future, control, time.time())
+            self._enviados += 1
+        self.cola.encolar(trabajo)
+        return future
+
+    def _recibir(self):
+        while True:
+            try:
+                evento = self.cola.recibir(self.canal, timeout=1.0)
+            except Exception as e:
+                print(f"Cola: error recibiendo eventos: {e}")
+                time.sleep(1.0)
+                continue
+            if evento is not None:
+                self._procesar(evento)
+            self._vencer()
+
+    def _procesar(self, evento):
+        with self._lock:
+            entrada = self._trabajos.get(evento.get('id'))
+            if entrada is None:
+                return
+            future, control, _ = entrada
+            terminado = evento['tipo'] in (FIN, ERROR)
+            if terminado:
+                del self._trabajos[evento['id']]
+            else:
+                self._trabajos[evento['id']] = (future, control, time.time())
+
+        if evento.get('motor'):
+            future.motor = evento['motor']
+        if terminado:
+            # Tiempos por etapa y contadores medidos en el worker
+            control.agregar_desglose(evento.get('desglose'))
+        if evento['tipo'] == ITEMS:
+            control.entregar(evento['items'])
+        elif evento['tipo'] == FIN:
+            control.motivo = control.motivo or evento.get('motivo')
+            self._completados += 1
+            future.set_result(evento['resultados'])
+        elif evento['tipo'] == ERROR:
+            self._fallidos += 1
+            future.set_exception(RuntimeError(evento.get('error') or 'Error en el worker'))
+
+    def _vencer(self):
+        """Falla los trabajos de los que ningún worker dio noticias en TRABAJO_TIMEOUT."""
+        ahora = time.time()
+        with self._lock:
+            vencidos = [(id, future) for id, (future, _, ultima) in self._trabajos.items() if ahora - ultima > TRABAJO_TIMEOUT]
+            for id, _ in vencidos:
+                del self._trabajos[id]
+        for _, future in vencidos:
+            self._fallidos += 1
+            future.set_exception(TimeoutError(f"Ningún worker respondió en {TRABAJO_TIMEOUT:.0f}s"))
+
+    def estadisticas(self):
+        with self._lock:
+            en_curso = len(self._trabajos)
+        try:
+            en_cola = self.cola.pendientes()
+        except Exception:
+            en_cola = None
+        return {
+            'cola': COLA_TRABAJOS,
+            'en_cola': en_cola,
+            'en_curso': en_curso,
+            'enviados': self._enviados,
+            'completados': self._completados,
+            'fallidos': self._fallidos,
+        }
+
+
+_despachador = None
+_despachador_lock = threading.Lock()
+
+def obtener_despachador():
+    """
+    Retorna el despachador de la app para COLA_TRABAJOS (None si no está
+    configurada). Con 'local' arranca además los workers en hilos.
+    """
+    global _despachador
+    if not COLA_TRABAJOS:
+        return None
+    with _despachador_lock:
+        if _despachador is None:
+            cola = crear_cola(COLA_TRABAJOS, servidor=True)
+            if COLA_TRABAJOS == 'local':
+                from .worker import iniciar_workers
+                iniciar_workers(cola)
+            _despachador = Despachador(cola)
+        return _despachador
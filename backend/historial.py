@@ -0,0 +1,175 @@
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from urllib.parse import urlsplit, urlunsplit
+from .cache import normalizar_consulta
+
+# Historial de precios en SQLite (modo WAL: las lecturas no esperan a la escritura)
+HISTORIAL_DB = os.environ.get(
+    'HISTORIAL_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historial_precios.db')
+)
+HISTORIAL_LOTE = int(os.environ.get('HISTORIAL_LOTE', 500))  # Filas por INSERT en bloque
+HISTORIAL_INTERVALO = float(os.environ.get('HISTORIAL_INTERVALO', 1.0))  # Segundos máximos antes de escribir un lote
+HISTORIAL_COLA_MAX = int(os.environ.get('HISTORIAL_COLA_MAX', 1000))  # Búsquedas en espera de escribirse
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS precios (
+    id INTEGER PRIMARY KEY,
+    tienda TEXT NOT NULL,
+    link TEXT NOT NULL,
+    nombre TEXT,
+    precio REAL NOT NULL,
+    descuento INTEGER,
+    consulta TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_precios_tienda_link ON precios (tienda, link, timestamp);
+CREATE INDEX IF NOT EXISTS idx_precios_consulta_timestamp ON precios (consulta, timestamp);
+"""
+
+_FIN = object()
+
+
+def canonizar_link(link):
+    """Link sin parámetros ni fragmento, host en minúsculas y sin "/" final (el mismo producto, un solo link)."""
+    partes = urlsplit(link or '')
+    return urlunsplit((partes.scheme, partes.netloc.lower(), partes.path.rstrip('/') or '/', '', ''))
+
+
+class HistorialPrecios:
+    """
+    Guarda cada producto scrapeado (tienda, link canónico, nombre, precio,
+    descuento, consulta y hora). `registrar` solo encola: un hilo escritor
+    junta las filas y las inserta en bloque, así la petición nunca espera al
+    disco. Si la cola está llena el lote se descarta y se cuenta.
+    """
+
+    def __init__(self, ruta=HISTORIAL_DB):
+        self.ruta = ruta
+        self._cola = queue.Queue(maxsize=HISTORIAL_COLA_MAX)
+        self._escritas = 0
+        self._lotes = 0
+        self._descartadas = 0
+        self._errores = 0
+        conexion = self._conectar()
+        try:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.executescript(_ESQUEMA)
+        finally:
+            conexion.close()
+        self._hilo = threading.Thread(target=self._escribir, name='historial-precios', daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        conexion.row_factory = sqlite3.Row
+        return conexion
+
+    def _consultar(self, sql, parametros):
+        # Una conexión por lectura: con WAL los lectores no bloquean al escritor
+        conexion = self._conectar()
+        try:
+            return [dict(fila) for fila in conexion.execute(sql, parametros).fetchall()]
+        finally:
+            conexion.close()
+
+    def registrar(self, consulta, productos):
+        """Encola los productos de una búsqueda sin bloquear."""
+        if not productos:
+            return
+        ahora = time.time()
+        consulta = normalizar_consulta(consulta)
+        filas = [
+            (p['tienda'], canonizar_link(p['link']), p.get('nombre'), p['precio'], p.get('descuento'), consulta, ahora)
+            for p in productos if p.get('link') and p.get('precio') is not None
+        ]
+        try:
+            self._cola.put_nowait(filas)
+        except queue.Full:
+            self._descartadas += len(filas)
+
+    def _escribir(self):
+        conexion = self._conectar()
+        conexion.execute('PRAGMA synchronous=NORMAL')  # Suficiente con WAL; evita un fsync por lote
+        terminar = False
+        while not terminar:
+            lote = []
+            limite = None
+            # Juntar filas hasta completar el lote o hasta que pase HISTORIAL_INTERVALO desde la primera
+            while len(lote) < HISTORIAL_LOTE:
+                espera = None if limite is None else max(0.0, limite - time.time())
+                try:
+                    filas = self._cola.get(timeout=espera)
+                except queue.Empty:
+                    break
+                if filas is _FIN:
+                    terminar = True
+                    break
+                lote.extend(filas)
+                if limite is None:
+                    limite = time.time() + HISTORIAL_INTERVALO
+
+            if not lote:
+                continue
+            try:
+                with conexion:
+                    conexion.executemany(
+                        'INSERT INTO precios (tienda, link, nombre, precio, descuento, consulta, timestamp) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)', lote
+                    )
+                self._escritas += len(lote)
+                self._lotes += 1
+            except sqlite3.Error as e:
+                self._errores += 1
+                print(f"Historial: error escribiendo {len(lote)} filas: {e}")
+        conexion.close()
+
+    def cerrar(self, timeout=5):
+        """Escribe lo pendiente y detiene el hilo escritor."""
+        if self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join(timeout)
+
+    def historial(self, tienda, link, dias=None):
+        """Precios registrados de un producto, del más antiguo al más reciente."""
+        desde = time.time() - dias * 86400 if dias else 0
+        return self._consultar(
+            'SELECT timestamp, precio, descuento, nombre FROM precios '
+            'WHERE tienda = ? AND link = ? AND timestamp >= ? ORDER BY timestamp',
+            (tienda, canonizar_link(link), desde)
+        )
+
+    def minimos_por_tienda(self, consulta, dias=7):
+        """Precio más bajo visto en cada tienda para la consulta en los últimos `dias`, con su producto."""
+        # En SQLite las columnas sueltas junto a MIN() toman los valores de la fila del mínimo
+        return self._consultar(
+            'SELECT tienda, MIN(precio) AS precio, link, nombre, descuento, timestamp FROM precios '
+            'WHERE consulta = ? AND timestamp >= ? GROUP BY tienda ORDER BY precio',
+            (normalizar_consulta(consulta), time.time() - dias * 86400)
+        )
+
+    def estadisticas(self):
+        return {
+            'ruta': self.ruta,
+            'pendientes': self._cola.qsize(),
+            'escritas': self._escritas,
+            'lotes': self._lotes,
+            'descartadas': self._descartadas,
+            'errores': self._errores,
+        }
+
+
+_historial = None
+_historial_lock = threading.Lock()
+
+def obtener_historial():
+    """Retorna el historial de precios compartido por todo el proceso (crea la base la primera vez)."""
+    global _historial
+    with _historial_lock:
+        if _historial is None:
+            _historial = HistorialPrecios()
+        return _historial
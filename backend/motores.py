@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import Future
+from .scrapping.ripley import buscar_en_ripley
+from .scrapping.falabella import buscar_en_falabella
+from .scrapping.oechsle import buscar_en_oechsle
+from .scrapping.metro import buscar_en_metro
+from .scrapping.tailoy import buscar_en_tailoy
+from .scrapping.hiraoka import buscar_en_hiraoka
+from .scrapping.plazavea import buscar_en_plazavea
+from .scrapping.estilos import buscar_en_estilos
+from .scrapping.realplaza import buscar_en_realplaza
+from .scrapping.ripley_playwright import buscar_en_ripley_playwright
+from .scrapping.falabella_playwright import buscar_en_falabella_playwright
+from .scrapping.oechsle_playwright import buscar_en_oechsle_playwright
+from .scrapping.metro_playwright import buscar_en_metro_playwright
+from .scrapping.tailoy_playwright import buscar_en_tailoy_playwright
+from .scrapping.hiraoka_playwright import buscar_en_hiraoka_playwright
+from .scrapping.plazavea_playwright import buscar_en_plazavea_playwright
+from .scrapping.estilos_playwright import buscar_en_estilos_playwright
+from .scrapping.realplaza_playwright import buscar_en_realplaza_playwright
+from .scrapping.vtex_api import (
+    buscar_en_metro_api, buscar_en_plazavea_api, buscar_en_oechsle_api
+)
+from .scrapping.html_estatico import buscar_en_tailoy_html, buscar_en_hiraoka_html
+from .scrapping.playwright_runtime import obtener_runtime
+from .scrapping.control_busqueda import activar
+from .scrapping.metricas import contar, registrar_busqueda, ERRORES
+
+# Motores disponibles por tienda. Las funciones async corren como tareas en el
+# loop compartido de Playwright; las síncronas (API HTTP, HTML estático, Selenium)
+# en el ThreadPoolExecutor.
+TIENDAS = {
+    'ripley': {
+        'playwright': buscar_en_ripley_playwright,
+        'selenium': buscar_en_ripley,
+    },
+    'falabella': {
+        'playwright': buscar_en_falabella_playwright,
+        'selenium': buscar_en_falabella,
+    },
+    'oechsle': {
+        'api': buscar_en_oechsle_api,
+        'playwright': buscar_en_oechsle_playwright,
+        'selenium': buscar_en_oechsle,
+    },
+    'metro': {
+        'api': buscar_en_metro_api,
+        'playwright': buscar_en_metro_playwright,
+        'selenium': buscar_en_metro,
+    },
+    'tailoy': {
+        'html': buscar_en_tailoy_html,
+        'playwright': buscar_en_tailoy_playwright,
+        'selenium': buscar_en_tailoy,
+    },
+    'hiraoka': {
+        'html': buscar_en_hiraoka_html,
+        'playwright': buscar_en_hiraoka_playwright,
+        'selenium': buscar_en_hiraoka,
+    },
+    'plazavea': {
+        'api': buscar_en_plazavea_api,
+        'playwright': buscar_en_plazavea_playwright,
+        'selenium': buscar_en_plazavea,
+    },
+    'estilos': {
+        'playwright': buscar_en_estilos_playwright,
+        'selenium': buscar_en_estilos,
+    },
+    'realplaza': {
+        'playwright': buscar_en_realplaza_playwright,
+        'selenium': buscar_en_realplaza,
+    },
+}
+
+# Tiendas consultadas por /buscar (configurable con TIENDAS_ACTIVAS=ripley,metro,...)
+TIENDAS_ACTIVAS = [
+    tienda.strip() for tienda in os.environ.get('TIENDAS_ACTIVAS', 'ripley,falabella,oechsle').split(',')
+    if tienda.strip() in TIENDAS
+]
+
+# Orden de preferencia cuando no hay configuración específica: primero la API
+# HTTP y el HTML estático (sin navegador), luego Playwright y por último Selenium
+ORDEN_MOTORES = ['api', 'html', 'playwright', 'selenium']
+MOTORES_SIN_NAVEGADOR = ('api', 'html')
+
+def motores_de(tienda):
+    """
+    Retorna los motores a probar para una tienda, en orden.
+    El motor preferido se configura con MOTOR_<TIENDA> (ej: MOTOR_FALABELLA=selenium)
+    o globalmente con MOTOR_SCRAPING; el resto queda como fallback.
+    """
+    disponibles = TIENDAS[tienda]
+    preferido = os.environ.get(f'MOTOR_{tienda.upper()}', os.environ.get('MOTOR_SCRAPING'))
+    orden = [preferido] if preferido in disponibles else []
+    orden += [motor for motor in ORDEN_MOTORES if motor in disponibles and motor not in orden]
+    return orden
+
+def usa_navegador(tienda):
+    """True si el motor preferido de la tienda abre un navegador (Playwright o Selenium)."""
+    return motores_de(tienda)[0] not in MOTORES_SIN_NAVEGADOR
+
+def puede_usar_navegador(tienda):
+    """True si algún motor de la tienda, incluidos los de fallback, abre un navegador."""
+    return any(motor not in MOTORES_SIN_NAVEGADOR for motor in motores_de(tienda))
+
+def _ejecutar(funcion, producto, control, tienda):
+    # El control queda activo en el hilo para que el pool de drivers lo asocie
+    # al navegador prestado (el gobernador corta esta búsqueda si se excede)
+    with activar(control, tienda):
+        return funcion(producto, control=control)
+
+def _lanzar(funcion, producto, executor, control=None, tienda=None):
+    """Lanza un motor y retorna un concurrent.futures.Future con sus resultados."""
+    if asyncio.iscoroutinefunction(funcion):
+        return obtener_runtime().enviar(funcion(producto, control=control))
+    return executor.submit(_ejecutar, funcion, producto, control, tienda)
+
+def enviar_tienda(tienda, producto, executor, control=None, admitir=None):
+    """
+    Lanza la búsqueda de una tienda con su motor preferido y, si falla,
+    con el siguiente (ej: Playwright -> Selenium). Retorna un Future que
+    se resuelve con la lista de productos; `future.motor` indica el motor usado
+    y `future.control` los límites (ControlBusqueda) pasados a los scrapers.
+    Si el deadline ya venció no se prueba el siguiente motor.
+
+    `admitir(lanzar)`, si se indica, envuelve cada motor con navegador (el
+    preferido o un fallback tras fallar la API): debe llamar a `lanzar()`
+    cuando haya cupo y retornar un Future con su resultado (ej:
+    Admision.solicitar). Su `future.turno` queda en el Future retornado.
+    """
+    resultado = Future()
+    resultado.control = control
+    motores = motores_de(tienda)
+    inicio = time.time()
+
+    def intentar(i):
+        resultado.motor = motores[i]
+        lanzar = lambda: _lanzar(TIENDAS[tienda][motores[i]], producto, executor, control, tienda)
+        try:
+            if admitir is not None and motores[i] not in MOTORES_SIN_NAVEGADOR:
+                future = admitir(lanzar)
+                resultado.turno = getattr(future, 'turno', None)
+            else:
+                future = lanzar()
+        except Exception as e:
+            siguiente(i, e)
+            return
+        future.add_done_callback(lambda f: terminado(i, f))
+
+    def terminado(i, future):
+        error = future.exception() if not future.cancelled() else RuntimeError("Búsqueda cancelada")
+        if error is None:
+            parcial = control is not None and control.parcial
+            registrar_busqueda(tienda, motores[i], 'parcial' if parcial else 'ok', time.time() - inicio)
+            resultado.set_result(future.result())
+        else:
+            siguiente(i, error)
+
+    def siguiente(i, error):
+        logging.error(f"Error en {tienda} con motor {motores[i]}: {error}")
+        contar(ERRORES, tienda, control=control)
+        if i + 1 < len(motores) and not (control is not None and control.vencido()):
+            intentar(i + 1)
+        else:
+            registrar_busqueda(tienda, motores[i], 'error', time.time() - inicio)
+            resultado.set_exception(error)
+
+    intentar(0)
+    return resultado
@@ -0,0 +1,237 @@
+import os
+import sys
+import hmac
+import json
+import dis
+import time
+import secrets
+import threading
+from collections import Counter, OrderedDict
+from .scrapping.control_busqueda import busquedas_por_hilo
+
+# Perfilado a pedido de /buscar: con PERFILADO=1 y PERFILADO_TOKEN, una petición
+# con el token (cabecera X-Perfilado-Token o parámetro `perfilar`) corre bajo un
+# muestreador de pilas que recorre el hilo de la petición, los hilos de scraping
+# que trabajan para sus tiendas y el loop de Playwright. El resultado queda en
+# memoria y se descarga de /debug/perfiles en formato de pilas colapsadas.
+PERFILADO_ACTIVO = os.environ.get('PERFILADO', '0').lower() in ('1', 'true', 'si', 'sí')
+PERFILADO_TOKEN = os.environ.get('PERFILADO_TOKEN', '')
+PERFILADO_HZ = float(os.environ.get('PERFILADO_HZ', 100))  # Muestras por segundo
+PERFILADO_MAX = int(os.environ.get('PERFILADO_MAX', 20))  # Perfiles guardados (los más viejos se descartan)
+PERFILADO_DURACION_MAX = float(os.environ.get('PERFILADO_DURACION_MAX', 300))  # Tope de segundos por perfil
+PROFUNDIDAD_MAX = 128
+HILO_PLAYWRIGHT = 'playwright-runtime'  # Nombre del hilo de PlaywrightRuntime
+NATIVO = '[nativo]'
+
+# Funciones hoja que indican que el hilo está esperando (al navegador, a la red
+# o a otro hilo) y no ejecutando Python
+ESPERAS = frozenset((
+    'wait', 'sleep', 'select', 'poll', 'epoll', 'recv', 'recv_into', 'readinto', 'readline',
+    'acquire', '_wait_for_tstate_lock', 'accept', 'connect', 'getaddrinfo', 'create_connection',
+    '_run_once', 'run_forever', 'get',
+))
+
+
+def token_valido(token):
+    """True si el perfilado está activo y `token` coincide con PERFILADO_TOKEN."""
+    if not PERFILADO_ACTIVO or not PERFILADO_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), PERFILADO_TOKEN.encode('utf-8'))
+
+def _etiqueta(frame):
+    codigo = frame.f_code
+    return f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}"
+
+def _en_llamada(frame):
+    """True si el frame está detenido en una llamada: si es la hoja, corre código C (sleep, socket, lxml...)."""
+    try:
+        return dis.opname[frame.f_code.co_code[frame.f_lasti]].startswith('CALL')
+    except IndexError:
+        return False
+
+def _pila(frame):
+    """Pila del frame en orden raíz -> hoja, como etiquetas archivo:función."""
+    marcos = [NATIVO] if _en_llamada(frame) else []
+    while frame is not None and len(marcos) < PROFUNDIDAD_MAX:
+        marcos.append(_etiqueta(frame))
+        frame = frame.f_back
+    marcos.reverse()
+    return tuple(marcos)
+
+
+class Perfil:
+    """
+    Muestras de pila de una petición a /buscar. Cada muestra se etiqueta con
+    el hilo de donde vino: 'peticion' (orquestación, agrupación, JSON),
+    'scraper:<tienda>' (API, HTML estático, Selenium) o 'playwright' (el loop
+    compartido, que puede estar atendiendo también otras búsquedas).
+    """
+
+    def __init__(self, producto, hz=PERFILADO_HZ):
+        self.id = secrets.token_urlsafe(9)
+        self.producto = producto
+        self.hz = hz
+        self.inicio = None
+        self.fin = None
+        self.muestras = Counter()  # (hilo, pila) -> cantidad
+        self.tiendas = {}
+        self._controles = {}  # id(control) -> tienda
+        self._hilos = {}  # ident -> etiqueta fija (petición, playwright)
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def seguir(self, control, tienda):
+        """Incluye los hilos que corren la búsqueda de `tienda` (los que activaron su control)."""
+        if control is not None:
+            self._controles[id(control)] = tienda
+
+    def seguir_hilo(self, ident, etiqueta):
+        if ident is not None:
+            self._hilos[ident] = etiqueta
+
+    def anotar_tienda(self, tienda, **datos):
+        """Tiempo, motor, estado y etapas de una tienda, para leer el perfil junto a ellos."""
+        self.tiendas[tienda] = datos
+
+    def iniciar(self):
+        """Empieza a muestrear; el hilo que llama queda etiquetado como la petición."""
+        self.seguir_hilo(threading.get_ident(), 'peticion')
+        self.inicio = time.time()
+        self._hilo = threading.Thread(target=self._muestrear, name=f'perfil-{self.id}', daemon=True)
+        self._hilo.start()
+
+    def terminar(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2)
+        self.fin = time.time()
+
+    def _objetivos(self):
+        objetivos = dict(self._hilos)
+        # El loop de Playwright puede arrancar a mitad de la búsqueda
+        for hilo in threading.enumerate():
+            if hilo.name == HILO_PLAYWRIGHT:
+                objetivos.setdefault(hilo.ident, 'playwright')
+        for ident, (control, tienda) in busquedas_por_hilo().items():
+            if id(control) in self._controles:
+                objetivos.setdefault(ident, f'scraper:{tienda or self._controles[id(control)]}')
+        return objetivos
+
+    def _muestrear(self):
+        intervalo = 1.0 / self.hz
+        limite = time.time() + PERFILADO_DURACION_MAX
+        propio = threading.get_ident()
+        while not self._detener.wait(intervalo) and time.time() < limite:
+            objetivos = self._objetivos()
+            marcos = sys._current_frames()
+            for ident, etiqueta in objetivos.items():
+                frame = marcos.get(ident)
+                if frame is not None and ident != propio:
+                    self.muestras[(etiqueta, _pila(frame))] += 1
+            del marcos
+
+    def colapsado(self):
+        """Pilas colapsadas (hilo;raíz;...;hoja cantidad), la entrada de flamegraph.pl y speedscope."""
+        lineas = [
+            ';'.join((hilo,) + pila) + f' {cantidad}'
+            for (hilo, pila), cantidad in sorted(self.muestras.items(), key=lambda x: -x[1])
+        ]
+        return '\n'.join(lineas) + '\n'
+
+    def resumen(self, top=20):
+        """
+        Muestras por hilo separadas en Python ejecutando, esperando (locks,
+        sockets, sleep del loop) u otro código C, y las funciones en las que
+        más se ejecutó Python.
+        """
+        por_hilo = {}
+        hojas = Counter()
+        for (hilo, pila), cantidad in self.muestras.items():
+            nativo = bool(pila) and pila[-1] == NATIVO
+            marcos = pila[:-1] if nativo else pila
+            hoja = marcos[-1] if marcos else '?'
+            if hoja.rsplit(':', 1)[-1] in ESPERAS:
+                tipo = 'espera'
+            else:
+                tipo = 'nativo' if nativo else 'python'
+            cuentas = por_hilo.setdefault(hilo, {'python': 0, 'nativo': 0, 'espera': 0})
+            cuentas[tipo] += cantidad
+            if tipo == 'python':
+                hojas[hoja] += cantidad
+        return {
+            'hilos': por_hilo,
+            'python_mas_frecuente': [
+                {'funcion': hoja, 'muestras': cantidad, 'segundos': round(cantidad / self.hz, 2)}
+                for hoja, cantidad in hojas.most_common(top)
+            ],
+        }
+
+    def metadatos(self):
+        return {
+            'id': self.id,
+            'producto': self.producto,
+            'inicio': self.inicio,
+            'duracion': round((self.fin or time.time()) - self.inicio, 2) if self.inicio else None,
+            'en_curso': self.fin is None,
+            'hz': self.hz,
+            'muestras': sum(self.muestras.values()),
+            'tiendas': self.tiendas,
+        }
+
+
+class AlmacenPerfiles:
+    """Últimos PERFILADO_MAX perfiles, en memoria."""
+
+    def __init__(self, maximo=PERFILADO_MAX):
+        self.maximo = maximo
+        self._perfiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def crear(self, producto):
+        perfil = Perfil(producto)
+        with self._lock:
+            self._perfiles[perfil.id] = perfil
+            while len(self._perfiles) > self.maximo:
+                self._perfiles.popitem(last=False)
+        return perfil
+
+    def obtener(self, id):
+        with self._lock:
+            return self._perfiles.get(id)
+
+    def listar(self):
+        with self._lock:
+            return [perfil.metadatos() for perfil in reversed(self._perfiles.values())]
+
+
+def perfilar(perfil, eventos):
+    """
+    Itera `eventos` (el generador NDJSON de /buscar) con el muestreador
+    corriendo, y anota en el perfil el tiempo y las etapas que reporta el
+    evento de progreso de cada tienda.
+    """
+    perfil.iniciar()
+    try:
+        for evento in eventos:
+            if '"progress"' in evento:
+                datos = json.loads(evento)
+                perfil.anotar_tienda(datos['store'].lower(), tiempo=datos['tiempo'], status=datos['status'],
+                                     motor=datos['motor'], cache=datos['cache'], resultados=datos['resultados'],
+                                     etapas=datos['etapas'], contadores=datos['contadores'])
+            yield evento
+    finally:
+        perfil.terminar()
+        print(f"Perfil {perfil.id} de '{perfil.producto}': {sum(perfil.muestras.values())} muestras "
+              f"en {perfil.fin - perfil.inicio:.1f}s")
+
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+def obtener_almacen_perfiles():
+    """Retorna el almacén de perfiles compartido por todo el proceso."""
+    global _almacen
+    with _almacen_lock:
+        if _almacen is None:
+            _almacen = AlmacenPerfiles()
+        return _almacen
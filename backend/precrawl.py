@@ -0,0 +1,222 @@
+import os
+import time
+import threading
+from collections import Counter, deque
+from .cache import normalizar_consulta
+
+# Pre-crawl en segundo plano de las consultas más buscadas, para que /buscar
+# las responda desde el cache. Se activa con PRECRAWL=1.
+PRECRAWL_ACTIVO = os.environ.get('PRECRAWL', '').lower() in ('1', 'true', 'si')
+PRECRAWL_CONSULTAS = [c.strip() for c in os.environ.get('PRECRAWL_CONSULTAS', '').split(',') if c.strip()]
+PRECRAWL_TOP = int(os.environ.get('PRECRAWL_TOP', 10))  # Consultas populares que se mantienen calientes
+PRECRAWL_MIN_BUSQUEDAS = float(os.environ.get('PRECRAWL_MIN_BUSQUEDAS', 2))
+PRECRAWL_CADENCIA = float(os.environ.get('PRECRAWL_CADENCIA', 600))  # Segundos entre crawls (PRECRAWL_CADENCIA_<TIENDA>)
+PRECRAWL_CONCURRENCIA = int(os.environ.get('PRECRAWL_CONCURRENCIA', 1))  # Búsquedas de fondo simultáneas
+PRECRAWL_PRESUPUESTO = float(os.environ.get('PRECRAWL_PRESUPUESTO', 900))  # Segundos de scraping de fondo por hora
+PRECRAWL_TICK = float(os.environ.get('PRECRAWL_TICK', 15))
+PRECRAWL_VIDA_MEDIA = float(os.environ.get('PRECRAWL_VIDA_MEDIA', 3600))  # La popularidad se reduce a la mitad en este tiempo
+
+VENTANA_PRESUPUESTO = 3600
+
+
+class EstadoCrawl:
+    """Último crawl de fondo de una consulta en una tienda."""
+
+    def __init__(self):
+        self.inicio = None
+        self.fin = None
+        self.exito = None  # Hora del último crawl con resultados
+        self.duracion = None
+        self.resultados = 0
+        self.error = None
+        self.en_curso = False
+
+    def a_dict(self, ahora, cadencia):
+        return {
+            'en_curso': self.en_curso,
+            'duracion': round(self.duracion, 2) if self.duracion is not None else None,
+            'resultados': self.resultados,
+            'frescura': round(ahora - self.exito, 1) if self.exito else None,  # Segundos desde el último crawl bueno
+            'proximo': round(max(0.0, self.fin + cadencia - ahora), 1) if self.fin else 0.0,
+            'error': self.error,
+        }
+
+
+class Planificador:
+    """
+    Mantiene la lista de consultas calientes (las configuradas más las más
+    buscadas, con popularidad que decae) y las vuelve a buscar en cada tienda
+    cuando vence su cadencia. Las búsquedas pasan por `lanzar(tienda, consulta)`,
+    la misma función que usa /buscar (single-flight, cache e historial), así
+    que un crawl de fondo y una búsqueda interactiva iguales se unen en una.
+    El trabajo de fondo está acotado por PRECRAWL_CONCURRENCIA búsquedas a la
+    vez y PRECRAWL_PRESUPUESTO segundos de scraping por hora.
+    """
+
+    def __init__(self, tiendas, lanzar):
+        self.tiendas = list(tiendas)
+        self.lanzar = lanzar
+        self._popularidad = Counter()
+        self._nombres = {}  # consulta normalizada -> texto tal como se buscó
+        self._estados = {}  # (consulta, tienda) -> EstadoCrawl
+        self._consumo = deque()  # (fin, duracion) de los crawls de la última hora
+        self._en_curso = 0
+        self._ultimo_decaimiento = time.time()
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def cadencia_de(self, tienda):
+        return float(os.environ.get(f'PRECRAWL_CADENCIA_{tienda.upper()}', PRECRAWL_CADENCIA))
+
+    def anotar(self, consulta):
+        """Cuenta una búsqueda interactiva para la popularidad."""
+        clave = normalizar_consulta(consulta)
+        if not clave:
+            return
+        with self._lock:
+            self._popularidad[clave] += 1
+            self._nombres.setdefault(clave, consulta)
+
+    def consultas_calientes(self):
+        with self._lock:
+            populares = [c for c, n in self._popularidad.most_common(PRECRAWL_TOP) if n >= PRECRAWL_MIN_BUSQUEDAS]
+        configuradas = [normalizar_consulta(c) for c in PRECRAWL_CONSULTAS]
+        return list(dict.fromkeys(configuradas + populares))
+
+    def _decaer(self, ahora):
+        if ahora - self._ultimo_decaimiento < PRECRAWL_VIDA_MEDIA:
+            return
+        self._ultimo_decaimiento = ahora
+        olvidadas = set()
+        for clave in list(self._popularidad):
+            self._popularidad[clave] /= 2
+            if self._popularidad[clave] < 0.5:
+                del self._popularidad[clave]
+                olvidadas.add(clave)
+        # Las consultas que dejaron de buscarse se olvidan del todo (salvo las configuradas)
+        olvidadas -= {normalizar_consulta(c) for c in PRECRAWL_CONSULTAS}
+        for clave in olvidadas:
+            self._nombres.pop(clave, None)
+        for consulta, tienda in list(self._estados):
+            if consulta in olvidadas and not self._estados[(consulta, tienda)].en_curso:
+                del self._estados[(consulta, tienda)]
+
+    def _consumido(self, ahora):
+        while self._consumo and ahora - self._consumo[0][0] > VENTANA_PRESUPUESTO:
+            self._consumo.popleft()
+        return sum(duracion for _, duracion in self._consumo)
+
+    def _pendientes(self, calientes, ahora):
+        """(consulta, tienda) vencidos, primero los que llevan más tiempo sin crawl."""
+        vencidos = []
+        for consulta in calientes:
+            for tienda in self.tiendas:
+                estado = self._estados.get((consulta, tienda))
+                if estado is None:
+                    vencidos.append((0.0, consulta, tienda))
+                elif not estado.en_curso and ahora - (estado.fin or 0) >= self.cadencia_de(tienda):
+                    vencidos.append((estado.fin or 0.0, consulta, tienda))
+        return [(consulta, tienda) for _, consulta, tienda in sorted(vencidos)]
+
+    def tick(self):
+        """Lanza los crawls vencidos que quepan en la concurrencia y el presupuesto."""
+        ahora = time.time()
+        calientes = self.consultas_calientes()
+        with self._lock:
+            self._decaer(ahora)
+            if self._consumido(ahora) >= PRECRAWL_PRESUPUESTO:
+                return
+            lanzar = []
+            for consulta, tienda in self._pendientes(calientes, ahora):
+                if self._en_curso >= PRECRAWL_CONCURRENCIA:
+                    break
+                estado = self._estados.setdefault((consulta, tienda), EstadoCrawl())
+                estado.en_curso = True
+                estado.inicio = ahora
+                self._en_curso += 1
+                lanzar.append((consulta, tienda, estado))
+
+        for consulta, tienda, estado in lanzar:
+            texto = self._nombres.get(consulta, consulta)
+            print(f"Pre-crawl: {tienda} '{texto}'")
+            try:
+                trabajo, _ = self.lanzar(tienda, texto)
+            except Exception as e:
+                self._terminar(estado, None, e)
+                continue
+            trabajo.future.add_done_callback(lambda f, estado=estado: self._terminar(estado, f))
+
+    def _terminar(self, estado, future, error=None):
+        ahora = time.time()
+        resultados = None
+        if future is not None:
+            if future.cancelled():
+                error = RuntimeError('Búsqueda cancelada')
+            else:
+                error = future.exception()
+                resultados = None if error else future.result()
+        with self._lock:
+            estado.en_curso = False
+            estado.fin = ahora
+            estado.duracion = ahora - estado.inicio
+            estado.error = str(error) if error else None
+            estado.resultados = len(resultados) if resultados else 0
+            if resultados:
+                estado.exito = ahora
+            self._consumo.append((ahora, estado.duracion))
+            self._en_curso -= 1
+
+    def _bucle(self):
+        while not self._detener.wait(PRECRAWL_TICK):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Pre-crawl: error en el planificador: {e}")
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name='precrawl', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def estadisticas(self):
+        """Duración, resultados y frescura del último crawl de cada consulta caliente, por tienda."""
+        ahora = time.time()
+        calientes = self.consultas_calientes()
+        with self._lock:
+            consultas = {
+                self._nombres.get(consulta, consulta): {
+                    'popularidad': round(self._popularidad.get(consulta, 0), 1),
+                    'tiendas': {
+                        tienda: self._estados[(consulta, tienda)].a_dict(ahora, self.cadencia_de(tienda))
+                        for tienda in self.tiendas if (consulta, tienda) in self._estados
+                    },
+                }
+                for consulta in calientes
+            }
+            return {
+                'activo': self._hilo is not None and not self._detener.is_set(),
+                'en_curso': self._en_curso,
+                'concurrencia': PRECRAWL_CONCURRENCIA,
+                'presupuesto': PRECRAWL_PRESUPUESTO,
+                'consumido_ultima_hora': round(self._consumido(ahora), 1),
+                'consultas': consultas,
+            }
+
+
+_planificador = None
+_planificador_lock = threading.Lock()
+
+def obtener_planificador(tiendas=None, lanzar=None):
+    """
+    Retorna el planificador de pre-crawl compartido por todo el proceso. La
+    primera llamada debe pasar las tiendas y la función que lanza búsquedas.
+    """
+    global _planificador
+    with _planificador_lock:
+        if _planificador is None:
+            _planificador = Planificador(tiendas, lanzar)
+        return _planificador
@@ -0,0 +1,169 @@
+import re
+import math
+from functools import lru_cache
+import numpy as np
+
+# BM25 (k1, b) y pesos de la combinación final, todos en escala 0..1
+BM25_K1 = 1.2
+BM25_B = 0.75
+PESO_TEXTO = 0.7
+PESO_DESCUENTO = 0.2
+PESO_PRECIO = 0.1
+PRESUPUESTO_MS = 50  # Tope para rankear y ordenar 10k productos (escala lineal con la cantidad)
+
+STOPWORDS = frozenset((
+    'de', 'del', 'la', 'las', 'el', 'los', 'y', 'o', 'con', 'sin', 'para', 'por',
+    'en', 'un', 'una', 'unos', 'unas', 'al', 'a', 'x',
+))
+
+_PALABRAS = re.compile(r'[0-9a-zñ]+')
+_VOCALES = 'aeiou'
+# Tildes a vocal simple con str.translate (la ñ se conserva): mucho más rápido
+# que normalizar con unicodedata nombre por nombre
+_CON_TILDE, _SIN_TILDE = 'áàäâãéèëêíìïîóòöôõúùüûç', 'aaaaaeeeeiiiiooooouuuuc'
+_SIN_TILDES = str.maketrans(_CON_TILDE, _SIN_TILDE)
+# La misma tabla sobre códigos de carácter, para plegar todos los nombres a la vez con numpy
+_SIN_TILDES_CODIGOS = np.arange(256, dtype=np.uint32)
+_SIN_TILDES_CODIGOS[[ord(c) for c in _CON_TILDE]] = [ord(c) for c in _SIN_TILDE]
+
+
+@lru_cache(maxsize=20000)
+def _raiz(token):
+    """
+    Quita el plural en español ("celulares" -> "celular", "laptops" -> "laptop")
+    y la -e final tras consonante, para que singular y plural den la misma
+    raíz cuando el plural es en -es pero el singular termina en -e
+    ("iphone" e "iphones" -> "iphon", "cable" y "cables" -> "cabl").
+    """
+    if len(token) > 4 and token.endswith('es') and token[-3] not in _VOCALES:
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith('s') and not token[-2].isdigit():
+        token = token[:-1]
+    if len(token) > 3 and token.endswith('e') and token[-2].isalpha() and token[-2] not in _VOCALES:
+        token = token[:-1]
+    return token
+
+def tokenizar(texto):
+    """Minúsculas, sin tildes (conservando la ñ), sin stopwords y en singular."""
+    texto = (texto or '').lower().translate(_SIN_TILDES)
+    return [_raiz(t) for t in _PALABRAS.findall(texto) if t not in STOPWORDS]
+
+
+def _formas(terminos):
+    """Formas de cada término que _raiz lleva a él ("iphon" -> iphon, iphone, iphones...)."""
+    return {
+        forma: termino
+        for termino in terminos
+        for forma in (termino, termino + 's', termino + 'es', termino + 'e')
+        if _raiz(forma) == termino
+    }
+
+def _apariciones(palabra, codigos, inicios, longitudes):
+    """Índices (en `inicios`) de las palabras del texto iguales a `palabra`."""
+    indices = np.flatnonzero(longitudes == len(palabra))
+    for k, caracter in enumerate(palabra):
+        indices = indices[codigos[inicios[indices] + k] == ord(caracter)]
+    return indices
+
+def _frecuencias(nombres, terminos):
+    """
+    Retorna (largos, {termino: frecuencias}): arreglos con una posición por
+    nombre, con la cantidad de palabras sin stopwords y las apariciones de
+    cada término de la consulta. Los nombres se unen en un solo arreglo de
+    códigos de carácter (lower una vez, tildes plegadas con numpy) donde se
+    ubican todas las palabras; las stopwords y las formas de la consulta se
+    comparan carácter a carácter contra todas las palabras a la vez, sin
+    recorrer nombre por nombre en Python.
+    """
+    nombres = [nombre.replace('\0', ' ') for nombre in nombres]
+    n = len(nombres)
+    codigos = np.frombuffer('\0'.join(nombres).lower().encode('utf-32-le'), dtype=np.uint32)
+    codigos = np.where(codigos < 256, _SIN_TILDES_CODIGOS[np.minimum(codigos, 255)], codigos)
+
+    # Palabras: tramos de caracteres de _PALABRAS; cada una se asigna a su nombre por los separadores
+    letra = (((codigos >= ord('a')) & (codigos <= ord('z'))) | ((codigos >= ord('0')) & (codigos <= ord('9')))
+             | (codigos == ord('ñ')))
+    bordes = np.diff(np.concatenate(([False], letra, [False])).astype(np.int8))
+    inicios = np.flatnonzero(bordes == 1)
+    longitudes = np.flatnonzero(bordes == -1) - inicios
+    documento = np.searchsorted(np.flatnonzero(codigos == 0), inicios)
+
+    stopwords = np.concatenate([_apariciones(palabra, codigos, inicios, longitudes) for palabra in STOPWORDS])
+    largos = np.bincount(documento, minlength=n) - np.bincount(documento[stopwords], minlength=n)
+
+    por_termino = {}
+    for forma, termino in _formas(terminos).items():
+        por_termino.setdefault(termino, []).append(_apariciones(forma, codigos, inicios, longitudes))
+    frecuencias = {
+        termino: np.bincount(documento[np.concatenate(apariciones)], minlength=n)
+        for termino, apariciones in por_termino.items()
+    }
+    return largos, frecuencias
+
+def rankear(consulta, productos):
+    """
+    Retorna copias de los productos con un campo `score` (0..1, mayor es mejor).
+    Cada nombre se tokeniza una sola vez; el texto se puntúa con BM25 contra la
+    consulta (IDF calculado sobre los propios resultados) y se combina con el
+    descuento y con el precio (más barato en escala logarítmica puntúa más).
+    """
+    if not productos:
+        return []
+    terminos = set(tokenizar(consulta))
+    largos, frecuencias = _frecuencias((p.get('nombre') or '' for p in productos), terminos)
+    n = len(productos)
+
+    largo_promedio = largos.sum() / n or 1.0
+    factor = BM25_K1 * (1 - BM25_B) + BM25_K1 * BM25_B / largo_promedio * largos
+    textos = np.zeros(n)
+    for cuentas in frecuencias.values():
+        df = np.count_nonzero(cuentas)
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        textos += idf * cuentas * (BM25_K1 + 1) / (cuentas + factor)
+
+    maximo_texto = textos.max() or 1.0
+    descuentos = np.array([min(p.get('descuento') or 0, 100) for p in productos], dtype=float)
+    precios = np.log1p(np.array([p['precio'] for p in productos], dtype=float))
+    minimo_precio, rango_precio = precios.min(), (precios.max() - precios.min()) or 1.0
+
+    scores = np.round(
+        PESO_TEXTO * textos / maximo_texto
+        + PESO_DESCUENTO * descuentos / 100
+        + PESO_PRECIO * (1 - (precios - minimo_precio) / rango_precio), 4)
+    return [{**producto, 'score': score} for producto, score in zip(productos, scores.tolist())]
+
+
+# Benchmark contra PRESUPUESTO_MS (sale con código 1 si la mediana lo excede): python -m backend.ranking [cantidad]
+if __name__ == '__main__':
+    import sys
+    import time
+    import random
+
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    marcas = ['HP', 'Lenovo', 'Samsung', 'Xiaomi', 'Asus', 'LG', 'Acer']
+    tipos = ['Laptop', 'Celular', 'Televisor', 'Audífonos', 'Monitor', 'Tablet', 'Impresora']
+    extras = ['Core i5', '8GB RAM', '256GB', 'Pantalla 15.6"', 'Bluetooth', 'Smart TV 4K', 'Negro', 'para niños']
+    random.seed(0)
+    productos = [{
+        'nombre': f"{random.choice(tipos)} {random.choice(marcas)} {' '.join(random.sample(extras, 3))}",
+        'precio': round(random.uniform(20, 6000), 2),
+        'tienda': 'benchmark',
+        'link': f'https://ejemplo.pe/{i}',
+        'imagen': None,
+        'descuento': random.choice([None, None, 10, 25, 40]),
+    } for i in range(cantidad)]
+
+    tiempos = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        rankeados = rankear('laptops HP core i5', productos)
+        rankeados.sort(key=lambda p: -p['score'])
+        tiempos.append(time.perf_counter() - inicio)
+
+    presupuesto = PRESUPUESTO_MS * cantidad / 10000
+    mediana = sorted(tiempos)[2] * 1000
+    print(f"{cantidad} productos: mejor {min(tiempos) * 1000:.1f} ms, mediana {mediana:.1f} ms "
+          f"({'dentro' if mediana <= presupuesto else 'FUERA'} del presupuesto de {presupuesto:.0f} ms)")
+    for producto in rankeados[:3]:
+        print(producto['score'], producto['nombre'], producto['precio'], producto['descuento'])
+    sys.exit(0 if mediana <= presupuesto else 1)
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import base64
+import secrets
+import threading
+from collections import OrderedDict
+from .ranking import rankear
+
+# Conjuntos de resultados guardados en el servidor para paginar sin reenviar la lista completa
+RESULTADOS_TTL = float(os.environ.get('RESULTADOS_TTL', 1800))
+RESULTADOS_MAX = int(os.environ.get('RESULTADOS_MAX', 200))
+POR_PAGINA = 16
+POR_PAGINA_MAX = 100
+VISTAS_MAX = 16  # Combinaciones de filtro y orden recordadas por conjunto
+
+PRECIO_ASC = 'precioAsc'
+PRECIO_DESC = 'precioDesc'
+DESCUENTO_DESC = 'descuentoDesc'
+RECOMENDADOS = 'recomendados'
+ORDENES = (RECOMENDADOS, PRECIO_ASC, PRECIO_DESC, DESCUENTO_DESC)
+
+
+def codificar_cursor(datos):
+    texto = json.dumps(datos, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(texto).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Retorna el dict del cursor; ValueError si no es un cursor válido."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        datos = json.loads(texto)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor inválido') from e
+    if not isinstance(datos, dict) or datos.get('o') not in ORDENES:
+        raise ValueError('Cursor inválido')
+    return datos
+
+
+class ConjuntoResultados:
+    """
+    Resultado completo de una búsqueda, rankeado una vez (campo `score`), con
+    los órdenes precalculados: para cada criterio se guarda la lista de
+    índices ya ordenada, así filtrar y paginar es un recorrido lineal sin
+    volver a ordenar. Las vistas filtradas
+    más usadas quedan en un LRU pequeño para que pasar de página sea un slice.
+    """
+
+    def __init__(self, id, consulta, productos):
+        self.id = id
+        self.consulta = consulta
+        self.productos = productos = rankear(consulta, productos)
+        self.creado = time.time()
+        claves = {
+            PRECIO_ASC: lambda i: productos[i]['precio'],
+            PRECIO_DESC: lambda i: -productos[i]['precio'],
+            DESCUENTO_DESC: lambda i: -(productos[i].get('descuento') or -1),
+            RECOMENDADOS: lambda i: -productos[i]['score'],
+        }
+        indices = range(len(productos))
+        self._ordenes = {orden: sorted(indices, key=clave) for orden, clave in claves.items()}
+        # Un producto agrupado aparece al filtrar por cualquiera de las tiendas que lo ofrecen
+        self._tiendas = [{p['tienda']} | {o['tienda'] for o in p.get('ofertas', ())} for p in productos]
+        self._vistas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _vista(self, orden, tienda, minimo, maximo):
+        clave = (orden, tienda, minimo, maximo)
+        with self._lock:
+            if clave in self._vistas:
+                self._vistas.move_to_end(clave)
+                return self._vistas[clave]
+
+        vista = [
+            i for i in self._ordenes[orden]
+            if (not tienda or tienda in self._tiendas[i])
+            and (minimo is None or self.productos[i]['precio'] >= minimo)
+            and (maximo is None or self.productos[i]['precio'] <= maximo)
+        ]
+        with self._lock:
+            self._vistas[clave] = vista
+            while len(self._vistas) > VISTAS_MAX:
+                self._vistas.popitem(last=False)
+        return vista
+
+    def pagina(self, orden=RECOMENDADOS, tienda=None, minimo=None, maximo=None, desde=0, por_pagina=POR_PAGINA):
+        """
+        Retorna una página filtrada y ordenada con los cursores opacos para
+        pedir la siguiente y la anterior (None si no hay).
+        """
+        if orden not in self._ordenes:
+            orden = RECOMENDADOS
+        por_pagina = max(1, min(por_pagina, POR_PAGINA_MAX))
+        desde = max(0, desde)
+        vista = self._vista(orden, tienda or None, minimo, maximo)
+
+        def _cursor(inicio):
+            return codificar_cursor({
+                'r': self.id, 'o': orden, 't': tienda or None, 'min': minimo, 'max': maximo,
+                'd': inicio, 'n': por_pagina,
+            })
+
+        return {
+            'resultset': self.id,
+            'items': [self.productos[i] for i in vista[desde:desde + por_pagina]],
+            'total': len(vista),
+            'pagina': desde // por_pagina + 1,
+            'paginas': -(-len(vista) // por_pagina),
+            'siguiente': _cursor(desde + por_pagina) if desde + por_pagina < len(vista) else None,
+            'anterior': _cursor(max(0, desde - por_pagina)) if desde > 0 else None,
+        }
+
+    def pagina_desde_cursor(self, cursor):
+        datos = decodificar_cursor(cursor)
+        if datos.get('r') != self.id:
+            raise ValueError('El cursor es de otro conjunto de resultados')
+        try:
+            return self.pagina(datos['o'], datos.get('t'), datos.get('min'), datos.get('max'),
+                               int(datos.get('d', 0)), int(datos.get('n', POR_PAGINA)))
+        except (TypeError, ValueError) as e:
+            raise ValueError('Cursor inválido') from e
+
+
+class AlmacenResultados:
+    """Conjuntos de resultados por id, acotados por TTL y cantidad (LRU)."""
+
+    def __init__(self, ttl=RESULTADOS_TTL, max_conjuntos=RESULTADOS_MAX):
+        self.ttl = ttl
+        self.max_conjuntos = max_conjuntos
+        self._conjuntos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, consulta, productos):
+        conjunto = ConjuntoResultados(secrets.token_urlsafe(12), consulta, productos)
+        with self._lock:
+            self._conjuntos[conjunto.id] = conjunto
+            while len(self._conjuntos) > self.max_conjuntos:
+                self._conjuntos.popitem(last=False)
+        return conjunto
+
+    def obtener(self, id):
+        """Retorna el conjunto o None si no existe o ya venció."""
+        with self._lock:
+            conjunto = self._conjuntos.get(id)
+            if conjunto is None:
+                return None
+            if time.time() - conjunto.creado > self.ttl:
+                del self._conjuntos[id]
+                return None
+            self._conjuntos.move_to_end(id)
+            return conjunto
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'conjuntos': len(self._conjuntos),
+                'max_conjuntos': self.max_conjuntos,
+                'productos': sum(len(c.productos) for c in self._conjuntos.values()),
+            }
+
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+def obtener_almacen_resultados():
+    """Retorna el almacén de conjuntos de resultados compartido por todo el proceso."""
+    global _almacen
+    with _almacen_lock:
+        if _almacen is None:
+            _almacen = AlmacenResultados()
+        return _almacen
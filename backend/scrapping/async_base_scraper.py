@@ -0,0 +1,414 @@
+import os
+import re
+import asyncio
+from abc import ABC, abstractmethod
+from .playwright_runtime import obtener_runtime
+from .bulk_extractor import extraer_con_playwright, extraer_tarjeta_playwright, EXTRACCION_MASIVA
+from . import esperas
+from .control_host import turno_async, detectar_bloqueo_playwright, HostNoDisponible
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import (
+    etapa, contar, registrar_pagina, NAVEGADOR, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION, CIERRE, ERRORES
+)
+
+class AsyncBaseScraper(ABC):
+    """
+    Versión asíncrona (Playwright) de BaseScraper.
+    Mantiene el mismo contrato (_navigate_to_search, _get_product_elements,
+    _extract_data_from_element, _go_to_next_page) pero cada búsqueda usa un
+    BrowserContext del Chromium compartido en lugar de un proceso de Chrome.
+    Todas las tiendas corren como tareas del mismo event loop.
+    Igual que BaseScraper, soporta extracción masiva con ESPEC_TARJETA.
+
+    Si la tienda es direccionable por URL (_url_pagina), la página 1 se abre
+    directo, se lee el total de páginas y el resto se descarga en paralelo en
+    pestañas del mismo contexto, hasta PAGINAS_CONCURRENTES a la vez. Además,
+    cada carga de página ocupa un turno del controlador AIMD del host, que
+    limita la concurrencia total contra la tienda entre todas las búsquedas.
+
+    Las etapas se miden con el `control` de la búsqueda en curso: en el loop
+    de Playwright no hay búsqueda activa por hilo como en Selenium.
+
+    Las tiendas con "Mostrar más" (la página crece en lugar de cambiar)
+    declaran DEDUPLICAR_LINKS para no volver a entregar las tarjetas ya leídas.
+    """
+
+    ESPEC_TARJETA = None
+    PAGINAS_CONCURRENTES = 3
+    DEDUPLICAR_LINKS = False
+
+    def __init__(self, tienda_nombre):
+        self.tienda = tienda_nombre
+        self.context = None
+        self.page = None
+        self.control = None
+        self._vistos = set()
+
+    def _clean_price(self, price_text):
+        """Utilidad para limpiar texto de precios y convertir a float."""
+        try:
+            cleaned = re.sub(r'[^\d.]', '', str(price_text))
+            return float(cleaned) if cleaned else 0.0
+        except (ValueError, TypeError):
+            return 0.0
+
+    def _build_full_url(self, base_url, relative_url):
+        """Construye una URL completa a partir de una URL base y una relativa."""
+        if not relative_url:
+            return ""
+        if relative_url.startswith('http'):
+            return relative_url
+        return base_url.rstrip('/') + '/' + relative_url.lstrip('/')
+
+    async def _wait_for_element(self, selector, timeout=15, page=None):
+        """Espera por un elemento y lo retorna (None si no aparece)."""
+        try:
+            return await (page or self.page).wait_for_selector(selector, timeout=timeout * 1000)
+        except Exception:
+            return None
+
+    async def _safe_get_text(self, element, selector):
+        """Obtiene el texto de un sub-elemento de forma segura."""
+        try:
+            sub = await element.query_selector(selector)
+            return (await sub.inner_text()).strip() if sub else ""
+        except Exception:
+            return ""
+
+    async def _safe_get_attribute(self, element, selector, attribute):
+        """Obtiene un atributo de un sub-elemento de forma segura."""
+        try:
+            sub = await element.query_selector(selector) if selector else element
+            return (await sub.get_attribute(attribute) or "") if sub else ""
+        except Exception:
+            return ""
+
+    def _selector_tarjeta(self):
+        return self.ESPEC_TARJETA.card if self.ESPEC_TARJETA is not None else None
+
+    def _etapa(self, nombre):
+        return etapa(nombre, self.tienda, self.control)
+
+    async def _esperar_cortesia(self):
+        """Respeta el intervalo mínimo entre cargas de página al host de la tienda."""
+        await esperas.esperar_cortesia_async(self.tienda, self._get_base_url())
+
+    async def _click_next(self, selector, por_js=False):
+        """
+        Hace clic en el botón de siguiente página y espera a que cambie la
+        primera tarjeta. `por_js` hace el clic con JavaScript, para botones
+        que sin hojas de estilo (bloqueadas por el runtime) no son clicables.
+        """
+        next_button = await self.page.query_selector(selector)
+        if not next_button:
+            return False
+        selector_tarjeta = self._selector_tarjeta()
+        identidad = await esperas.identidad_primera_tarjeta_async(self.page, selector_tarjeta) if selector_tarjeta else None
+        await self._esperar_cortesia()
+        if por_js:
+            await next_button.evaluate("boton => boton.click()")
+        else:
+            await next_button.click()
+        await esperas.esperar_cambio_primera_tarjeta_async(self.tienda, self.page, selector_tarjeta, identidad)
+        return True
+
+    # Métodos abstractos que deben ser implementados por cada scraper
+    @abstractmethod
+    def _get_base_url(self):
+        """Retorna la URL base de la tienda."""
+        pass
+
+    @abstractmethod
+    async def _navigate_to_search(self, producto):
+        """Navega a la página de la tienda y realiza la búsqueda del producto."""
+        pass
+
+    @abstractmethod
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        pass
+
+    @abstractmethod
+    async def _extract_data_from_element(self, element):
+        """Extrae los datos (nombre, precio, link, etc.) de un elemento de producto."""
+        pass
+
+    @abstractmethod
+    async def _go_to_next_page(self):
+        """Navega a la siguiente página. Retorna True si fue exitoso, False si no hay más páginas."""
+        pass
+
+    def _procesar_datos_crudos(self, raw):
+        """
+        Convierte los campos crudos de una tarjeta en el dict de producto
+        (extracción masiva), o None para descartarla. Las subclases que
+        declaran ESPEC_TARJETA deben sobreescribirlo: por defecto no se
+        conserva ninguna tarjeta.
+        """
+        return None
+
+    async def _extraer_con_espec(self, element):
+        """_extract_data_from_element para las tiendas que declaran ESPEC_TARJETA: un viaje por tarjeta."""
+        return self._procesar_datos_crudos(await extraer_tarjeta_playwright(element, self.ESPEC_TARJETA))
+
+    async def _antes_de_extraer(self, page):
+        """Se llama con las tarjetas ya presentes (ej. scroll para cargar las diferidas)."""
+        pass
+
+    def _es_nuevo(self, data):
+        if not self.DEDUPLICAR_LINKS:
+            return True
+        if data['link'] in self._vistos:
+            return False
+        self._vistos.add(data['link'])
+        return True
+
+    def _usa_extraccion_masiva(self):
+        return EXTRACCION_MASIVA and self.ESPEC_TARJETA is not None
+
+    async def _process_page_bulk(self, pagina_actual, page=None):
+        """Extrae toda la página con un solo eval_on_selector_all y post-procesa en Python."""
+        page = page or self.page
+        with self._etapa(RESULTADOS):
+            encontrado = await self._wait_for_element(self.ESPEC_TARJETA.card, timeout=15, page=page)
+            if encontrado:
+                await self._antes_de_extraer(page)
+        if not encontrado:
+            print(f"{self.tienda.title()} Playwright: No se encontraron productos en la página {pagina_actual}")
+            return []
+
+        productos_pagina = []
+        with self._etapa(EXTRACCION):
+            for raw in await extraer_con_playwright(page, self.ESPEC_TARJETA):
+                data = self._procesar_datos_crudos(raw)
+                if data and self._is_valid_product_data(data) and self._es_nuevo(data):
+                    productos_pagina.append(data)
+
+        print(f"{self.tienda.title()} Playwright: {len(productos_pagina)} productos encontrados en página {pagina_actual}")
+        return productos_pagina
+
+    async def _process_page(self, pagina_actual):
+        """Procesa una página individual y retorna los productos encontrados."""
+        print(f"{self.tienda.title()} Playwright: procesando página {pagina_actual}")
+
+        if self._usa_extraccion_masiva():
+            return await self._process_page_bulk(pagina_actual)
+
+        with self._etapa(EXTRACCION):
+            product_elements = await self._get_product_elements()
+            if not product_elements:
+                print(f"{self.tienda.title()} Playwright: No se encontraron productos en la página {pagina_actual}")
+                return []
+            await self._antes_de_extraer(self.page)
+
+            productos_pagina = []
+            for element in product_elements:
+                data = await self._extract_data_from_element(element)
+                if data and self._is_valid_product_data(data) and self._es_nuevo(data):
+                    productos_pagina.append(data)
+
+        print(f"{self.tienda.title()} Playwright: {len(productos_pagina)} productos encontrados en página {pagina_actual}")
+        return productos_pagina
+
+    def _url_pagina(self, producto, pagina):
+        """URL de una página de resultados, o None si la tienda no es direccionable por URL."""
+        return None
+
+    async def _total_paginas(self):
+        """Total de páginas leído desde la página 1 (1 si no se puede determinar)."""
+        return 1
+
+    async def _max_numero(self, selector):
+        """Mayor número entre los textos de los elementos (ej. botones de paginación)."""
+        try:
+            textos = await self.page.eval_on_selector_all(selector, "els => els.map(e => e.innerText)")
+        except Exception:
+            return 1
+        numeros = [int(t.strip()) for t in textos if t and t.strip().isdigit()]
+        return max(numeros) if numeros else 1
+
+    async def _paginas_por_total(self, selector_total):
+        """
+        Total de páginas a partir del total de productos (el mayor número entre
+        los textos de `selector_total`, ej. "1-24 de 156") y de las tarjetas
+        de la página 1.
+        """
+        try:
+            textos = await self.page.eval_on_selector_all(selector_total, "els => els.map(e => e.innerText)")
+            por_pagina = await esperas.contar_elementos_async(self.page, self._selector_tarjeta())
+        except Exception:
+            return 1
+        numeros = [int(n) for n in (re.sub(r'\D', '', t or '') for t in textos) if n]
+        if not numeros or not por_pagina:
+            return 1
+        return -(-max(numeros) // por_pagina)
+
+    def _concurrencia_paginas(self):
+        return max(1, int(os.environ.get(f'PAGINAS_CONCURRENTES_{self.tienda.upper()}', self.PAGINAS_CONCURRENTES)))
+
+    async def _paginas_por_url(self, producto, max_paginas, control=None):
+        """
+        Generador asíncrono: abre la página 1 por URL y descarga el resto en
+        paralelo, entregando (pagina, productos) a medida que cada una termina.
+        Con límite de productos solo se piden las páginas necesarias; al llegar
+        el deadline se cancelan las páginas pendientes.
+        """
+        await self._esperar_cortesia()
+        async with turno_async(self._get_base_url()) as turno:
+            with self._etapa(BUSQUEDA):
+                await self.page.goto(self._url_pagina(producto, 1), timeout=60000)
+            productos_pagina = await self._process_page_bulk(1)
+            await self._senalar_turno(turno, productos_pagina, self.page)
+        registrar_pagina(productos_pagina, self.tienda, self.control)
+        yield 1, productos_pagina
+
+        total = min(max_paginas, await self._total_paginas())
+        if control is not None and control.limite and productos_pagina:
+            total = min(total, -(-control.limite // len(productos_pagina)))
+        if debe_parar(control, len(productos_pagina)) or total <= 1:
+            return
+        print(f"{self.tienda.title()} Playwright: {total} páginas, descargando en paralelo")
+
+        semaforo = asyncio.Semaphore(self._concurrencia_paginas())
+
+        async def _pagina(numero):
+            async with semaforo:
+                page = await self.context.new_page()
+                try:
+                    await self._esperar_cortesia()
+                    async with turno_async(self._get_base_url()) as turno:
+                        with self._etapa(PAGINACION):
+                            await page.goto(self._url_pagina(producto, numero), timeout=60000)
+                        productos_pagina = await self._process_page_bulk(numero, page)
+                        await self._senalar_turno(turno, productos_pagina, page)
+                    registrar_pagina(productos_pagina, self.tienda, self.control)
+                    return productos_pagina
+                except Exception as e:
+                    print(f"{self.tienda.title()} Playwright: error en la página {numero}: {e}")
+                    contar(ERRORES, self.tienda, control=self.control)
+                    return []
+                finally:
+                    await page.close()
+
+        tareas = {asyncio.ensure_future(_pagina(n)): n for n in range(2, total + 1)}
+        pendientes = set(tareas)
+        while pendientes:
+            listas, pendientes = await asyncio.wait(
+                pendientes, timeout=control.restante() if control is not None else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not listas:
+                control.vencido()
+                print(f"{self.tienda.title()} Playwright: deadline alcanzado, {len(pendientes)} páginas sin descargar")
+                for tarea in pendientes:
+                    tarea.cancel()
+                await asyncio.gather(*pendientes, return_exceptions=True)
+                return
+            for tarea in sorted(listas, key=tareas.get):
+                yield tareas[tarea], tarea.result()
+
+    async def iterar_paginas(self, producto, max_paginas=10, control=None):
+        """
+        Generador asíncrono que entrega (pagina, productos) apenas se extrae
+        cada página. Debe correr en el loop del runtime. Los errores al abrir
+        la tienda se propagan (para permitir el fallback a Selenium); los
+        errores durante la paginación terminan la iteración con lo ya entregado.
+        Con `control` (ControlBusqueda) se detiene al llegar al límite de
+        productos o al deadline.
+        """
+        self.control = control
+        with self._etapa(NAVEGADOR):
+            context = await obtener_runtime().nuevo_contexto()
+        try:
+            self.context = context
+            self.page = await context.new_page()
+            print(f"Iniciando búsqueda en {self.tienda.title()} con Playwright para: {producto}")
+
+            try:
+                if self._url_pagina(producto, 1) and self._usa_extraccion_masiva():
+                    async for pagina, productos_pagina in self._paginas_por_url(producto, max_paginas, control):
+                        yield pagina, productos_pagina
+                    return
+
+                await self._esperar_cortesia()
+                async with turno_async(self._get_base_url()) as turno:
+                    with self._etapa(BUSQUEDA):
+                        await self._navigate_to_search(producto)
+                    productos_pagina = await self._process_page(1)
+                    await self._senalar_turno(turno, productos_pagina, self.page)
+                registrar_pagina(productos_pagina, self.tienda, self.control)
+                obtenidos = len(productos_pagina)
+                yield 1, productos_pagina
+
+                try:
+                    for pagina_actual in range(2, max_paginas + 1):
+                        if debe_parar(control, obtenidos):
+                            print(f"{self.tienda.title()} Playwright: límite o deadline alcanzado, se retorna lo obtenido")
+                            break
+                        # _click_next respeta la cortesía antes de hacer clic
+                        async with turno_async(self._get_base_url()) as turno:
+                            with self._etapa(PAGINACION):
+                                hay_siguiente = await self._go_to_next_page()
+                            if not hay_siguiente:
+                                turno.medir = False
+                                print(f"{self.tienda.title()} Playwright: No hay más páginas disponibles")
+                                break
+                            productos_pagina = await self._process_page(pagina_actual)
+                            await self._senalar_turno(turno, productos_pagina, self.page)
+                        registrar_pagina(productos_pagina, self.tienda, self.control)
+                        obtenidos += len(productos_pagina)
+                        yield pagina_actual, productos_pagina
+
+                except HostNoDisponible as e:
+                    print(f"{self.tienda.title()} Playwright: {e}")
+                except Exception as e:
+                    print(f"Error en el scraper de {self.tienda} con Playwright: {e}")
+                    contar(ERRORES, self.tienda, control=self.control)
+            finally:
+                self.page = None
+                self.context = None
+        finally:
+            with self._etapa(CIERRE):
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+
+    async def buscar(self, producto, max_paginas=10, control=None):
+        """
+        Método principal para buscar productos. Cada página se publica en
+        `control` apenas se extrae; el resultado final conserva el orden de
+        las páginas aunque se hayan descargado en otro orden.
+        """
+        paginas = []
+        async for pagina, productos_pagina in self.iterar_paginas(producto, max_paginas, control):
+            paginas.append((pagina, productos_pagina))
+            entregar(control, productos_pagina)
+
+        resultados = recortar(control, [p for _, lote in sorted(paginas, key=lambda x: x[0]) for p in lote])
+        print(f"{self.tienda.title()} Playwright: Búsqueda completada. Total: {len(resultados)} productos")
+        return resultados
+
+    async def _senalar_turno(self, turno, productos_pagina, page):
+        """Informa al controlador del host si la página vino vacía o bloqueada."""
+        if productos_pagina:
+            return
+        if await detectar_bloqueo_playwright(page):
+            print(f"{self.tienda.title()} Playwright: la tienda parece estar bloqueando (captcha/acceso denegado)")
+            turno.bloqueo()
+        else:
+            turno.vacia()
+
+    def buscar_sync(self, producto, max_paginas=10, control=None):
+        """Ejecuta la búsqueda desde código síncrono usando el runtime compartido."""
+        return obtener_runtime().ejecutar(self.buscar(producto, max_paginas, control))
+
+    def _is_valid_product_data(self, data):
+        """Valida que los datos del producto sean válidos."""
+        return (
+            data and
+            isinstance(data, dict) and
+            data.get('nombre') and
+            data.get('precio', 0) > 0 and
+            data.get('link')
+        )
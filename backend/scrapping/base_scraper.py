@@ -1,25 +1,43 @@
 import re
-import time
 import random
 import os
 from abc import ABC, abstractmethod
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from .driver_pool import obtener_pool
+from .bulk_extractor import extraer_con_selenium, EXTRACCION_MASIVA
+from . import esperas
+from .control_host import turno as turno_host, detectar_bloqueo_selenium, HostNoDisponible
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
 
 class BaseScraper(ABC):
     """
     Clase base para todos los scrapers de tiendas.
     Proporciona funcionalidad común como configuración del driver,
     manejo de user-agents, utilidades de limpieza de precios, etc.
+    
+    Si la subclase declara ESPEC_TARJETA (EspecificacionTarjeta) e implementa
+    _procesar_datos_crudos, cada página se extrae en un solo viaje al navegador.
+    
+    En lugar de pausas fijas se espera a condiciones de la página (cambio de la
+    primera tarjeta, red inactiva, DOM estable) y a un intervalo mínimo de
+    cortesía por host. El tiempo esperado se acumula por tienda en el
+    registro de esperas.
+    
+    Cada carga de página ocupa un turno del controlador AIMD del host, que
+    ajusta cuántas cargas simultáneas admite la tienda según sus respuestas.
+    
+    Cada etapa (búsqueda, espera de resultados, extracción, paginación) se
+    mide en las métricas de la tienda y en el desglose de la búsqueda.
     """
     
+    ESPEC_TARJETA = None
+    SELECTOR_TARJETA = None  # Selector de tarjeta si la tienda no declara ESPEC_TARJETA
+    
     def __init__(self, tienda_nombre):
         self.tienda = tienda_nombre
         self.driver = None
@@ -44,26 +62,13 @@ class BaseScraper(ABC):
         return user_agents
     
     def _setup_driver(self):
-        """Configura y retorna el driver de Selenium con opciones optimizadas."""
+        """Obtiene un driver de Selenium del pool compartido de navegadores."""
         if not self.user_agents:
             print("Error: Lista de User-Agents vacía.")
             return None
-            
-        options = ChromeOptions()
-        options.add_argument("--headless")
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--disable-software-rasterizer')
-        options.add_argument('--window-size=1920,1080')
         
         try:
-            service = ChromeService(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=options)
-            driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                "userAgent": random.choice(self.user_agents)
-            })
-            return driver
+            return obtener_pool().adquirir(user_agent=random.choice(self.user_agents), tienda=self.tienda)
         except Exception as e:
             print(f"Error al configurar el driver para {self.tienda}: {e}")
             return None
@@ -94,6 +99,39 @@ class BaseScraper(ABC):
         except TimeoutException:
             return None
     
+    def _selector_tarjeta(self):
+        if self.ESPEC_TARJETA is not None:
+            return self.ESPEC_TARJETA.card
+        return self.SELECTOR_TARJETA
+    
+    def _identidad_primera_tarjeta(self):
+        """Link (o texto) de la primera tarjeta; sirve para detectar el cambio de página."""
+        selector = self._selector_tarjeta()
+        return esperas.identidad_primera_tarjeta(self.driver, selector) if selector else None
+    
+    def _esperar_cambio_conteo(self, conteo_anterior, timeout=15):
+        """Espera a que cambie la cantidad de tarjetas en la página."""
+        return esperas.esperar_cambio_conteo(self.tienda, self.driver, self._selector_tarjeta(), conteo_anterior, timeout)
+    
+    def _esperar_cambio_primera_tarjeta(self, identidad_anterior, timeout=15):
+        """Espera a que la primera tarjeta sea distinta (nueva página cargada)."""
+        selector = self._selector_tarjeta()
+        if not selector:
+            return self._esperar_red_inactiva(timeout)
+        return esperas.esperar_cambio_primera_tarjeta(self.tienda, self.driver, selector, identidad_anterior, timeout)
+    
+    def _esperar_red_inactiva(self, timeout=15, quietud=0.5):
+        """Espera a que no se carguen recursos nuevos durante `quietud` segundos."""
+        return esperas.esperar_red_inactiva(self.tienda, self.driver, timeout, quietud)
+    
+    def _esperar_dom_estable(self, selector='body', timeout=15, quietud=0.5):
+        """Espera con un MutationObserver a que el DOM bajo el selector deje de cambiar."""
+        return esperas.esperar_mutaciones(self.tienda, self.driver, selector, timeout, quietud)
+    
+    def _esperar_cortesia(self):
+        """Respeta el intervalo mínimo entre cargas de página al host de la tienda."""
+        esperas.esperar_cortesia(self.tienda, self._get_base_url())
+    
     def _safe_find_element(self, element, selector, by=By.CSS_SELECTOR):
         """Busca un elemento de forma segura, retorna None si no se encuentra."""
         try:
@@ -149,57 +187,137 @@ class BaseScraper(ABC):
         """Navega a la siguiente página. Retorna True si fue exitoso, False si no hay más páginas."""
         pass
     
+    def _procesar_datos_crudos(self, raw):
+        """
+        Convierte los campos crudos de una tarjeta en el dict de producto
+        (extracción masiva), o None para descartarla. Las subclases que
+        declaran ESPEC_TARJETA deben sobreescribirlo: por defecto no se
+        conserva ninguna tarjeta.
+        """
+        return None
+    
+    def _usa_extraccion_masiva(self):
+        return EXTRACCION_MASIVA and self.ESPEC_TARJETA is not None
+    
+    def _process_page_bulk(self, pagina_actual):
+        """Extrae toda la página con un solo execute_script y post-procesa en Python."""
+        with etapa(RESULTADOS, self.tienda):
+            encontrado = self._wait_for_element(self.ESPEC_TARJETA.card, timeout=15)
+        if not encontrado:
+            print(f"{self.tienda.title()}: No se encontraron productos en la página {pagina_actual}")
+            return []
+        
+        productos_pagina = []
+        with etapa(EXTRACCION, self.tienda):
+            for raw in extraer_con_selenium(self.driver, self.ESPEC_TARJETA):
+                data = self._procesar_datos_crudos(raw)
+                if data and self._is_valid_product_data(data):
+                    productos_pagina.append(data)
+        
+        print(f"{self.tienda.title()}: {len(productos_pagina)} productos encontrados en página {pagina_actual}")
+        return productos_pagina
+    
     def _process_page(self, pagina_actual):
         """Procesa una página individual y retorna los productos encontrados."""
         print(f"{self.tienda.title()}: procesando página {pagina_actual}")
         
-        product_elements = self._get_product_elements()
-        if not product_elements:
-            print(f"{self.tienda.title()}: No se encontraron productos en la página {pagina_actual}")
-            return []
+        if self._usa_extraccion_masiva():
+            return self._process_page_bulk(pagina_actual)
         
-        productos_pagina = []
-        for element in product_elements:
-            data = self._extract_data_from_element(element)
-            if data and self._is_valid_product_data(data):
-                productos_pagina.append(data)
+        with etapa(EXTRACCION, self.tienda):
+            product_elements = self._get_product_elements()
+            if not product_elements:
+                print(f"{self.tienda.title()}: No se encontraron productos en la página {pagina_actual}")
+                return []
+            
+            productos_pagina = []
+            for element in product_elements:
+                data = self._extract_data_from_element(element)
+                if data and self._is_valid_product_data(data):
+                    productos_pagina.append(data)
         
         print(f"{self.tienda.title()}: {len(productos_pagina)} productos encontrados en página {pagina_actual}")
         return productos_pagina
     
-    def buscar(self, producto, max_paginas=10):
-        """Método principal para buscar productos."""
-        resultados = []
+    def iterar_paginas(self, producto, max_paginas=10, control=None):
+        """
+        Generador que entrega (pagina, productos) apenas se extrae cada página.
+        Con `control` (ControlBusqueda) se detiene al llegar al límite de
+        productos o al deadline.
+        """
         self.driver = self._setup_driver()
         
         if not self.driver:
-            return resultados
+            return
         
+        obtenidos = 0
         try:
             print(f"Iniciando búsqueda en {self.tienda.title()} para: {producto}")
-            self._navigate_to_search(producto)
-            time.sleep(random.uniform(3, 5))
+            identidad = None
             
             for pagina_actual in range(1, max_paginas + 1):
-                productos_pagina = self._process_page(pagina_actual)
-                resultados.extend(productos_pagina)
-                
-                if pagina_actual < max_paginas and not self._go_to_next_page():
-                    print(f"{self.tienda.title()}: No hay más páginas disponibles")
+                if debe_parar(control, obtenidos):
+                    print(f"{self.tienda.title()}: límite o deadline alcanzado, se retorna lo obtenido")
                     break
                 
-                if pagina_actual < max_paginas:
-                    time.sleep(random.uniform(3, 6))
+                self._esperar_cortesia()
+                with turno_host(self._get_base_url()) as turno:
+                    if pagina_actual == 1:
+                        with etapa(BUSQUEDA, self.tienda):
+                            self._navigate_to_search(producto)
+                        with etapa(RESULTADOS, self.tienda):
+                            self._esperar_red_inactiva()
+                    else:
+                        with etapa(PAGINACION, self.tienda):
+                            hay_siguiente = self._go_to_next_page()
+                        if not hay_siguiente:
+                            turno.medir = False
+                            print(f"{self.tienda.title()}: No hay más páginas disponibles")
+                            break
+                        with etapa(RESULTADOS, self.tienda):
+                            self._esperar_cambio_primera_tarjeta(identidad)
+                    
+                    productos_pagina = self._process_page(pagina_actual)
+                    registrar_pagina(productos_pagina, self.tienda)
+                    self._senalar_turno(turno, productos_pagina)
+                
+                identidad = self._identidad_primera_tarjeta()
+                obtenidos += len(productos_pagina)
+                yield pagina_actual, productos_pagina
             
-            print(f"{self.tienda.title()}: Búsqueda completada. Total: {len(resultados)} productos")
+            espera = esperas.obtener_registro_esperas().estadisticas().get(self.tienda, {}).get('total', 0)
+            print(f"{self.tienda.title()}: Búsqueda completada. Total: {obtenidos} productos (espera acumulada: {espera:.1f}s)")
             
+        except HostNoDisponible as e:
+            print(f"{self.tienda.title()}: {e}")
         except Exception as e:
             print(f"Error en el scraper de {self.tienda}: {e}")
+            obtener_pool().reportar_error(self.driver)
         finally:
             if self.driver:
-                self.driver.quit()
-        
-        return resultados
+                obtener_pool().liberar(self.driver)
+                self.driver = None
+    
+    def buscar(self, producto, max_paginas=10, control=None):
+        """
+        Método principal para buscar productos. Cada página se publica en
+        `control` apenas se extrae y al final se retorna la lista completa.
+        """
+        resultados = []
+        for _, productos_pagina in self.iterar_paginas(producto, max_paginas, control):
+            resultados.extend(productos_pagina)
+            entregar(control, productos_pagina)
+        return recortar(control, resultados)
+    
+    def _senalar_turno(self, turno, productos_pagina):
+        """Informa al controlador del host si la página vino vacía o bloqueada."""
+        if productos_pagina:
+            return
+        if detectar_bloqueo_selenium(self.driver):
+            print(f"{self.tienda.title()}: la tienda parece estar bloqueando (captcha/acceso denegado)")
+            turno.bloqueo()
+        else:
+            turno.vacia()
     
     def _is_valid_product_data(self, data):
         """Valida que los datos del producto sean válidos."""
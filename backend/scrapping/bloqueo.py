@@ -0,0 +1,128 @@
+import os
+
+# Perfiles de bloqueo de recursos para los scrapers de Selenium, aplicados con
+# CDP Network.setBlockedURLs en cada préstamo de un driver. Cada tienda declara
+# qué categorías bloquea; se puede cambiar con BLOQUEO_<TIENDA>=rastreadores,medios
+# y desactivar todo con BLOQUEO=0.
+BLOQUEO_ACTIVO = os.environ.get('BLOQUEO', '1').lower() not in ('0', 'false', 'no')
+
+CATEGORIAS = {
+    # Analítica, publicidad y píxeles de terceros
+    'rastreadores': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*googleadservices.com*',
+        '*doubleclick.net*', '*googlesyndication.com*', '*facebook.net*', '*facebook.com/tr*',
+        '*connect.facebook.net*', '*hotjar.com*', '*clarity.ms*', '*analytics.tiktok.com*',
+        '*criteo.com*', '*criteo.net*', '*nr-data.net*', '*newrelic.com*', '*bat.bing.com*',
+        '*insitez.blob.core.windows.net*', '*smartlook*', '*onesignal.com*', '*/gtm.js*',
+    ],
+    # Las imágenes solo se leen del atributo src: no hace falta descargarlas
+    'medios': [
+        '*.jpg', '*.jpg?*', '*.jpeg', '*.jpeg?*', '*.png', '*.png?*', '*.gif', '*.gif?*',
+        '*.webp', '*.webp?*', '*.avif', '*.avif?*', '*.ico', '*.mp4', '*.mp4?*', '*.webm',
+    ],
+    'fuentes': ['*.woff', '*.woff?*', '*.woff2', '*.woff2?*', '*.ttf', '*.ttf?*', '*.otf', '*.eot'],
+    # Solo para tiendas cuyos selectores y clics no dependen del layout
+    'estilos': ['*.css', '*.css?*'],
+}
+
+PERFIL_POR_DEFECTO = ('rastreadores',)
+
+# Sin CSS solo las tiendas que interactúan con clics por JavaScript y esperan
+# un campo de búsqueda simple. Falabella hace un clic nativo (banner de cookies)
+# y Metro, Plaza Vea y Real Plaza dependen de botones que muestra el layout:
+# conservan las hojas de estilo.
+PERFILES = {
+    'metro': ('rastreadores', 'medios', 'fuentes'),
+    'plazavea': ('rastreadores', 'medios', 'fuentes'),
+    'falabella': ('rastreadores', 'medios', 'fuentes'),
+    'ripley': ('rastreadores', 'medios', 'fuentes', 'estilos'),
+    'oechsle': ('rastreadores', 'medios', 'fuentes', 'estilos'),
+    'tailoy': ('rastreadores', 'medios', 'fuentes', 'estilos'),
+    'hiraoka': ('rastreadores', 'medios', 'fuentes', 'estilos'),
+    'realplaza': ('rastreadores', 'medios', 'fuentes'),
+    'estilos': ('rastreadores', 'medios', 'fuentes'),
+}
+
+
+def perfil_de(tienda):
+    """Categorías que bloquea la tienda (BLOQUEO_<TIENDA> tiene prioridad sobre PERFILES)."""
+    if not BLOQUEO_ACTIVO:
+        return ()
+    configurado = os.environ.get(f'BLOQUEO_{(tienda or "").upper()}')
+    if configurado is not None:
+        return tuple(c.strip() for c in configurado.split(',') if c.strip() in CATEGORIAS)
+    return PERFILES.get(tienda, PERFIL_POR_DEFECTO)
+
+def patrones_de(tienda):
+    """Patrones de URL para Network.setBlockedURLs según el perfil de la tienda."""
+    return [patron for categoria in perfil_de(tienda) for patron in CATEGORIAS[categoria]]
+
+def aplicar_perfil(driver, tienda):
+    """Aplica el perfil de bloqueo de la tienda al driver (reemplaza el del préstamo anterior)."""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patrones_de(tienda)})
+    except Exception as e:
+        print(f"No se pudo aplicar el perfil de bloqueo de {tienda}: {e}")
+
+
+def medir_carga(driver, url):
+    """
+    Carga `url` y retorna bytes transferidos, solicitudes, solicitudes
+    bloqueadas y milisegundos hasta el evento load. Necesita un driver con
+    el log 'performance' habilitado (goog:loggingPrefs).
+    """
+    import json
+    import time
+
+    driver.get_log('performance')  # Descartar lo anterior
+    inicio = time.time()
+    driver.get(url)
+    total = time.time() - inicio
+    carga = driver.execute_script(
+        "const n = performance.getEntriesByType('navigation')[0]; return n ? n.loadEventEnd : null;"
+    )
+    bytes_transferidos = solicitudes = bloqueadas = 0
+    for entrada in driver.get_log('performance'):
+        mensaje = json.loads(entrada['message'])['message']
+        if mensaje['method'] == 'Network.loadingFinished':
+            bytes_transferidos += mensaje['params'].get('encodedDataLength', 0)
+            solicitudes += 1
+        elif mensaje['method'] == 'Network.loadingFailed' and mensaje['params'].get('blockedReason'):
+            bloqueadas += 1
+    return {
+        'bytes': int(bytes_transferidos),
+        'solicitudes': solicitudes,
+        'bloqueadas': bloqueadas,
+        'carga_ms': round(carga if carga else total * 1000),
+    }
+
+
+# Comparación con y sin perfil:
+# python -m backup.descuentos.backend.scrapping.bloqueo metro "https://www.metro.pe/tv?_q=tv&map=ft" [repeticiones]
+if __name__ == '__main__':
+    import sys
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from .driver_pool import DriverPool
+
+    if len(sys.argv) < 3:
+        sys.exit("Uso: python -m backup.descuentos.backend.scrapping.bloqueo <tienda> <url> [repeticiones]")
+    tienda, url = sys.argv[1], sys.argv[2]
+    repeticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    pool = DriverPool()
+    opciones = pool._build_options()
+    opciones.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    driver = webdriver.Chrome(service=ChromeService(pool._resolver_driver_path()), options=opciones)
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+        for nombre, patrones in (('sin perfil', []), (f"perfil {','.join(perfil_de(tienda))}", patrones_de(tienda))):
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patrones})
+            medidas = [medir_carga(driver, url) for _ in range(repeticiones)]
+            promedio = {clave: sum(m[clave] for m in medidas) / len(medidas) for clave in medidas[0]}
+            print(f"{nombre:>40}: {promedio['bytes'] / 1024:8.0f} KB  {promedio['solicitudes']:5.0f} solicitudes  "
+                  f"{promedio['bloqueadas']:4.0f} bloqueadas  {promedio['carga_ms']:6.0f} ms")
+    finally:
+        driver.quit()
@@ -0,0 +1,125 @@
+"""
+Extracción masiva de tarjetas de producto en un solo viaje al navegador.
+
+Cada tienda declara una vez el selector de sus tarjetas y los selectores de
+cada campo. Un único `execute_script` (Selenium) o `eval_on_selector_all`
+(Playwright) devuelve una lista JSON con los campos crudos de toda la página,
+que luego se post-procesa en Python. En una página de 48 productos esto
+reemplaza cientos de llamadas find_element/get_attribute por una sola.
+
+Para páginas renderizadas en el servidor, `extraer_de_html` aplica la misma
+especificación sobre el HTML descargado (selectolax, sin navegador).
+"""
+
+import os
+from urllib.parse import urljoin
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:  # Solo lo necesita el motor 'html'
+    HTMLParser = None
+
+# Permite desactivar la extracción masiva (un solo viaje al navegador por página)
+EXTRACCION_MASIVA = os.environ.get('EXTRACCION_MASIVA', '1') != '0'
+
+# Función JS compartida por Selenium y Playwright: recibe las tarjetas y el
+# mapa campo -> [[selector, atributo], ...] y retorna un objeto por tarjeta.
+# Atributos: "text" (innerText), "prop:<nombre>" (propiedad DOM, ej. URLs
+# absolutas) o cualquier otro nombre para getAttribute. Selector vacío = la tarjeta.
+_JS_EXTRAER = """
+(cards, campos) => cards.map(card => {
+    const out = {};
+    for (const [campo, candidatos] of Object.entries(campos)) {
+        out[campo] = null;
+        for (const [selector, attr] of candidatos) {
+            const el = selector ? card.querySelector(selector) : card;
+            if (!el) continue;
+            let valor;
+            if (attr === 'text') valor = el.innerText;
+            else if (attr.startsWith('prop:')) valor = el[attr.slice(5)];
+            else valor = el.getAttribute(attr);
+            if (valor) { out[campo] = String(valor).trim(); break; }
+        }
+    }
+    return out;
+})
+"""
+
+_JS_SELENIUM = (
+    "const cards = Array.from(document.querySelectorAll(arguments[0]));"
+    "return (" + _JS_EXTRAER + ")(cards, arguments[1]);"
+)
+
+
+class EspecificacionTarjeta:
+    """
+    Declaración de los selectores de una tarjeta de producto.
+
+    Ejemplo:
+        EspecificacionTarjeta("div.product", {
+            'nombre': ("span.prod-name", "text"),
+            'imagen': [("img.principal", "src"), ("img", "data-src")],
+        })
+    Cada campo acepta un candidato (selector, atributo) o una lista de
+    candidatos que se prueban en orden hasta encontrar un valor.
+    """
+
+    def __init__(self, card, campos):
+        self.card = card
+        self.campos = {}
+        for nombre, candidatos in campos.items():
+            if isinstance(candidatos, tuple):
+                candidatos = [candidatos]
+            self.campos[nombre] = [[selector or "", attr] for selector, attr in candidatos]
+
+
+def extraer_con_selenium(driver, espec):
+    """Retorna los campos crudos de todas las tarjetas de la página con un solo execute_script."""
+    return driver.execute_script(_JS_SELENIUM, espec.card, espec.campos) or []
+
+async def extraer_con_playwright(page, espec):
+    """Retorna los campos crudos de todas las tarjetas de la página con un solo eval_on_selector_all."""
+    return await page.eval_on_selector_all(espec.card, _JS_EXTRAER, espec.campos) or []
+
+async def extraer_tarjeta_playwright(elemento, espec):
+    """Campos crudos de una sola tarjeta (ElementHandle de Playwright), con la misma especificación."""
+    return await elemento.evaluate(
+        "(card, campos) => (" + _JS_EXTRAER + ")([card], campos)[0]", espec.campos
+    ) or {}
+
+def _valor_html(nodo, attr, base_url):
+    if attr == 'text':
+        # Como innerText: espacios colapsados entre los nodos de texto
+        return ' '.join(nodo.text(separator=' ').split())
+    if attr.startswith('prop:'):
+        attr = attr[5:]
+        valor = nodo.attributes.get(attr)
+        # Las propiedades href/src del DOM son URLs absolutas
+        if valor and attr in ('href', 'src') and base_url:
+            valor = urljoin(base_url, valor)
+        return valor
+    return nodo.attributes.get(attr)
+
+def parsear_html(html):
+    """Árbol de selectolax del HTML (parser en C, mucho más rápido que un navegador)."""
+    if HTMLParser is None:
+        raise RuntimeError("El motor 'html' necesita el paquete 'selectolax' (pip install selectolax)")
+    return HTMLParser(html)
+
+def extraer_de_html(arbol, espec, base_url=None):
+    """Retorna los mismos campos crudos que extraer_con_selenium, desde el árbol de parsear_html."""
+    tarjetas = []
+    for card in arbol.css(espec.card):
+        out = {}
+        for campo, candidatos in espec.campos.items():
+            out[campo] = None
+            for selector, attr in candidatos:
+                nodo = card.css_first(selector) if selector else card
+                if nodo is None:
+                    continue
+                valor = _valor_html(nodo, attr, base_url)
+                if valor:
+                    out[campo] = str(valor).strip()
+                    break
+        tarjetas.append(out)
+    return tarjetas
@@ -0,0 +1,165 @@
+import time
+import threading
+from contextlib import contextmanager
+
+LIMITE = 'limite'
+DEADLINE = 'deadline'
+RECURSOS = 'recursos'  # El navegador excedió su presupuesto de memoria o CPU
+ABANDONADA = 'abandonada'  # Nadie espera ya el resultado (se cancela su turno en la cola de navegadores)
+
+
+class ControlBusqueda:
+    """
+    Límites de una búsqueda en una tienda: `limite` (máximo de productos) y
+    `deadline` (segundos desde que se lanza). Los scrapers lo consultan entre
+    páginas y se detienen con lo que llevan; `parcial` indica si se cortó.
+
+    También es el canal por el que los scrapers publican los productos de cada
+    página apenas se extraen (`entregar`). Los lotes quedan guardados para que
+    quien se suscriba tarde (single-flight) reciba la secuencia completa.
+    """
+
+    def __init__(self, limite=None, deadline=None):
+        self.limite = limite
+        self.deadline = deadline
+        self.fin = time.time() + deadline if deadline else None
+        self.motivo = None  # LIMITE, DEADLINE o RECURSOS si la búsqueda se cortó
+        self.lotes = []
+        self.etapas = {}  # Segundos por etapa del scrape (navegador, resultados, extraccion...)
+        self.contadores = {}  # Páginas, productos, errores y timeouts
+        self._entregados = 0
+        self._oyentes = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def hasta(cls, limite, fin):
+        """Control con deadline absoluto (timestamp `fin`), ej: el que llega a un worker por la cola."""
+        control = cls(limite)
+        control.fin = fin
+        if fin is not None:
+            control.deadline = max(0.0, fin - time.time())
+        return control
+
+    @property
+    def parcial(self):
+        return self.motivo is not None
+
+    def restante(self):
+        """Segundos que quedan antes del deadline (None si no hay deadline)."""
+        if self.fin is None:
+            return None
+        return max(0.0, self.fin - time.time())
+
+    def vencido(self):
+        if self.fin is not None and time.time() >= self.fin:
+            self.motivo = self.motivo or DEADLINE
+            return True
+        return False
+
+    def abortar(self, motivo):
+        """Corta la búsqueda desde afuera: los scrapers paran en su próxima verificación."""
+        self.motivo = self.motivo or motivo
+        self.fin = time.time()
+
+    def agotado(self, cantidad):
+        """True si ya se juntaron `limite` productos o se pasó el deadline."""
+        if self.limite and cantidad >= self.limite:
+            self.motivo = self.motivo or LIMITE
+            return True
+        return self.vencido()
+
+    def recortar(self, resultados):
+        """Deja a lo más `limite` productos; llegar al límite cuenta como resultado parcial."""
+        if self.limite and len(resultados) >= self.limite:
+            self.motivo = self.motivo or LIMITE
+            return resultados[:self.limite]
+        return resultados
+
+    def sumar_etapa(self, etapa, segundos):
+        with self._lock:
+            self.etapas[etapa] = self.etapas.get(etapa, 0.0) + segundos
+
+    def sumar_contador(self, nombre, cantidad=1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def desglose(self):
+        """Segundos por etapa (redondeados) y contadores de la búsqueda, para los eventos de progreso."""
+        with self._lock:
+            return {
+                'etapas': {etapa: round(segundos, 2) for etapa, segundos in self.etapas.items()},
+                'contadores': dict(self.contadores),
+            }
+
+    def agregar_desglose(self, desglose):
+        """Suma un desglose recibido de otro proceso (ej: el evento final de un worker)."""
+        for etapa, segundos in (desglose or {}).get('etapas', {}).items():
+            self.sumar_etapa(etapa, segundos)
+        for nombre, cantidad in (desglose or {}).get('contadores', {}).items():
+            self.sumar_contador(nombre, cantidad)
+
+    def entregar(self, productos):
+        """Publica los productos de una página recién extraída (sin pasar el límite)."""
+        with self._lock:
+            if self.limite:
+                productos = productos[:max(0, self.limite - self._entregados)]
+            if not productos:
+                return
+            self._entregados += len(productos)
+            self.lotes.append(productos)
+            for oyente in self._oyentes:
+                oyente(productos)
+
+    def suscribir(self, oyente):
+        """Llama a `oyente(productos)` con los lotes ya publicados y con cada lote nuevo."""
+        with self._lock:
+            for lote in self.lotes:
+                oyente(lote)
+            self._oyentes.append(oyente)
+
+    def desuscribir(self, oyente):
+        with self._lock:
+            if oyente in self._oyentes:
+                self._oyentes.remove(oyente)
+
+
+# Atajos para los scrapers, que reciben control=None cuando no hay límites
+
+def debe_parar(control, cantidad):
+    return control is not None and control.agotado(cantidad)
+
+def recortar(control, resultados):
+    return control.recortar(resultados) if control is not None else resultados
+
+def entregar(control, productos):
+    if control is not None and productos:
+        control.entregar(productos)
+
+
+# Búsqueda que corre en el hilo actual, para quien no recibe el control como
+# argumento (ej: el pool de drivers, que avisa al gobernador de recursos)
+_actual = threading.local()
+# Las mismas búsquedas vistas desde afuera del hilo (ej: el perfilador de /buscar)
+_por_hilo = {}
+
+@contextmanager
+def activar(control, tienda=None):
+    ident = threading.get_ident()
+    anterior = getattr(_actual, 'busqueda', None)
+    _actual.busqueda = _por_hilo[ident] = (control, tienda)
+    try:
+        yield control
+    finally:
+        _actual.busqueda = anterior
+        if anterior is None:
+            _por_hilo.pop(ident, None)
+        else:
+            _por_hilo[ident] = anterior
+
+def control_actual():
+    """(control, tienda) de la búsqueda del hilo actual, o (None, None)."""
+    return getattr(_actual, 'busqueda', None) or (None, None)
+
+def busquedas_por_hilo():
+    """Copia de {ident del hilo: (control, tienda)} de las búsquedas activas."""
+    return dict(_por_hilo)
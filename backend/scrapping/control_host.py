@@ -0,0 +1,287 @@
+import os
+import time
+import asyncio
+import threading
+import functools
+from .esperas import host_de
+
+# Control de concurrencia AIMD por host: la concurrencia permitida sube de a
+# poco (aditivo) mientras la tienda responde bien y se divide (multiplicativo)
+# ante señales de saturación: bloqueos (captcha/403/429), páginas vacías
+# seguidas, errores o tiempos de carga muy por encima del promedio.
+AIMD_INICIAL = float(os.environ.get('AIMD_INICIAL', 2))
+AIMD_MAXIMO = float(os.environ.get('AIMD_MAXIMO', 6))
+AIMD_FACTOR = float(os.environ.get('AIMD_FACTOR', 0.5))  # Multiplicador al reducir
+AIMD_LENTITUD = float(os.environ.get('AIMD_LENTITUD', 2.0))  # Carga > LENTITUD x promedio = señal de saturación
+AIMD_VACIAS = int(os.environ.get('AIMD_VACIAS', 2))  # Páginas vacías seguidas que cuentan como señal
+BACKOFF_BASE = float(os.environ.get('BACKOFF_BASE', 2))
+BACKOFF_MAX = float(os.environ.get('BACKOFF_MAX', 60))
+BLOQUEOS_MAX = int(os.environ.get('BLOQUEOS_MAX', 3))  # Bloqueos seguidos antes de fallar sin esperar
+ESPERA_TURNO = float(os.environ.get('ESPERA_TURNO', 120))
+
+# Máximo por host: AIMD_MAXIMOS="www.metro.pe=8,www.ripley.com.pe=3"
+AIMD_MAXIMOS = {
+    host.strip(): float(valor)
+    for host, _, valor in (
+        par.partition('=') for par in os.environ.get('AIMD_MAXIMOS', '').split(',') if '=' in par
+    )
+}
+
+# Textos que delatan una página de captcha o de acceso denegado
+MARCADORES_BLOQUEO = (
+    'captcha', 'are you a robot', 'access denied', 'acceso denegado',
+    'request unsuccessful', 'px-captcha', 'cf-chl', 'attention required',
+    'too many requests', 'forbidden',
+)
+
+_JS_TEXTO_PAGINA = "return document.title + ' ' + (document.body ? document.body.innerText.slice(0, 2000) : '');"
+
+OK = 'ok'
+VACIA = 'vacia'
+BLOQUEO = 'bloqueo'
+ERROR = 'error'
+CANCELADA = 'cancelada'  # Cortada desde afuera (deadline, cierre): no dice nada del host
+
+
+class HostNoDisponible(Exception):
+    """El host está bloqueando las peticiones o no hubo turno a tiempo."""
+
+
+def es_bloqueo(texto):
+    texto = (texto or '').lower()
+    return any(marcador in texto for marcador in MARCADORES_BLOQUEO)
+
+def detectar_bloqueo_selenium(driver):
+    """True si la página actual del driver parece un captcha o un acceso denegado."""
+    try:
+        return es_bloqueo(driver.execute_script(_JS_TEXTO_PAGINA))
+    except Exception:
+        return False
+
+async def detectar_bloqueo_playwright(page):
+    """True si la página actual parece un captcha o un acceso denegado."""
+    try:
+        return es_bloqueo(await page.evaluate(
+            "() => document.title + ' ' + (document.body ? document.body.innerText.slice(0, 2000) : '')"
+        ))
+    except Exception:
+        return False
+
+
+class Turno:
+    """
+    Una carga de página (o scrape) en curso contra un host. El llamador marca
+    el resultado (ok, vacia, bloqueo); una excepción cuenta como error,
+    salvo la cancelación de la tarea o el cierre del generador, que liberan
+    el turno sin señal para el AIMD.
+    """
+
+    def __init__(self, controlador, medir=True):
+        self.controlador = controlador
+        self.medir = medir
+        self.resultado = OK
+        self.inicio = time.time()
+
+    def vacia(self):
+        self.resultado = VACIA
+
+    def bloqueo(self):
+        self.resultado = BLOQUEO
+
+    def _cerrar(self, excepcion):
+        if isinstance(excepcion, (asyncio.CancelledError, GeneratorExit)):
+            resultado = CANCELADA
+        elif excepcion is not None and self.resultado == OK:
+            resultado = ERROR
+        else:
+            resultado = self.resultado
+        duracion = time.time() - self.inicio if self.medir else None
+        self.controlador._liberar(resultado, duracion)
+
+
+class ControladorHost:
+    """Límite de concurrencia AIMD y backoff exponencial para un host."""
+
+    def __init__(self, host):
+        self.host = host
+        self.maximo = AIMD_MAXIMOS.get(host, AIMD_MAXIMO)
+        self.limite = min(AIMD_INICIAL, self.maximo)
+        self.en_curso = 0
+        self.carga_promedio = None  # EWMA del tiempo de carga por página
+        self.pausa_hasta = 0.0
+        self._bloqueos_seguidos = 0
+        self._vacias_seguidas = 0
+        self._ultima_reduccion = 0.0
+        self._contadores = {OK: 0, VACIA: 0, BLOQUEO: 0, ERROR: 0, CANCELADA: 0, 'lentas': 0, 'reducciones': 0}
+        self._cond = threading.Condition()
+
+    def _intentar_adquirir(self):
+        """Retorna 0 si obtuvo turno o los segundos sugeridos antes de reintentar."""
+        with self._cond:
+            ahora = time.time()
+            if self.pausa_hasta > ahora:
+                if self._bloqueos_seguidos >= BLOQUEOS_MAX:
+                    raise HostNoDisponible(
+                        f"{self.host} bloqueó {self._bloqueos_seguidos} veces seguidas; "
+                        f"en pausa {self.pausa_hasta - ahora:.0f}s"
+                    )
+                return self.pausa_hasta - ahora
+            if self.en_curso < max(1, int(self.limite)):
+                self.en_curso += 1
+                return 0
+            return 0.1
+
+    def adquirir(self, timeout=ESPERA_TURNO, medir=True):
+        """Bloquea hasta obtener un turno para el host y retorna el Turno."""
+        limite_espera = time.time() + timeout
+        while True:
+            espera = self._intentar_adquirir()
+            if not espera:
+                return Turno(self, medir)
+            restante = limite_espera - time.time()
+            if restante <= 0:
+                raise HostNoDisponible(f"Sin turno para {self.host} tras {timeout:.0f}s")
+            with self._cond:
+                self._cond.wait(min(espera, restante))
+
+    async def adquirir_async(self, timeout=ESPERA_TURNO, medir=True):
+        """Versión asíncrona de adquirir (no bloquea el event loop)."""
+        limite_espera = time.time() + timeout
+        while True:
+            espera = self._intentar_adquirir()
+            if not espera:
+                return Turno(self, medir)
+            restante = limite_espera - time.time()
+            if restante <= 0:
+                raise HostNoDisponible(f"Sin turno para {self.host} tras {timeout:.0f}s")
+            await asyncio.sleep(min(espera, restante, 0.5))
+
+    def _liberar(self, resultado, duracion):
+        with self._cond:
+            self.en_curso -= 1
+            self._contadores[resultado] += 1
+            if resultado == CANCELADA:
+                self._cond.notify_all()
+                return
+            ahora = time.time()
+
+            lenta = False
+            if duracion is not None and resultado == OK:
+                # Por debajo de un segundo las variaciones son ruido, no saturación
+                if self.carga_promedio is not None and duracion > max(1.0, AIMD_LENTITUD * self.carga_promedio):
+                    lenta = True
+                    self._contadores['lentas'] += 1
+                previo = self.carga_promedio if self.carga_promedio is not None else duracion
+                self.carga_promedio = 0.8 * previo + 0.2 * duracion
+
+            if resultado == BLOQUEO:
+                self._bloqueos_seguidos += 1
+                backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self._bloqueos_seguidos - 1))
+                self.pausa_hasta = max(self.pausa_hasta, ahora + backoff)
+                print(f"Control {self.host}: bloqueo detectado, pausa de {backoff:.0f}s")
+                self._reducir(ahora)
+            elif resultado == VACIA:
+                self._vacias_seguidas += 1
+                if self._vacias_seguidas >= AIMD_VACIAS:
+                    self._reducir(ahora)
+            elif resultado == ERROR or lenta:
+                self._reducir(ahora)
+            else:
+                self._bloqueos_seguidos = 0
+                self._vacias_seguidas = 0
+                # Aumento aditivo: +1 por cada "ventana" completa de turnos exitosos
+                self.limite = min(self.maximo, self.limite + 1.0 / max(1.0, self.limite))
+
+            self._cond.notify_all()
+
+    def _reducir(self, ahora):
+        # Una sola reducción por ventana: varios fallos simultáneos son la misma señal
+        ventana = max(1.0, self.carga_promedio or 1.0)
+        if ahora - self._ultima_reduccion < ventana:
+            return
+        self._ultima_reduccion = ahora
+        self.limite = max(1.0, self.limite * AIMD_FACTOR)
+        self._contadores['reducciones'] += 1
+
+    def estadisticas(self):
+        with self._cond:
+            return {
+                'limite': round(self.limite, 2),
+                'concurrencia': max(1, int(self.limite)),
+                'maximo': self.maximo,
+                'en_curso': self.en_curso,
+                'carga_promedio': round(self.carga_promedio, 2) if self.carga_promedio is not None else None,
+                'pausa_restante': round(max(0.0, self.pausa_hasta - time.time()), 1),
+                **self._contadores,
+            }
+
+
+class _TurnoSync:
+    def __init__(self, controlador, medir):
+        self.controlador = controlador
+        self.medir = medir
+
+    def __enter__(self):
+        self.turno = self.controlador.adquirir(medir=self.medir)
+        return self.turno
+
+    def __exit__(self, tipo, valor, tb):
+        self.turno._cerrar(valor)
+        return False
+
+
+class _TurnoAsync:
+    def __init__(self, controlador, medir):
+        self.controlador = controlador
+        self.medir = medir
+
+    async def __aenter__(self):
+        self.turno = await self.controlador.adquirir_async(medir=self.medir)
+        return self.turno
+
+    async def __aexit__(self, tipo, valor, tb):
+        self.turno._cerrar(valor)
+        return False
+
+
+_controladores = {}
+_controladores_lock = threading.Lock()
+
+def obtener_controlador(url):
+    """Retorna el controlador AIMD del host de la URL (uno por host en todo el proceso)."""
+    host = host_de(url)
+    with _controladores_lock:
+        if host not in _controladores:
+            _controladores[host] = ControladorHost(host)
+        return _controladores[host]
+
+def turno(url, medir=True):
+    """Context manager: `with turno(url) as t: ...` ocupa un turno del host mientras dura el bloque."""
+    return _TurnoSync(obtener_controlador(url), medir)
+
+def turno_async(url, medir=True):
+    """Versión asíncrona: `async with turno_async(url) as t: ...`."""
+    return _TurnoAsync(obtener_controlador(url), medir)
+
+def limitado_por_host(url):
+    """
+    Decorador para los scrapers legacy: todo el scrape ocupa un turno del host
+    y un resultado vacío cuenta como página vacía. El tiempo no se usa como
+    señal de carga porque un scrape completo no es comparable con una página.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with turno(url, medir=False) as t:
+                resultados = funcion(*args, **kwargs)
+                if not resultados:
+                    t.vacia()
+                return resultados
+        return envoltura
+    return decorador
+
+def estadisticas_hosts():
+    """Límites actuales y contadores de cada host."""
+    with _controladores_lock:
+        controladores = list(_controladores.values())
+    return {c.host: c.estadisticas() for c in controladores}
@@ -0,0 +1,290 @@
+import os
+import time
+import shlex
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+from webdriver_manager.chrome import ChromeDriverManager
+from .gobernador import obtener_gobernador
+from .bloqueo import aplicar_perfil
+from .control_busqueda import control_actual
+from .metricas import etapa, contar, NAVEGADOR, CIERRE, ERRORES
+
+# Configuración del pool (se puede ajustar con variables de entorno)
+POOL_SIZE = int(os.environ.get('DRIVER_POOL_SIZE', 2))
+POOL_MAX_USOS = int(os.environ.get('DRIVER_POOL_MAX_USOS', 20))
+POOL_TIMEOUT = float(os.environ.get('DRIVER_POOL_TIMEOUT', 120))
+
+
+def argumentos_extra():
+    """
+    Argumentos adicionales de línea de comandos para Chrome/Edge, desde
+    NAVEGADOR_ARGS (ej: '--host-resolver-rules="MAP * 127.0.0.1:8443"').
+    """
+    return shlex.split(os.environ.get('NAVEGADOR_ARGS', ''))
+
+
+class DriverPool:
+    """
+    Pool de instancias de Chrome (Selenium) pre-lanzadas y reutilizables.
+    Resuelve el binario de chromedriver una sola vez, entrega drivers
+    verificados a los scrapers y los limpia (cookies y pestañas) al
+    devolverlos. Un driver se recicla tras `max_usos` préstamos, si falló o
+    si el gobernador lo terminó por exceder su presupuesto de recursos.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_usos=POOL_MAX_USOS):
+        self.size = size
+        self.max_usos = max_usos
+        self._driver_path = None
+        self._libres = deque()
+        self._usos = {}
+        self._errores = set()
+        self._prestados = set()
+        self._creando = 0
+        self._cond = threading.Condition()
+        self._cerrado = False
+        # Estadísticas
+        self._creados = 0
+        self._reciclados = 0
+        self._prestamos = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    def _resolver_driver_path(self):
+        """Resuelve la ruta de chromedriver una sola vez por proceso."""
+        if self._driver_path is None:
+            self._driver_path = ChromeDriverManager().install()
+        return self._driver_path
+
+    def _build_options(self):
+        """Opciones comunes a todos los scrapers basados en Chrome."""
+        options = ChromeOptions()
+        options.add_argument("--headless")
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-software-rasterizer')
+        options.add_argument('--window-size=1920,1080')
+        for argumento in argumentos_extra():
+            options.add_argument(argumento)
+        return options
+
+    def _crear_driver(self):
+        service = ChromeService(self._resolver_driver_path())
+        driver = webdriver.Chrome(service=service, options=self._build_options())
+        obtener_gobernador().registrar(driver)
+        with self._cond:
+            self._usos[driver] = 0
+            self._creados += 1
+        return driver
+
+    def _destruir_driver(self, driver):
+        with self._cond:
+            self._usos.pop(driver, None)
+            self._errores.discard(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        obtener_gobernador().olvidar(driver)
+
+    def _esta_sano(self, driver):
+        """Verifica que el driver siga respondiendo."""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _resetear(self, driver):
+        """Deja el driver limpio para el siguiente préstamo."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def precalentar(self):
+        """Lanza los drivers del pool por adelantado."""
+        self._resolver_driver_path()
+        while True:
+            with self._cond:
+                total = len(self._usos) + self._creando
+                if self._cerrado or total >= self.size:
+                    return
+                self._creando += 1
+            try:
+                driver = self._crear_driver()
+            except Exception as e:
+                print(f"Error precalentando el pool de drivers: {e}")
+                with self._cond:
+                    self._creando -= 1
+                return
+            with self._cond:
+                self._creando -= 1
+                self._libres.append(driver)
+                self._cond.notify()
+
+    def adquirir(self, timeout=POOL_TIMEOUT, user_agent=None, tienda=None):
+        """
+        Presta un driver sano del pool. Bloquea hasta `timeout` segundos.
+        Aplica el perfil de bloqueo de recursos de `tienda` (por defecto la
+        tienda de la búsqueda del hilo actual).
+        """
+        with etapa(NAVEGADOR, tienda):
+            return self._adquirir(timeout, user_agent, tienda)
+
+    def _adquirir(self, timeout, user_agent, tienda):
+        inicio = time.time()
+        limite = inicio + timeout
+        while True:
+            crear = False
+            with self._cond:
+                while True:
+                    if self._cerrado:
+                        raise RuntimeError("El pool de drivers está cerrado")
+                    if self._libres:
+                        driver = self._libres.popleft()
+                        break
+                    if len(self._usos) + self._creando < self.size:
+                        self._creando += 1
+                        crear = True
+                        driver = None
+                        break
+                    restante = limite - time.time()
+                    if restante <= 0:
+                        raise TimeoutError("No hay drivers disponibles en el pool")
+                    self._cond.wait(restante)
+
+            if crear:
+                try:
+                    driver = self._crear_driver()
+                finally:
+                    with self._cond:
+                        self._creando -= 1
+                        self._cond.notify()
+            elif not self._esta_sano(driver):
+                self._reciclar(driver)
+                continue
+
+            espera = time.time() - inicio
+            with self._cond:
+                self._prestados.add(driver)
+                self._usos[driver] = self._usos.get(driver, 0) + 1
+                self._prestamos += 1
+                self._espera_total += espera
+                self._espera_max = max(self._espera_max, espera)
+            obtener_gobernador().prestar(driver)
+
+            if user_agent:
+                try:
+                    driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": user_agent})
+                except Exception:
+                    pass
+            aplicar_perfil(driver, tienda or control_actual()[1])
+            return driver
+
+    def reportar_error(self, driver):
+        """Marca un driver para que se recicle al devolverlo."""
+        contar(ERRORES)
+        with self._cond:
+            if driver in self._usos:
+                self._errores.add(driver)
+
+    def liberar(self, driver):
+        """Devuelve un driver al pool, reciclándolo si corresponde."""
+        with etapa(CIERRE):
+            self._liberar(driver)
+
+    def _liberar(self, driver):
+        with self._cond:
+            if driver not in self._prestados:
+                return
+            self._prestados.discard(driver)
+            agotado = self._usos.get(driver, 0) >= self.max_usos
+            fallido = driver in self._errores
+        gobernador = obtener_gobernador()
+        gobernador.devolver(driver)
+        if gobernador.excedido(driver):
+            fallido = True
+
+        if self._cerrado or agotado or fallido:
+            self._reciclar(driver)
+            return
+
+        try:
+            self._resetear(driver)
+        except Exception:
+            self._reciclar(driver)
+            return
+
+        with self._cond:
+            self._libres.append(driver)
+            self._cond.notify()
+
+    def _reciclar(self, driver):
+        self._destruir_driver(driver)
+        with self._cond:
+            self._reciclados += 1
+            self._cond.notify()
+
+    @contextmanager
+    def prestar(self, timeout=POOL_TIMEOUT, user_agent=None, tienda=None):
+        """Context manager: `with pool.prestar() as driver: ...`"""
+        driver = self.adquirir(timeout=timeout, user_agent=user_agent, tienda=tienda)
+        try:
+            yield driver
+        except Exception:
+            self.reportar_error(driver)
+            raise
+        finally:
+            self.liberar(driver)
+
+    def estadisticas(self):
+        """Retorna el tamaño del pool y los tiempos de espera de préstamo."""
+        with self._cond:
+            return {
+                'size': self.size,
+                'activos': len(self._usos),
+                'libres': len(self._libres),
+                'prestados': len(self._prestados),
+                'creados': self._creados,
+                'reciclados': self._reciclados,
+                'prestamos': self._prestamos,
+                'espera_promedio': round(self._espera_total / self._prestamos, 3) if self._prestamos else 0.0,
+                'espera_max': round(self._espera_max, 3),
+            }
+
+    def cerrar(self):
+        """Cierra todos los drivers libres; los prestados se cierran al devolverse."""
+        with self._cond:
+            self._cerrado = True
+            libres = list(self._libres)
+            self._libres.clear()
+            self._cond.notify_all()
+        for driver in libres:
+            self._destruir_driver(driver)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obtener_pool():
+    """Retorna el pool de drivers compartido por todo el proceso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+        return _pool
+
+def obtener_driver(user_agents=None, tienda=None):
+    """Atajo para los scrapers: presta un driver con un user-agent aleatorio."""
+    user_agent = random.choice(user_agents) if user_agents else None
+    return obtener_pool().adquirir(user_agent=user_agent, tienda=tienda)
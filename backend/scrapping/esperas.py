@@ -0,0 +1,236 @@
+import os
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from .metricas import contar, es_timeout, TIMEOUTS
+
+# Intervalo mínimo de cortesía entre cargas de página al mismo host (segundos).
+# Se puede ajustar por host: INTERVALOS_CORTESIA="www.falabella.com.pe=2,www.metro.pe=1"
+INTERVALO_CORTESIA = float(os.environ.get('INTERVALO_CORTESIA', 1.5))
+INTERVALOS_CORTESIA = {
+    host.strip(): float(valor)
+    for host, _, valor in (
+        par.partition('=') for par in os.environ.get('INTERVALOS_CORTESIA', '').split(',') if '=' in par
+    )
+}
+
+# JS: identidad de la primera tarjeta (link o texto) para detectar cambio de página.
+# Compartida por Selenium y Playwright, igual que en bulk_extractor.
+_JS_IDENTIDAD = """
+(selector) => {
+    const el = document.querySelector(selector);
+    if (!el) return null;
+    const a = el.matches('a') ? el : el.querySelector('a');
+    return (a && a.href) || el.textContent.slice(0, 200);
+}
+"""
+
+_JS_IDENTIDAD_SELENIUM = "return (" + _JS_IDENTIDAD + ")(arguments[0]);"
+
+_JS_CAMBIO_PLAYWRIGHT = (
+    "([selector, anterior]) => { const id = (" + _JS_IDENTIDAD + ")(selector);"
+    " return id !== null && id !== anterior; }"
+)
+
+# JS: recursos de red cargados hasta ahora y estado del documento
+_JS_RED = "return [document.readyState, performance.getEntriesByType('resource').length];"
+
+# JS asíncrono: resuelve cuando el DOM bajo el selector deja de mutar por `quietud` ms
+_JS_MUTACIONES = """
+const [selector, quietud, limite, done] = arguments;
+const raiz = document.querySelector(selector) || document.body;
+let timer = setTimeout(() => { obs.disconnect(); done(true); }, quietud);
+const obs = new MutationObserver(() => {
+    clearTimeout(timer);
+    timer = setTimeout(() => { obs.disconnect(); done(true); }, quietud);
+});
+obs.observe(raiz, {childList: true, subtree: true, attributes: true});
+setTimeout(() => { obs.disconnect(); done(false); }, limite);
+"""
+
+
+class RegistroEsperas:
+    """Acumula el tiempo que cada tienda pasa esperando (cortesía, condiciones, pausas fijas)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totales = defaultdict(lambda: defaultdict(float))
+        self._ultimo_acceso = {}
+
+    def registrar(self, tienda, segundos, tipo):
+        with self._lock:
+            self._totales[tienda][tipo] += segundos
+            self._totales[tienda]['total'] += segundos
+
+    def reservar_cortesia(self, host):
+        """Reserva el siguiente turno para el host y retorna cuántos segundos hay que esperar."""
+        intervalo = INTERVALOS_CORTESIA.get(host, INTERVALO_CORTESIA)
+        with self._lock:
+            ahora = time.time()
+            turno = max(ahora, self._ultimo_acceso.get(host, 0) + intervalo)
+            self._ultimo_acceso[host] = turno
+            return turno - ahora
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                tienda: {tipo: round(segundos, 2) for tipo, segundos in tipos.items()}
+                for tienda, tipos in self._totales.items()
+            }
+
+
+_registro = RegistroEsperas()
+
+def obtener_registro_esperas():
+    """Retorna el registro de esperas compartido por todo el proceso."""
+    return _registro
+
+def host_de(url):
+    return urlparse(url).netloc or url
+
+
+# Utilidades síncronas (Selenium); usadas por BaseScraper y los scrapers legacy
+
+def pausar(tienda, segundos, tipo='fija'):
+    """time.sleep contabilizado en el registro de esperas."""
+    if segundos > 0:
+        time.sleep(segundos)
+        _registro.registrar(tienda, segundos, tipo)
+
+def esperar_cortesia(tienda, url):
+    """Respeta el intervalo mínimo de cortesía entre cargas de página al host."""
+    pausar(tienda, _registro.reservar_cortesia(host_de(url)), 'cortesia')
+
+def _esperar(tienda, driver, condicion, timeout):
+    inicio = time.time()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(condicion)
+        return True
+    except TimeoutException:
+        contar(TIMEOUTS, tienda)
+        return False
+    finally:
+        _registro.registrar(tienda, time.time() - inicio, 'condicion')
+
+def identidad_primera_tarjeta(driver, selector):
+    """Retorna el link (o texto) de la primera tarjeta de producto."""
+    try:
+        return driver.execute_script(_JS_IDENTIDAD_SELENIUM, selector)
+    except Exception:
+        return None
+
+def contar_elementos(driver, selector):
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", selector)
+
+def esperar_cambio_conteo(tienda, driver, selector, conteo_anterior, timeout=15):
+    """Espera a que cambie la cantidad de tarjetas (ej. tras "Mostrar más")."""
+    return _esperar(tienda, driver, lambda d: contar_elementos(d, selector) != conteo_anterior, timeout)
+
+def esperar_cambio_primera_tarjeta(tienda, driver, selector, identidad_anterior, timeout=15):
+    """Espera a que la primera tarjeta sea otra (ej. tras pasar de página)."""
+    def _cambio(d):
+        identidad = identidad_primera_tarjeta(d, selector)
+        return identidad is not None and identidad != identidad_anterior
+    return _esperar(tienda, driver, _cambio, timeout)
+
+def esperar_navegacion(tienda, driver, elemento, url_anterior, timeout=15):
+    """
+    Espera a que el envío de un formulario (ej. Enter en el buscador) deje la
+    página: cambia la URL o `elemento` deja de estar en el DOM. Va antes de
+    esperar_red_inactiva, que sobre la portada ya cargada se cumpliría al instante.
+    """
+    se_fue = EC.staleness_of(elemento)
+    return _esperar(tienda, driver, lambda d: d.current_url != url_anterior or se_fue(d), timeout)
+
+def esperar_red_inactiva(tienda, driver, timeout=15, quietud=0.5):
+    """
+    Espera a que el documento esté completo y no se carguen recursos nuevos
+    durante `quietud` segundos.
+    """
+    estado = {'conteo': -1, 'desde': time.time()}
+
+    def _inactiva(d):
+        listo, conteo = d.execute_script(_JS_RED)
+        ahora = time.time()
+        if conteo != estado['conteo']:
+            estado['conteo'], estado['desde'] = conteo, ahora
+            return False
+        return listo == 'complete' and ahora - estado['desde'] >= quietud
+    return _esperar(tienda, driver, _inactiva, timeout)
+
+def esperar_mutaciones(tienda, driver, selector='body', timeout=15, quietud=0.5):
+    """Espera (MutationObserver en el navegador) a que el DOM bajo el selector deje de cambiar."""
+    inicio = time.time()
+    try:
+        driver.set_script_timeout(timeout + 1)
+        estable = bool(driver.execute_async_script(_JS_MUTACIONES, selector, int(quietud * 1000), int(timeout * 1000)))
+        if not estable:
+            contar(TIMEOUTS, tienda)
+        return estable
+    except Exception:
+        return False
+    finally:
+        _registro.registrar(tienda, time.time() - inicio, 'condicion')
+
+
+# Utilidades asíncronas (Playwright); usadas por AsyncBaseScraper
+
+async def pausar_async(tienda, segundos, tipo='fija'):
+    """asyncio.sleep contabilizado en el registro de esperas."""
+    if segundos > 0:
+        await asyncio.sleep(segundos)
+        _registro.registrar(tienda, segundos, tipo)
+
+async def esperar_cortesia_async(tienda, url):
+    """Versión asíncrona de esperar_cortesia (no bloquea el event loop)."""
+    await pausar_async(tienda, _registro.reservar_cortesia(host_de(url)), 'cortesia')
+
+async def identidad_primera_tarjeta_async(page, selector):
+    try:
+        return await page.evaluate(_JS_IDENTIDAD, selector)
+    except Exception:
+        return None
+
+async def _esperar_async(tienda, espera):
+    """Espera la corrutina `espera` de Playwright: True si se cumplió, False (y cuenta el timeout) si no."""
+    inicio = time.time()
+    try:
+        await espera
+        return True
+    except Exception as e:
+        if es_timeout(e):
+            contar(TIMEOUTS, tienda)
+        return False
+    finally:
+        _registro.registrar(tienda, time.time() - inicio, 'condicion')
+
+async def esperar_navegacion_async(tienda, page, url_anterior, timeout=15):
+    """Versión asíncrona de esperar_navegacion: espera a que la URL deje de ser `url_anterior`."""
+    return await _esperar_async(tienda, page.wait_for_url(lambda url: url != url_anterior, timeout=timeout * 1000))
+
+async def esperar_red_inactiva_async(tienda, page, timeout=15):
+    """Versión asíncrona de esperar_red_inactiva (estado 'networkidle' de Playwright)."""
+    return await _esperar_async(tienda, page.wait_for_load_state('networkidle', timeout=timeout * 1000))
+
+async def esperar_cambio_primera_tarjeta_async(tienda, page, selector, identidad_anterior, timeout=15):
+    """Espera a que la primera tarjeta sea otra; sin selector espera la red inactiva."""
+    if not selector:
+        return await esperar_red_inactiva_async(tienda, page, timeout)
+    return await _esperar_async(tienda, page.wait_for_function(
+        _JS_CAMBIO_PLAYWRIGHT, arg=[selector, identidad_anterior], timeout=timeout * 1000
+    ))
+
+async def contar_elementos_async(page, selector):
+    return await page.eval_on_selector_all(selector, "els => els.length")
+
+async def esperar_cambio_conteo_async(tienda, page, selector, conteo_anterior, timeout=15):
+    """Versión asíncrona de esperar_cambio_conteo (ej. tras "Mostrar más")."""
+    return await _esperar_async(tienda, page.wait_for_function(
+        "([selector, anterior]) => document.querySelectorAll(selector).length !== anterior",
+        arg=[selector, conteo_anterior], timeout=timeout * 1000
+    ))
@@ -1,122 +1,134 @@
 import os
-import time
-import random
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from .ripley import obtener_user_agents
+from .driver_pool import obtener_driver, obtener_pool
+from .esperas import esperar_cortesia, esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
 
-def buscar_en_estilos(producto):
+SELECTOR_TARJETA = "div.vtex-search-result-3-x-galleryItem"
+
+@limitado_por_host("https://www.estilos.com.pe/")
+def buscar_en_estilos(producto, control=None):
     """Busca un producto en Estilos usando Selenium y recorre hasta 10 páginas de resultados."""
     user_agents = obtener_user_agents()
     if not user_agents:
         print("Error: Lista de User-Agents vacía.")
         return []
 
-    options = ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
     
     resultados = []
     
+    driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = obtener_driver(user_agents, tienda='estilos')
 
-        driver.get("https://www.estilos.com.pe/")
+        esperar_cortesia('estilos', "https://www.estilos.com.pe/")
+        with etapa(INICIO, 'estilos'):
+            driver.get("https://www.estilos.com.pe/")
         
-        search_input = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "input.vtex-styleguide-9-x-input"))
-        )
+        with etapa(BUSQUEDA, 'estilos'):
+            search_input = WebDriverWait(driver, 15).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "input.vtex-styleguide-9-x-input"))
+            )
 
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
+            search_input.clear()
+            search_input.send_keys(producto)
+            search_input.send_keys(Keys.RETURN)
 
         pagina_actual = 1
         max_paginas = 10
 
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.vtex-search-result-3-x-galleryItem"))
-                )
-                items = driver.find_elements(By.CSS_SELECTOR, "div.vtex-search-result-3-x-galleryItem")
+                with etapa(RESULTADOS, 'estilos'):
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, SELECTOR_TARJETA))
+                    )
+                items = driver.find_elements(By.CSS_SELECTOR, SELECTOR_TARJETA)
             except TimeoutException:
     
                 break
 
-            for item in items:
-                try:
-                    # Extraer nombre
-                    nombre_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-summary-2-x-productBrand")
-                    nombre = nombre_elem.text.strip()
-
-                    # Extraer link
-                    link_elem = item.find_element(By.CSS_SELECTOR, "a.vtex-product-summary-2-x-clearLink")
-                    link = link_elem.get_attribute("href")
-
-                    # Extraer precio
-                    precio = None
+            with etapa(EXTRACCION, 'estilos'):
+                for item in items:
                     try:
-                        precio_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-price-1-x-sellingPriceValue")
-                        precio_text = precio_elem.text.strip()
-                        precio = float(re.sub(r"[^\d.]", "", precio_text))
-                    except (NoSuchElementException, ValueError):
+                        # Extraer nombre
+                        nombre_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-summary-2-x-productBrand")
+                        nombre = nombre_elem.text.strip()
+
+                        # Extraer link
+                        link_elem = item.find_element(By.CSS_SELECTOR, "a.vtex-product-summary-2-x-clearLink")
+                        link = link_elem.get_attribute("href")
+
+                        # Extraer precio
+                        precio = None
+                        try:
+                            precio_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-price-1-x-sellingPriceValue")
+                            precio_text = precio_elem.text.strip()
+                            precio = float(re.sub(r"[^\d.]", "", precio_text))
+                        except (NoSuchElementException, ValueError):
+                            continue
+
+                        # Extraer descuento
+                        descuento = None
+                        try:
+                            desc_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-price-1-x-savingsPercentage")
+                            desc_text = desc_elem.text.strip().replace("%", "").replace("-", "")
+                            descuento = int(desc_text)
+                        except NoSuchElementException:
+                            pass
+
+                        # Extraer imagen
+                        imagen = None
+                        try:
+                            img_elem = item.find_element(By.CSS_SELECTOR, "img.vtex-product-summary-2-x-image")
+                            imagen = img_elem.get_attribute("src")
+                        except NoSuchElementException:
+                            pass
+
+                        if nombre and precio and link:
+                            resultados.append({
+                                "nombre": nombre,
+                                "precio": precio,
+                                "link": link,
+                                "tienda": "estilos",
+                                "descuento": descuento,
+                                "imagen": imagen
+                            })
+                    except Exception as e:
+
                         continue
 
-                    # Extraer descuento
-                    descuento = None
-                    try:
-                        desc_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-price-1-x-savingsPercentage")
-                        desc_text = desc_elem.text.strip().replace("%", "").replace("-", "")
-                        descuento = int(desc_text)
-                    except NoSuchElementException:
-                        pass
-
-                    # Extraer imagen
-                    imagen = None
-                    try:
-                        img_elem = item.find_element(By.CSS_SELECTOR, "img.vtex-product-summary-2-x-image")
-                        imagen = img_elem.get_attribute("src")
-                    except NoSuchElementException:
-                        pass
-
-                    if nombre and precio and link:
-                        resultados.append({
-                            "nombre": nombre,
-                            "precio": precio,
-                            "link": link,
-                            "tienda": "estilos",
-                            "descuento": descuento,
-                            "imagen": imagen
-                        })
-                except Exception as e:
-
-                    continue
+            # Publicar la página apenas se extrae
+            registrar_pagina(resultados[inicio_pagina:], 'estilos')
+            entregar(control, resultados[inicio_pagina:])
 
             # Scroll al final de la página
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
 
             try:
-                next_button = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-link[aria-label='Siguiente']"))
-                )
+                with etapa(PAGINACION, 'estilos'):
+                    next_button = WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-link[aria-label='Siguiente']"))
+                    )
                 if next_button and next_button.is_enabled():
-                    driver.execute_script("arguments[0].click();", next_button)
+                    identidad = identidad_primera_tarjeta(driver, SELECTOR_TARJETA)
+                    esperar_cortesia('estilos', "https://www.estilos.com.pe/")
+                    with etapa(PAGINACION, 'estilos'):
+                        driver.execute_script("arguments[0].click();", next_button)
                     pagina_actual += 1
-                    time.sleep(random.uniform(4, 7))
+                    with etapa(RESULTADOS, 'estilos'):
+                        esperar_cambio_primera_tarjeta('estilos', driver, SELECTOR_TARJETA, identidad)
                 else:
                     break
             except (TimeoutException, NoSuchElementException):
@@ -124,9 +136,11 @@ def buscar_en_estilos(producto):
 
     except Exception as e:
         print(f"Error al buscar en Estilos: {e}")
-        return resultados
+        if driver is not None:
+            obtener_pool().reportar_error(driver)
+        return recortar(control, resultados)
     finally:
-        if 'driver' in locals():
-            driver.quit()
+        if driver is not None:
+            obtener_pool().liberar(driver)
 
-    return resultados
\ No newline at end of file
+    return recortar(control, resultados)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import re
+from .async_base_scraper import AsyncBaseScraper
+from .bulk_extractor import EspecificacionTarjeta
+from .estilos import SELECTOR_TARJETA
+
+# Selectores de la tarjeta de producto de Estilos (VTEX IO)
+ESPEC_ESTILOS = EspecificacionTarjeta(SELECTOR_TARJETA, {
+    'nombre': ("span.vtex-product-summary-2-x-productBrand", "text"),
+    'link': ("a.vtex-product-summary-2-x-clearLink", "prop:href"),
+    'precio': ("span.vtex-product-price-1-x-sellingPriceValue", "text"),
+    'descuento': ("span.vtex-product-price-1-x-savingsPercentage", "text"),
+    'imagen': ("img.vtex-product-summary-2-x-image", "prop:src"),
+})
+
+def procesar_tarjeta_estilos(raw):
+    """Convierte los campos crudos de una tarjeta de Estilos en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
+
+    try:
+        precio = float(re.sub(r"[^\d.]", "", raw.get('precio') or ""))
+    except ValueError:
+        return None
+
+    descuento = None
+    if raw.get('descuento'):
+        try:
+            descuento = int(raw['descuento'].replace("%", "").replace("-", "").strip())
+        except ValueError:
+            pass
+
+    if not (nombre and precio and link):
+        return None
+
+    return {
+        "nombre": nombre,
+        "precio": precio,
+        "link": link,
+        "tienda": "estilos",
+        "descuento": descuento,
+        "imagen": raw.get('imagen')
+    }
+
+class EstilosPlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Estilos sobre el motor asíncrono de Playwright."""
+    
+    ESPEC_TARJETA = ESPEC_ESTILOS
+    
+    def __init__(self):
+        super().__init__("estilos")
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Estilos."""
+        return "https://www.estilos.com.pe/"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Estilos y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        search_input = await self.page.wait_for_selector("input.vtex-styleguide-9-x-input", timeout=15000)
+        await search_input.fill(producto)
+        await search_input.press('Enter')
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element(SELECTOR_TARJETA, timeout=15):
+            return []
+        return await self.page.query_selector_all(SELECTOR_TARJETA)
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Estilos."""
+        return await self._extraer_con_espec(item)
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_estilos(raw)
+    
+    async def _go_to_next_page(self):
+        """Baja hasta la paginación (se renderiza al final) y pasa a la siguiente página."""
+        await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        if not await self._wait_for_element("a.page-link[aria-label='Siguiente']", timeout=10):
+            return False
+        return await self._click_next("a.page-link[aria-label='Siguiente']", por_js=True)
+
+async def buscar_en_estilos_playwright(producto, control=None):
+    """Busca en Estilos con Playwright. Debe correr en el loop del runtime."""
+    scraper = EstilosPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
@@ -1,17 +1,17 @@
 import os
-import time
-import random
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from .ripley import obtener_user_agents
+from .driver_pool import obtener_driver, obtener_pool
+from .bulk_extractor import EspecificacionTarjeta, extraer_con_selenium
+from .esperas import esperar_cortesia, esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
 from urllib.parse import urljoin, urlparse
 from collections import OrderedDict
 
@@ -42,6 +42,22 @@ class ImageExtractor:
 
         return self.FALLBACK_IMAGE_URL
 
+    def extract_image_from_raw(self, raw):
+        """Mismas estrategias que extract_image, sobre los campos de la extracción masiva."""
+        candidatos = [
+            raw.get('img_picture_src') or self._get_image_url_from_srcset(raw.get('img_picture_srcset')),
+            self._get_image_url_from_srcset(raw.get('img_source_srcset')),
+            raw.get('img_wrapper_src') or self._get_image_url_from_srcset(raw.get('img_wrapper_srcset')),
+            raw.get('img_wrapper_data_src') or self._get_image_url_from_srcset(raw.get('img_wrapper_data_srcset')),
+            raw.get('img_section_src') or self._get_image_url_from_srcset(raw.get('img_section_srcset')),
+        ]
+
+        for image_url in candidatos:
+            if image_url:
+                return self._process_image_url(image_url)
+
+        return self.FALLBACK_IMAGE_URL
+
     def _extract_from_picture_img(self, item):
         img_element = item.find_element(By.CSS_SELECTOR, "picture img")
         return self._get_image_url_from_img_element(img_element)
@@ -125,106 +141,128 @@ class ImageExtractor:
 
         return image_url
 
-def buscar_en_falabella(producto):
+# Selectores de la tarjeta de producto de Falabella (extracción masiva).
+# Los campos img_* cubren las mismas estrategias que ImageExtractor.
+_SECCION_IMG = "div.pod-head section.layout_grid-view.layout_view_4_GRID img"
+ESPEC_FALABELLA = EspecificacionTarjeta("a.pod-link[data-pod='catalyst-pod']", {
+    'nombre': ("b.pod-subTitle", "text"),
+    'link': ("", "prop:href"),
+    'precio': ("li.prices-0 span", "text"),
+    'descuento': ("div.discount-badge span", "text"),
+    'img_picture_src': ("picture img", "src"),
+    'img_picture_srcset': ("picture img", "srcset"),
+    'img_source_srcset': ("picture source", "srcset"),
+    'img_wrapper_src': (".image-wrapper img", "src"),
+    'img_wrapper_srcset': (".image-wrapper img", "srcset"),
+    'img_wrapper_data_src': (".image-wrapper img", "data-src"),
+    'img_wrapper_data_srcset': (".image-wrapper img", "data-srcset"),
+    'img_section_src': (_SECCION_IMG, "src"),
+    'img_section_srcset': (_SECCION_IMG, "srcset"),
+})
+
+def procesar_tarjeta_falabella(raw, image_extractor):
+    """Convierte los campos crudos de una tarjeta de Falabella en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
+
+    precio = None
+    try:
+        precio = float(re.sub(r"[^\d.]", "", raw.get('precio') or ""))
+    except ValueError:
+        pass
+
+    descuento = None
+    if raw.get('descuento'):
+        try:
+            descuento = int(raw['descuento'].replace("%", "").replace("-", ""))
+        except ValueError:
+            pass
+
+    if not (nombre and precio and link):
+        return None
+
+    return {
+        "nombre": nombre,
+        "precio": precio,
+        "link": link,
+        "tienda": "falabella",
+        "descuento": descuento,
+        "imagen": image_extractor.extract_image_from_raw(raw)
+    }
+
+@limitado_por_host("https://www.falabella.com.pe/falabella-pe")
+def buscar_en_falabella(producto, control=None):
     resultados = []
     user_agents = obtener_user_agents()
     if not user_agents:
         print("Error: Lista de User-Agents vacía.")
         return resultados
 
-    options = ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
-    options.add_argument('--ignore-certificate-errors')
-
+    driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = obtener_driver(user_agents, tienda='falabella')
         image_extractor = ImageExtractor()
 
-        driver.get("https://www.falabella.com.pe/falabella-pe")
+        esperar_cortesia('falabella', "https://www.falabella.com.pe/falabella-pe")
+        with etapa(INICIO, 'falabella'):
+            driver.get("https://www.falabella.com.pe/falabella-pe")
 
-        # Cierra modal de ubicación si aparece
-        try:
-            WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "button#acc-alert-deny"))
-            ).click()
-        except TimeoutException:
-            pass
+            # Cierra modal de ubicación si aparece
+            try:
+                WebDriverWait(driver, 5).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "button#acc-alert-deny"))
+                ).click()
+            except TimeoutException:
+                pass
 
         try:
-            search_input = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.ID, "testId-SearchBar-Input"))
-            )
+            with etapa(BUSQUEDA, 'falabella'):
+                search_input = WebDriverWait(driver, 15).until(
+                    EC.element_to_be_clickable((By.ID, "testId-SearchBar-Input"))
+                )
+
+                search_input.clear()
+                search_input.send_keys(producto)
+                search_input.send_keys(Keys.RETURN)
         except TimeoutException:
-            driver.quit()
             return resultados
 
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
-
         pagina_actual = 1
         max_paginas = 10
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div[id='testId-searchResults-products']"))
-                )
-                items = driver.find_elements(By.CSS_SELECTOR, "a.pod-link[data-pod='catalyst-pod']")
+                with etapa(RESULTADOS, 'falabella'):
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "div[id='testId-searchResults-products']"))
+                    )
 
             except TimeoutException:
                 break
 
-            for item in items:
-                nombre = "Nombre no encontrado"
-                try:
-                    nombre = item.find_element(By.CSS_SELECTOR, "b.pod-subTitle").text.strip()
-                except NoSuchElementException:
-                    pass
-
-                link = item.get_attribute("href")
-
-                precio = None
-                try:
-                    price_li = item.find_element(By.CSS_SELECTOR, "li.prices-0 span")
-                    price_text = price_li.text.strip()
-                    precio = float(re.sub(r"[^\d.]", "", price_text))
-                except (NoSuchElementException, ValueError):
-                    pass
-
-                descuento = None
-                try:
-                    desc_elem = item.find_element(By.CSS_SELECTOR, "div.discount-badge span")
-                    desc_text = desc_elem.text.strip().replace("%", "").replace("-", "")
-                    descuento = int(desc_text)
-                except (NoSuchElementException, ValueError):
-                    pass
-
-                # Usar el ImageExtractor para obtener la imagen
-                imagen = image_extractor.extract_image(item)
-
-                if nombre != "Nombre no encontrado" and precio and link:
-                    resultados.append({
-                        "nombre": nombre,
-                        "precio": precio,
-                        "link": link,
-                        "tienda": "falabella",
-                        "descuento": descuento,
-                        "imagen": imagen
-                    })
+            # Extraer toda la página en un solo viaje al navegador
+            with etapa(EXTRACCION, 'falabella'):
+                for raw in extraer_con_selenium(driver, ESPEC_FALABELLA):
+                    producto_data = procesar_tarjeta_falabella(raw, image_extractor)
+                    if producto_data:
+                        resultados.append(producto_data)
+            registrar_pagina(resultados[inicio_pagina:], 'falabella')
+
+            # Publicar la página apenas se extrae
+            entregar(control, resultados[inicio_pagina:])
 
             try:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(5)
                 next_button = driver.find_element(By.CSS_SELECTOR, "button#testId-pagination-top-arrow-right")
                 if next_button.is_enabled():
-                    driver.execute_script("arguments[0].click();", next_button)
+                    identidad = identidad_primera_tarjeta(driver, ESPEC_FALABELLA.card)
+                    esperar_cortesia('falabella', "https://www.falabella.com.pe/falabella-pe")
+                    with etapa(PAGINACION, 'falabella'):
+                        driver.execute_script("arguments[0].click();", next_button)
                     pagina_actual += 1
-                    time.sleep(random.uniform(4, 7))
+                    with etapa(RESULTADOS, 'falabella'):
+                        esperar_cambio_primera_tarjeta('falabella', driver, ESPEC_FALABELLA.card, identidad)
                 else:
                     break
             except (NoSuchElementException, TimeoutException):
@@ -232,9 +270,11 @@ def buscar_en_falabella(producto):
 
     except Exception as e:
         print(f"Error al buscar en Falabella: {e}")
-        return resultados
+        if driver is not None:
+            obtener_pool().reportar_error(driver)
+        return recortar(control, resultados)
     finally:
-        if 'driver' in locals():
-            driver.quit()
+        if driver is not None:
+            obtener_pool().liberar(driver)
 
-    return resultados
\ No newline at end of file
+    return recortar(control, resultados)
\ No newline at end of file
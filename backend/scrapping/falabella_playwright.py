@@ -0,0 +1,107 @@
+from urllib.parse import quote_plus
+from .async_base_scraper import AsyncBaseScraper
+from .falabella import ImageExtractor, ESPEC_FALABELLA, procesar_tarjeta_falabella
+
+class FalabellaPlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Falabella sobre el motor asíncrono de Playwright."""
+    
+    ESPEC_TARJETA = ESPEC_FALABELLA
+    
+    def __init__(self):
+        super().__init__("falabella")
+        self.image_extractor = ImageExtractor()
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Falabella."""
+        return "https://www.falabella.com.pe/falabella-pe"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Falabella y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        
+        # Cierra modal de ubicación si aparece
+        try:
+            await self.page.click("button#acc-alert-deny", timeout=5000)
+        except Exception:
+            pass
+        
+        search_input = await self.page.wait_for_selector("#testId-SearchBar-Input", timeout=15000)
+        await search_input.fill(producto)
+        await search_input.press('Enter')
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element("div[id='testId-searchResults-products']", timeout=15):
+            return []
+        return await self.page.query_selector_all("a.pod-link[data-pod='catalyst-pod']")
+    
+    async def _extract_image(self, item):
+        """Misma secuencia de estrategias que ImageExtractor, sobre Playwright."""
+        image_url = await self._safe_get_attribute(item, "picture img", "src")
+        if not image_url:
+            srcset = await self._safe_get_attribute(item, "picture source", "srcset")
+            image_url = self.image_extractor._get_image_url_from_srcset(srcset)
+        if not image_url:
+            image_url = await self._safe_get_attribute(item, ".image-wrapper img", "src")
+        if not image_url:
+            image_url = await self._safe_get_attribute(item, ".image-wrapper img", "data-src")
+        if not image_url:
+            return ImageExtractor.FALLBACK_IMAGE_URL
+        return self.image_extractor._process_image_url(image_url)
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Falabella."""
+        try:
+            nombre = await self._safe_get_text(item, "b.pod-subTitle")
+            if not nombre:
+                return None
+            
+            link = await item.get_attribute("href")
+            if not link:
+                return None
+            
+            precio = self._clean_price(await self._safe_get_text(item, "li.prices-0 span"))
+            if precio <= 0:
+                return None
+            
+            descuento = None
+            descuento_texto = await self._safe_get_text(item, "div.discount-badge span")
+            if descuento_texto:
+                try:
+                    descuento = int(descuento_texto.replace("%", "").replace("-", ""))
+                except ValueError:
+                    descuento = None
+            
+            return {
+                "nombre": nombre,
+                "precio": precio,
+                "link": link,
+                "tienda": self.tienda,
+                "descuento": descuento,
+                "imagen": await self._extract_image(item)
+            }
+            
+        except Exception as e:
+            print(f"Error extrayendo datos de producto en Falabella: {e}")
+            return None
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_falabella(raw, self.image_extractor)
+    
+    def _url_pagina(self, producto, pagina):
+        """Los resultados de Falabella son direccionables por URL (?Ntt=...&page=N)."""
+        return f"{self._get_base_url()}/search?Ntt={quote_plus(producto)}&page={pagina}"
+    
+    async def _total_paginas(self):
+        """Lee el número de la última página en la paginación."""
+        return await self._max_numero("[id^='testId-pagination-bottom-button']")
+    
+    async def _go_to_next_page(self):
+        """Navega a la siguiente página en Falabella."""
+        return await self._click_next("button#testId-pagination-top-arrow-right:not([disabled])")
+
+async def buscar_en_falabella_playwright(producto, control=None):
+    """Busca en Falabella con Playwright. Debe correr en el loop del runtime."""
+    scraper = FalabellaPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
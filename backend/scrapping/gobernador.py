@@ -0,0 +1,275 @@
+import os
+import time
+import signal
+import threading
+from collections import deque
+from .control_busqueda import control_actual, RECURSOS
+
+# Presupuesto de recursos por navegador de Selenium (chromedriver + sus Chrome).
+# Se vigila leyendo /proc; si además hay cgroup v2 con permisos, cada navegador
+# va en su propio cgroup con memory.max y cpu.max como tope duro del kernel.
+# RLIMIT_AS no sirve para Chrome: reserva muchísima memoria virtual al arrancar.
+NAVEGADOR_RSS_MAX_MB = float(os.environ.get('NAVEGADOR_RSS_MAX_MB', 1536))
+NAVEGADOR_CPU_MAX = float(os.environ.get('NAVEGADOR_CPU_MAX', 2.0))  # Núcleos promedio en la ventana
+NAVEGADOR_CPU_VENTANA = float(os.environ.get('NAVEGADOR_CPU_VENTANA', 30))
+GOBERNADOR_INTERVALO = float(os.environ.get('GOBERNADOR_INTERVALO', 2))
+NAVEGADOR_CGROUP = os.environ.get('NAVEGADOR_CGROUP', '/sys/fs/cgroup/descuentos')  # Vacío = sin cgroups
+
+_PROC = '/proc'
+_PAGINA = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def _leer_stat(pid):
+    """(ppid, segundos de CPU) de /proc/<pid>/stat, o None si el proceso ya no existe."""
+    try:
+        with open(f'{_PROC}/{pid}/stat') as f:
+            datos = f.read()
+    except OSError:
+        return None
+    # El nombre del comando va entre paréntesis y puede tener espacios
+    campos = datos[datos.rfind(')') + 2:].split()
+    return int(campos[1]), (int(campos[11]) + int(campos[12])) / _TICKS
+
+def _rss(pid):
+    try:
+        with open(f'{_PROC}/{pid}/statm') as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except (OSError, IndexError, ValueError):
+        return 0
+
+def _procesos():
+    """{pid: (ppid, cpu)} de todos los procesos visibles."""
+    procesos = {}
+    for nombre in os.listdir(_PROC):
+        if nombre.isdigit():
+            stat = _leer_stat(int(nombre))
+            if stat is not None:
+                procesos[int(nombre)] = stat
+    return procesos
+
+def arbol(pid, procesos):
+    """El pid y todos sus descendientes."""
+    hijos = {}
+    for p, (ppid, _) in procesos.items():
+        hijos.setdefault(ppid, []).append(p)
+    resultado, pendientes = [], [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        if actual in procesos:
+            resultado.append(actual)
+            pendientes.extend(hijos.get(actual, ()))
+    return resultado
+
+def rss_arbol(pid):
+    """Bytes de RSS del proceso y todos sus descendientes (0 sin /proc)."""
+    if not os.path.isdir(_PROC):
+        return 0
+    return sum(_rss(p) for p in arbol(pid, _procesos()))
+
+
+class _Cgroup:
+    """cgroup v2 propio de un navegador, con tope de memoria y de CPU."""
+
+    def __init__(self, nombre):
+        self.ruta = os.path.join(NAVEGADOR_CGROUP, nombre)
+        os.makedirs(NAVEGADOR_CGROUP, exist_ok=True)
+        with open(os.path.join(NAVEGADOR_CGROUP, 'cgroup.subtree_control'), 'w') as f:
+            f.write('+memory +cpu')
+        os.makedirs(self.ruta, exist_ok=True)
+        with open(os.path.join(self.ruta, 'memory.max'), 'w') as f:
+            f.write(str(int(NAVEGADOR_RSS_MAX_MB * 1024 * 1024)))
+        with open(os.path.join(self.ruta, 'cpu.max'), 'w') as f:
+            f.write(f'{int(NAVEGADOR_CPU_MAX * 100000)} 100000')
+
+    def agregar(self, pids):
+        for pid in pids:
+            try:
+                with open(os.path.join(self.ruta, 'cgroup.procs'), 'w') as f:
+                    f.write(str(pid))
+            except OSError:
+                pass
+
+    def oom_kills(self):
+        try:
+            with open(os.path.join(self.ruta, 'memory.events')) as f:
+                for linea in f:
+                    clave, _, valor = linea.partition(' ')
+                    if clave == 'oom_kill':
+                        return int(valor)
+        except OSError:
+            pass
+        return 0
+
+    def eliminar(self):
+        try:
+            os.rmdir(self.ruta)
+        except OSError:
+            pass
+
+
+class Vigilado:
+    """Un navegador bajo vigilancia: su árbol de procesos, consumo y préstamo actual."""
+
+    def __init__(self, pid, cgroup):
+        self.pid = pid
+        self.cgroup = cgroup
+        self.control = None  # ControlBusqueda de la búsqueda que lo tiene prestado
+        self.tienda = None
+        self.rss = 0
+        self.cpu_previa = {}
+        self.muestras_cpu = deque()  # (momento, segundos de CPU consumidos desde la muestra anterior)
+        self.excedido = None  # Motivo si se terminó por exceder el presupuesto
+
+    def cpu_promedio(self, ahora):
+        while self.muestras_cpu and ahora - self.muestras_cpu[0][0] > NAVEGADOR_CPU_VENTANA:
+            self.muestras_cpu.popleft()
+        if len(self.muestras_cpu) < 2:
+            return 0.0
+        lapso = ahora - self.muestras_cpu[0][0]
+        return sum(cpu for _, cpu in list(self.muestras_cpu)[1:]) / lapso if lapso > 0 else 0.0
+
+
+class Gobernador:
+    """
+    Vigila el RSS y la CPU de cada navegador del pool (chromedriver y todos
+    sus descendientes). Si uno excede el presupuesto se mata su árbol de
+    procesos, la búsqueda que lo tenía prestado se corta con motivo
+    'recursos' y el pool lo recicla al devolverlo.
+    """
+
+    def __init__(self):
+        self.activo = os.path.isdir(_PROC)
+        self._vigilados = {}  # driver -> Vigilado
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._terminados = 0
+        # Solo si el directorio padre es de verdad un cgroup v2
+        self._cgroups = bool(NAVEGADOR_CGROUP) and os.path.exists(
+            os.path.join(os.path.dirname(NAVEGADOR_CGROUP.rstrip('/')), 'cgroup.controllers')
+        )
+
+    def registrar(self, driver):
+        """Empieza a vigilar un driver recién creado."""
+        if not self.activo:
+            return
+        try:
+            pid = driver.service.process.pid
+        except AttributeError:
+            return
+        cgroup = None
+        if self._cgroups:
+            try:
+                cgroup = _Cgroup(f'navegador-{pid}')
+                cgroup.agregar(arbol(pid, _procesos()))
+            except OSError:
+                self._cgroups = False  # Sin permisos: solo vigilancia por /proc
+                cgroup = None
+        with self._lock:
+            self._vigilados[driver] = Vigilado(pid, cgroup)
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name='gobernador', daemon=True)
+                self._hilo.start()
+
+    def olvidar(self, driver):
+        with self._lock:
+            vigilado = self._vigilados.pop(driver, None)
+        if vigilado is not None and vigilado.cgroup is not None:
+            vigilado.cgroup.eliminar()
+
+    def prestar(self, driver):
+        """Asocia el driver a la búsqueda del hilo actual (la que se corta si se excede)."""
+        control, tienda = control_actual()
+        with self._lock:
+            vigilado = self._vigilados.get(driver)
+            if vigilado is not None:
+                vigilado.control = control
+                vigilado.tienda = tienda
+
+    def devolver(self, driver):
+        with self._lock:
+            vigilado = self._vigilados.get(driver)
+            if vigilado is not None:
+                vigilado.control = None
+                vigilado.tienda = None
+
+    def excedido(self, driver):
+        with self._lock:
+            vigilado = self._vigilados.get(driver)
+            return vigilado.excedido if vigilado is not None else None
+
+    def _bucle(self):
+        while True:
+            time.sleep(GOBERNADOR_INTERVALO)
+            try:
+                self.revisar()
+            except Exception as e:
+                print(f"Gobernador: error revisando navegadores: {e}")
+
+    def revisar(self):
+        """Mide cada navegador y termina los que exceden el presupuesto."""
+        with self._lock:
+            vigilados = [v for v in self._vigilados.values() if v.excedido is None]
+        if not vigilados:
+            return
+        procesos = _procesos()
+        ahora = time.time()
+        for vigilado in vigilados:
+            pids = arbol(vigilado.pid, procesos)
+            if vigilado.cgroup is not None:
+                vigilado.cgroup.agregar(p for p in pids if p not in vigilado.cpu_previa)
+            vigilado.rss = sum(_rss(pid) for pid in pids)
+            cpu_actual = {pid: procesos[pid][1] for pid in pids}
+            consumo = sum(max(0.0, cpu - vigilado.cpu_previa.get(pid, cpu)) for pid, cpu in cpu_actual.items())
+            vigilado.cpu_previa = cpu_actual
+            vigilado.muestras_cpu.append((ahora, consumo))
+
+            motivo = None
+            if vigilado.rss > NAVEGADOR_RSS_MAX_MB * 1024 * 1024:
+                motivo = f"RSS {vigilado.rss / 1024 / 1024:.0f} MB > {NAVEGADOR_RSS_MAX_MB:.0f} MB"
+            elif vigilado.cpu_promedio(ahora) > NAVEGADOR_CPU_MAX:
+                motivo = f"CPU {vigilado.cpu_promedio(ahora):.1f} núcleos > {NAVEGADOR_CPU_MAX:.1f}"
+            elif vigilado.cgroup is not None and vigilado.cgroup.oom_kills():
+                motivo = "el kernel mató procesos por memory.max"
+            if motivo:
+                self._terminar(vigilado, pids, motivo)
+
+    def _terminar(self, vigilado, pids, motivo):
+        vigilado.excedido = motivo
+        self._terminados += 1
+        print(f"Gobernador: navegador {vigilado.pid} ({vigilado.tienda or 'libre'}) terminado: {motivo}")
+        if vigilado.control is not None:
+            vigilado.control.abortar(RECURSOS)
+        for pid in reversed(pids):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def estadisticas(self):
+        ahora = time.time()
+        with self._lock:
+            return {
+                'activo': self.activo,
+                'cgroups': self._cgroups,
+                'rss_max_mb': NAVEGADOR_RSS_MAX_MB,
+                'cpu_max': NAVEGADOR_CPU_MAX,
+                'terminados': self._terminados,
+                'navegadores': [
+                    {
+                        'pid': v.pid,
+                        'tienda': v.tienda,
+                        'rss_mb': round(v.rss / 1024 / 1024, 1),
+                        'cpu': round(v.cpu_promedio(ahora), 2),
+                        'excedido': v.excedido,
+                    }
+                    for v in self._vigilados.values()
+                ],
+            }
+
+
+_gobernador = Gobernador()
+
+def obtener_gobernador():
+    """Retorna el gobernador de recursos compartido por todo el proceso."""
+    return _gobernador
@@ -1,112 +1,130 @@
 import os
-import time
-import random
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from .ripley import obtener_user_agents
+from .driver_pool import obtener_driver, obtener_pool
+from .bulk_extractor import EspecificacionTarjeta, extraer_con_selenium
+from .esperas import (
+    esperar_cortesia, esperar_navegacion, esperar_red_inactiva, esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+)
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
+
+SELECTOR_TARJETA = "li.product-item"
+
+# Selectores de la tarjeta de producto de Hiraoka (Magento; extracción masiva)
+ESPEC_HIRAOKA = EspecificacionTarjeta(SELECTOR_TARJETA, {
+    'marca': (".product-item-brand a", "text"),
+    'nombre': (".product-item-name a", "text"),
+    'link': (".product-item-link", "prop:href"),
+    'imagen': (".product-image-photo", "prop:src"),
+    'precio': ("span[data-price-type='finalPrice'] .price", "text"),
+    'precio_antiguo': ("span[data-price-type='oldPrice'] .price", "text"),
+})
+
+def procesar_tarjeta_hiraoka(raw):
+    """Convierte los campos crudos de una tarjeta de Hiraoka en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
 
-def buscar_en_hiraoka(producto):
+    try:
+        precio = float(re.sub(r'[^\d.]', '', raw.get('precio') or ''))
+    except ValueError:
+        return None
+
+    descuento = None
+    if raw.get('precio_antiguo'):
+        try:
+            precio_antiguo = float(re.sub(r'[^\d.]', '', raw['precio_antiguo']))
+            if precio_antiguo > precio:
+                descuento = int(((precio_antiguo - precio) / precio_antiguo) * 100)
+        except ValueError:
+            pass
+
+    if not (precio and nombre and link):
+        return None
+
+    return {
+        'nombre': f"{raw.get('marca') or ''} {nombre}".strip(),
+        'precio': precio,
+        'link': link,
+        'tienda': 'hiraoka',
+        'imagen': raw.get('imagen'),
+        'descuento': descuento
+    }
+
+@limitado_por_host("https://hiraoka.com.pe")
+def buscar_en_hiraoka(producto, control=None):
     """Busca un producto en Hiraoka usando Selenium."""
     resultados = []
     user_agents = obtener_user_agents()
     if not user_agents:
         return resultados
 
-    options = ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
-
+    driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = obtener_driver(user_agents, tienda='hiraoka')
 
-        driver.get("https://hiraoka.com.pe")
+        esperar_cortesia('hiraoka', "https://hiraoka.com.pe")
+        with etapa(INICIO, 'hiraoka'):
+            driver.get("https://hiraoka.com.pe")
         
         # Esperar y encontrar el campo de búsqueda
-        search_input = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "input#search"))
-        )
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
-
-        time.sleep(3)
+        with etapa(BUSQUEDA, 'hiraoka'):
+            search_input = WebDriverWait(driver, 15).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "input#search"))
+            )
+            search_input.clear()
+            search_input.send_keys(producto)
+            url_portada = driver.current_url
+            search_input.send_keys(Keys.RETURN)
+
+        # La portada también tiene tarjetas de producto: esperar a salir de ella
+        # y a que cargue la de resultados
+        with etapa(RESULTADOS, 'hiraoka'):
+            esperar_navegacion('hiraoka', driver, search_input, url_portada)
+            esperar_red_inactiva('hiraoka', driver)
 
         pagina_actual = 1
         max_paginas = 10
 
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
                 # Esperar a que los productos se carguen
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "li.product-item"))
-                )
-
-                # Obtener todos los productos de la página
-                productos = driver.find_elements(By.CSS_SELECTOR, "li.product-item")
-
-                for item in productos:
-                    try:
-                        # Extraer marca
-                        marca = item.find_element(By.CSS_SELECTOR, ".product-item-brand a").text.strip()
-                        
-                        # Extraer nombre
-                        nombre = item.find_element(By.CSS_SELECTOR, ".product-item-name a").text.strip()
-                        
-                        # Extraer link
-                        link = item.find_element(By.CSS_SELECTOR, ".product-item-link").get_attribute("href")
-                        
-                        # Extraer imagen
-                        imagen = item.find_element(By.CSS_SELECTOR, ".product-image-photo").get_attribute("src")
-                        
-                        # Extraer precios
-                        precio_actual = None
-                        precio_antiguo = None
-
-                        try:
-                            precio_actual = float(re.sub(r'[^\d.]', '', 
-                                item.find_element(By.CSS_SELECTOR, "span[data-price-type='finalPrice'] .price").text))
-                            precio_antiguo = float(re.sub(r'[^\d.]', '', 
-                                item.find_element(By.CSS_SELECTOR, "span[data-price-type='oldPrice'] .price").text))
-                        except:
-                            continue
-
-                        # Calcular descuento
-                        descuento = None
-                        if precio_actual and precio_antiguo and precio_antiguo > precio_actual:
-                            descuento = int(((precio_antiguo - precio_actual) / precio_antiguo) * 100)
-
-                        if precio_actual and nombre and link:
-                            resultados.append({
-                                'nombre': f"{marca} {nombre}".strip(),
-                                'precio': precio_actual,
-                                'link': link,
-                                'tienda': 'hiraoka',
-                                'imagen': imagen,
-                                'descuento': descuento
-                            })
-
-                    except Exception as e:
-                        print(f"Error procesando producto: {str(e)}")
-                        continue
+                with etapa(RESULTADOS, 'hiraoka'):
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, SELECTOR_TARJETA))
+                    )
+
+                # Extraer toda la página en un solo viaje al navegador
+                with etapa(EXTRACCION, 'hiraoka'):
+                    for raw in extraer_con_selenium(driver, ESPEC_HIRAOKA):
+                        producto_data = procesar_tarjeta_hiraoka(raw)
+                        if producto_data:
+                            resultados.append(producto_data)
+                registrar_pagina(resultados[inicio_pagina:], 'hiraoka')
+
+                # Publicar la página apenas se extrae
+                entregar(control, resultados[inicio_pagina:])
 
                 # Intentar pasar a la siguiente página
                 try:
                     next_button = driver.find_element(By.CSS_SELECTOR, "li.pages-item-next:not(.disabled) a")
-                    driver.execute_script("arguments[0].click();", next_button)
+                    identidad = identidad_primera_tarjeta(driver, SELECTOR_TARJETA)
+                    esperar_cortesia('hiraoka', "https://hiraoka.com.pe")
+                    with etapa(PAGINACION, 'hiraoka'):
+                        driver.execute_script("arguments[0].click();", next_button)
                     pagina_actual += 1
-                    time.sleep(random.uniform(4, 7))
+                    with etapa(RESULTADOS, 'hiraoka'):
+                        esperar_cambio_primera_tarjeta('hiraoka', driver, SELECTOR_TARJETA, identidad)
                 except NoSuchElementException:
                     break
 
@@ -115,7 +133,10 @@ def buscar_en_hiraoka(producto):
 
     except Exception as e:
         print(f"Error al buscar en Hiraoka: {e}")
+        if driver is not None:
+            obtener_pool().reportar_error(driver)
     finally:
-        driver.quit()
+        if driver is not None:
+            obtener_pool().liberar(driver)
 
-    return resultados
+    return recortar(control, resultados)
@@ -0,0 +1,59 @@
+from urllib.parse import quote_plus
+from .async_base_scraper import AsyncBaseScraper
+from . import esperas
+from .hiraoka import SELECTOR_TARJETA, ESPEC_HIRAOKA, procesar_tarjeta_hiraoka
+
+class HiraokaPlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Hiraoka (Magento) sobre el motor asíncrono de Playwright."""
+    
+    ESPEC_TARJETA = ESPEC_HIRAOKA
+    
+    def __init__(self):
+        super().__init__("hiraoka")
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Hiraoka."""
+        return "https://hiraoka.com.pe"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Hiraoka y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        search_input = await self.page.wait_for_selector("input#search", timeout=15000)
+        await search_input.fill(producto)
+        url_portada = self.page.url
+        await search_input.press('Enter')
+        # La portada también tiene tarjetas de producto: esperar a salir de ella
+        # y a que cargue la de resultados
+        await esperas.esperar_navegacion_async(self.tienda, self.page, url_portada)
+        await esperas.esperar_red_inactiva_async(self.tienda, self.page)
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element(SELECTOR_TARJETA, timeout=15):
+            return []
+        return await self.page.query_selector_all(SELECTOR_TARJETA)
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Hiraoka."""
+        return await self._extraer_con_espec(item)
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_hiraoka(raw)
+    
+    def _url_pagina(self, producto, pagina):
+        """Los resultados de Magento son direccionables por URL (?q=...&p=N)."""
+        return f"{self._get_base_url()}/catalogsearch/result/?q={quote_plus(producto)}&p={pagina}"
+    
+    async def _total_paginas(self):
+        """Calcula las páginas con el total de productos de la barra de herramientas."""
+        return await self._paginas_por_total(".toolbar-amount .toolbar-number")
+    
+    async def _go_to_next_page(self):
+        """Navega a la siguiente página en Hiraoka."""
+        return await self._click_next("li.pages-item-next:not(.disabled) a")
+
+async def buscar_en_hiraoka_playwright(producto, control=None):
+    """Busca en Hiraoka con Playwright. Debe correr en el loop del runtime."""
+    scraper = HiraokaPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
@@ -0,0 +1,158 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .bulk_extractor import parsear_html, extraer_de_html
+from .control_host import turno, es_bloqueo
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, RESULTADOS, EXTRACCION
+from .tailoy import ESPEC_TAILOY, procesar_tarjeta_tailoy
+from .hiraoka import ESPEC_HIRAOKA, procesar_tarjeta_hiraoka
+
+# Tiendas cuyos resultados vienen renderizados en el servidor (Magento): se
+# descargan por HTTP y se leen con los mismos selectores que usa Selenium.
+# La URL base se puede sobreescribir con HTML_BASE_URL_<TIENDA>.
+TIENDAS_HTML = {
+    'tailoy': {
+        'base_url': 'https://www.tailoy.com.pe',
+        'espec': ESPEC_TAILOY,
+        'procesar': procesar_tarjeta_tailoy,
+        'siguiente': 'a.next',
+    },
+    'hiraoka': {
+        'base_url': 'https://hiraoka.com.pe',
+        'espec': ESPEC_HIRAOKA,
+        'procesar': procesar_tarjeta_hiraoka,
+        'siguiente': 'li.pages-item-next:not(.disabled) a',
+    },
+}
+
+SEARCH_PATH = '/catalogsearch/result/'
+TIMEOUT = 15
+HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Language': 'es-PE,es;q=0.9',
+    'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def obtener_session():
+    """Retorna la sesión HTTP compartida para páginas HTML (keep-alive y pool de conexiones)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(HEADERS)
+            _session = session
+        return _session
+
+def base_url_de(tienda):
+    return os.environ.get(f'HTML_BASE_URL_{tienda.upper()}', TIENDAS_HTML[tienda]['base_url']).rstrip('/')
+
+def _texto_visible(arbol):
+    """Título y comienzo del texto del body, como el que ve detectar_bloqueo_selenium."""
+    titulo = arbol.css_first('title')
+    cuerpo = arbol.body
+    return ' '.join(filter(None, (
+        titulo.text() if titulo is not None else '',
+        cuerpo.text(separator=' ')[:2000] if cuerpo is not None else '',
+    )))
+
+def _pedir_pagina(session, base_url, producto, pagina, espec):
+    """
+    Descarga una página de resultados y retorna su árbol parseado. Cada
+    petición ocupa un turno del controlador AIMD del host; 403/429 y páginas
+    de captcha sin tarjetas cuentan como bloqueo.
+    """
+    with turno(base_url) as t:
+        try:
+            response = session.get(base_url + SEARCH_PATH, params={'q': producto, 'p': pagina}, timeout=TIMEOUT)
+        except requests.exceptions.RetryError:
+            t.bloqueo()
+            raise
+        if response.status_code in (403, 429):
+            t.bloqueo()
+        response.raise_for_status()
+        arbol = parsear_html(response.text)
+        # El <head> de Magento suele mencionar reCAPTCHA: solo se mira el texto visible sin tarjetas
+        if arbol.css_first(espec.card) is None:
+            if es_bloqueo(_texto_visible(arbol)):
+                t.bloqueo()
+                raise ValueError("La tienda respondió con una página de bloqueo")
+            t.vacia()
+    return arbol
+
+def buscar_en_html(tienda, producto, max_paginas=10, control=None):
+    """
+    Busca un producto en una tienda con resultados renderizados en el servidor,
+    sin navegador: descarga cada página de resultados y extrae las tarjetas con
+    selectolax. Lanza una excepción si la página 1 no trae productos, para que
+    el llamador use el navegador (ej: la tienda cambió a renderizar con JS).
+    """
+    config = TIENDAS_HTML[tienda]
+    base_url = base_url_de(tienda)
+    session = obtener_session()
+    resultados = []
+    vistos = set()
+
+    for pagina in range(1, max_paginas + 1):
+        if debe_parar(control, len(resultados)):
+            break
+        try:
+            with etapa(RESULTADOS, tienda, control):
+                arbol = _pedir_pagina(session, base_url, producto, pagina, config['espec'])
+        except (requests.RequestException, ValueError) as e:
+            if pagina == 1:
+                raise
+            print(f"{tienda.title()} HTML: error en la página {pagina}: {e}")
+            break
+
+        nuevos = []
+        with etapa(EXTRACCION, tienda, control):
+            for raw in extraer_de_html(arbol, config['espec'], base_url):
+                producto_data = config['procesar'](raw)
+                if producto_data and producto_data['link'] not in vistos:
+                    vistos.add(producto_data['link'])
+                    nuevos.append(producto_data)
+        registrar_pagina(nuevos, tienda, control)
+        if pagina == 1 and not nuevos:
+            raise ValueError(f"El HTML de {tienda} no trajo productos")
+        resultados.extend(nuevos)
+        entregar(control, nuevos)
+
+        # Magento repite la última página si se pide una más allá del final:
+        # se sigue solo mientras la página tenga enlace a la siguiente
+        if not nuevos or arbol.css_first(config['siguiente']) is None:
+            break
+
+    resultados = recortar(control, resultados)
+    print(f"{tienda.title()} HTML: Búsqueda completada. Total: {len(resultados)} productos")
+    return resultados
+
+def buscar_en_tailoy_html(producto, control=None):
+    return buscar_en_html('tailoy', producto, control=control)
+
+def buscar_en_hiraoka_html(producto, control=None):
+    return buscar_en_html('hiraoka', producto, control=control)
+
+# Para pruebas directas (ej. contra el proxy del benchmark o un servidor local:
+# HTML_BASE_URL_HIRAOKA=http://127.0.0.1:8000 python -m backend.scrapping.html_estatico hiraoka laptop)
+if __name__ == '__main__':
+    import sys
+    import time
+
+    tienda = sys.argv[1] if len(sys.argv) > 1 else 'hiraoka'
+    consulta = sys.argv[2] if len(sys.argv) > 2 else 'laptop'
+
+    start_time = time.time()
+    productos = buscar_en_html(tienda, consulta)
+    print(f"Productos encontrados: {len(productos)} en {time.time() - start_time:.2f} segundos")
+    if productos:
+        print(productos[0])
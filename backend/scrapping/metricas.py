@@ -0,0 +1,195 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from .control_busqueda import control_actual
+
+# Tiempos por etapa de cada scrape y contadores por tienda, expuestos en
+# formato de texto de Prometheus (GET /metrics). Cada proceso lleva sus
+# propias métricas: los workers remotos las sirven con METRICAS_PUERTO.
+METRICAS_PREFIJO = os.environ.get('METRICAS_PREFIJO', 'descuentos')
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Etapas de un scrape, en el orden en que ocurren
+NAVEGADOR = 'navegador'    # Préstamo o arranque del navegador / contexto
+INICIO = 'inicio'          # Carga de la página de inicio de la tienda
+BUSQUEDA = 'busqueda'      # Escribir y enviar la búsqueda
+RESULTADOS = 'resultados'  # Esperar a que aparezcan los resultados (o la respuesta HTTP)
+EXTRACCION = 'extraccion'  # Leer las tarjetas y armar los productos
+PAGINACION = 'paginacion'  # Pasar a la página siguiente
+CIERRE = 'cierre'          # Devolver o cerrar el navegador
+ETAPAS = (NAVEGADOR, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION, CIERRE)
+
+PAGINAS = 'paginas'
+PRODUCTOS = 'productos'
+ERRORES = 'errores'
+TIMEOUTS = 'timeouts'
+CONTADORES = (PAGINAS, PRODUCTOS, ERRORES, TIMEOUTS)
+
+
+class Histograma:
+    """Histograma acumulado con los buckets de Prometheus (le = límite superior)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)  # El último es +Inf
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _etiquetas(pares):
+    texto = ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in pares)
+    return '{' + texto + '}' if texto else ''
+
+
+class RegistroMetricas:
+    """Histogramas y contadores etiquetados; thread-safe y sin dependencias."""
+
+    def __init__(self, prefijo=METRICAS_PREFIJO):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._histogramas = {}  # nombre -> {etiquetas: Histograma}
+        self._contadores = {}   # nombre -> {etiquetas: valor}
+        self._ayudas = {}
+
+    def describir(self, nombre, ayuda):
+        self._ayudas[nombre] = ayuda
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._histogramas.setdefault(nombre, {})
+            histograma = serie.get(clave)
+            if histograma is None:
+                histograma = serie[clave] = Histograma()
+            histograma.observar(valor)
+
+    def incrementar(self, nombre, cantidad=1, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + cantidad
+
+    def exportar(self):
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+        lineas = []
+        with self._lock:
+            for nombre, serie in sorted(self._histogramas.items()):
+                completo = f'{self.prefijo}_{nombre}'
+                if nombre in self._ayudas:
+                    lineas.append(f'# HELP {completo} {self._ayudas[nombre]}')
+                lineas.append(f'# TYPE {completo} histogram')
+                for clave, histograma in sorted(serie.items()):
+                    acumulado = 0
+                    for limite, conteo in zip(histograma.buckets + ('+Inf',), histograma.conteos):
+                        acumulado += conteo
+                        lineas.append(f'{completo}_bucket{_etiquetas(clave + (("le", limite),))} {acumulado}')
+                    lineas.append(f'{completo}_sum{_etiquetas(clave)} {histograma.suma:.6f}')
+                    lineas.append(f'{completo}_count{_etiquetas(clave)} {histograma.cantidad}')
+            for nombre, serie in sorted(self._contadores.items()):
+                completo = f'{self.prefijo}_{nombre}_total'
+                if nombre in self._ayudas:
+                    lineas.append(f'# HELP {completo} {self._ayudas[nombre]}')
+                lineas.append(f'# TYPE {completo} counter')
+                for clave, valor in sorted(serie.items()):
+                    lineas.append(f'{completo}{_etiquetas(clave)} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+
+_registro = RegistroMetricas()
+_registro.describir('etapa_segundos', 'Segundos por etapa de un scrape')
+_registro.describir('busqueda_segundos', 'Segundos totales de la búsqueda de una tienda')
+_registro.describir(PAGINAS, 'Páginas de resultados extraídas')
+_registro.describir(PRODUCTOS, 'Productos extraídos')
+_registro.describir(ERRORES, 'Errores de scraping (motor fallido o navegador con error)')
+_registro.describir(TIMEOUTS, 'Esperas que vencieron sin que la página respondiera')
+
+def obtener_metricas():
+    """Retorna el registro de métricas compartido por todo el proceso."""
+    return _registro
+
+
+def _busqueda(tienda, control):
+    """Completa tienda y control con la búsqueda activa en el hilo (Selenium, API, HTML)."""
+    if tienda is None or control is None:
+        control_hilo, tienda_hilo = control_actual()
+        tienda = tienda or tienda_hilo
+        control = control if control is not None else control_hilo
+    return tienda, control
+
+def es_timeout(error):
+    # TimeoutException de Selenium, TimeoutError de Playwright/asyncio, Timeout de requests
+    return error is not None and 'timeout' in type(error).__name__.lower()
+
+@contextmanager
+def etapa(nombre, tienda=None, control=None):
+    """
+    Mide una etapa del scrape: la registra en el histograma de la tienda y
+    la suma al desglose de la búsqueda (`control.etapas`). Un timeout que
+    escapa del bloque se cuenta en `timeouts`. Sirve también dentro de
+    corrutinas (mide el tiempo de pared, incluidos los await).
+    """
+    tienda, control = _busqueda(tienda, control)
+    inicio = time.time()
+    try:
+        yield
+    except BaseException as e:
+        if es_timeout(e):
+            contar(TIMEOUTS, tienda, control=control)
+        raise
+    finally:
+        segundos = time.time() - inicio
+        if tienda:
+            _registro.observar('etapa_segundos', segundos, tienda=tienda, etapa=nombre)
+        if control is not None:
+            control.sumar_etapa(nombre, segundos)
+
+def contar(nombre, tienda=None, cantidad=1, control=None):
+    """Incrementa un contador de la tienda (y el de la búsqueda en curso)."""
+    tienda, control = _busqueda(tienda, control)
+    if tienda:
+        _registro.incrementar(nombre, cantidad, tienda=tienda)
+    if control is not None:
+        control.sumar_contador(nombre, cantidad)
+
+def registrar_pagina(productos, tienda=None, control=None):
+    """Cuenta una página extraída y sus productos."""
+    contar(PAGINAS, tienda, control=control)
+    contar(PRODUCTOS, tienda, len(productos or ()), control=control)
+
+def registrar_busqueda(tienda, motor, resultado, segundos):
+    """Duración total de la búsqueda de una tienda; `resultado` es ok, parcial o error."""
+    _registro.observar('busqueda_segundos', segundos, tienda=tienda, motor=motor or 'ninguno', resultado=resultado)
+
+
+def servir_metricas(puerto):
+    """Sirve GET /metrics en un hilo (para procesos sin Flask, como los workers remotos)."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class _Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            cuerpo = _registro.exportar().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *argumentos):
+            pass
+
+    servidor = ThreadingHTTPServer(('0.0.0.0', puerto), _Manejador)
+    threading.Thread(target=servidor.serve_forever, name='metricas', daemon=True).start()
+    return servidor
@@ -1,154 +1,167 @@
 import os
-import time
-import random
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from .ripley import obtener_user_agents
+from .driver_pool import obtener_driver, obtener_pool
+from .esperas import esperar_cortesia, esperar_red_inactiva, esperar_cambio_conteo
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
 
-def buscar_en_metro(producto):
+SELECTOR_TARJETA = "section.vtex-product-summary-2-x-container"
+
+def precio_desde_texto(precio_text):
+    """Precio de Metro a partir del texto de la tarjeta (0 si no se puede leer)."""
+    # Limpiar el precio
+    precio_text = re.sub(r'[^\d,.]', '', precio_text or '')
+    precio_text = precio_text.replace(',', '.')
+
+    # Manejar casos con múltiples puntos
+    if precio_text.count('.') > 1:
+        precio_text = precio_text.replace('.', '', precio_text.count('.') - 1)
+
+    try:
+        return float(precio_text) if precio_text else 0
+    except ValueError:
+        return 0
+
+@limitado_por_host("https://www.metro.pe")
+def buscar_en_metro(producto, control=None):
     """Busca un producto en Metro usando Selenium."""
     resultados = []
     user_agents = obtener_user_agents()  # Descomentar si se usa
     if not user_agents:
         return resultados
 
-    options = ChromeOptions()
-    options.add_argument("--headless")  
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
-
+    driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-
-        driver.get("https://www.metro.pe")
-
-        # Intentar diferentes selectores para el campo de búsqueda
-        selectors = [
-            "input.vtex-styleguide-9-x-input",
-            "input[placeholder='¿Que buscas hoy?']",
-            "input.vtex-input",
-            "input#downshift-5-input"
-        ]
-
-        search_input = None
-        for selector in selectors:
-            try:
-                search_input = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                )
-                if search_input:
-                    break
-            except TimeoutException:
-                continue
-
-        if not search_input:
-            raise Exception("No se pudo encontrar el campo de búsqueda")
-        # Asegurar que el elemento sea interactuable
-        WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-        )
-
-        # Limpiar y enviar la búsqueda
-        driver.execute_script("arguments[0].value = '';", search_input)
-        search_input.send_keys(producto)
-        time.sleep(1)
-        search_input.send_keys(Keys.RETURN)
-        time.sleep(5)  # Esperar a que la página de resultados comience a cargar
+        driver = obtener_driver(user_agents, tienda='metro')
+
+        esperar_cortesia('metro', "https://www.metro.pe")
+        with etapa(INICIO, 'metro'):
+            driver.get("https://www.metro.pe")
+
+        with etapa(BUSQUEDA, 'metro'):
+            # Intentar diferentes selectores para el campo de búsqueda
+            selectors = [
+                "input.vtex-styleguide-9-x-input",
+                "input[placeholder='¿Que buscas hoy?']",
+                "input.vtex-input",
+                "input#downshift-5-input"
+            ]
+
+            search_input = None
+            for selector in selectors:
+                try:
+                    search_input = WebDriverWait(driver, 5).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                    )
+                    if search_input:
+                        break
+                except TimeoutException:
+                    continue
 
-        while True:
-            # Esperar a que al menos un producto esté presente
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "section.vtex-product-summary-2-x-container"))
+            if not search_input:
+                raise Exception("No se pudo encontrar el campo de búsqueda")
+            # Asegurar que el elemento sea interactuable
+            WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
             )
 
-            # Hacer scroll hasta el final de la página para cargar los productos dinámicamente
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-
-            time.sleep(8)  # Aumentado el tiempo de espera después del scroll
-            productos = driver.find_elements(By.CSS_SELECTOR, "section.vtex-product-summary-2-x-container")
+            # Limpiar y enviar la búsqueda
+            driver.execute_script("arguments[0].value = '';", search_input)
+            search_input.send_keys(producto)
+            search_input.send_keys(Keys.RETURN)
 
-            for item in productos:
-                try:
-                    # Hacer scroll suave hasta el elemento
-                    driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", item)
-                    time.sleep(1)  # Pequeña pausa para asegurar la carga
+        procesados = 0
+        while True:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
+            with etapa(RESULTADOS, 'metro'):
+                # Esperar a que al menos un producto esté presente
+                WebDriverWait(driver, 30).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, SELECTOR_TARJETA))
+                )
 
-                    nombre = item.find_element(By.CSS_SELECTOR, "span.vtex-product-summary-2-x-productBrand").text.strip()
-                    link = item.find_element(By.CSS_SELECTOR, "a.vtex-product-summary-2-x-clearLink").get_attribute("href")
-                    imagen = item.find_element(By.CSS_SELECTOR, "img.vtex-product-summary-2-x-imageNormal").get_attribute("src")
+                # Hacer scroll hasta el final de la página para cargar los productos dinámicamente
+                # y esperar a que dejen de cargarse recursos (imágenes, precios)
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                esperar_red_inactiva('metro', driver, timeout=10)
+            productos = driver.find_elements(By.CSS_SELECTOR, SELECTOR_TARJETA)
 
-                    # Nueva lógica para extraer precio, similar a Ripley
-                    precio = None
+            # "Mostrar más" agrega tarjetas al final: solo se procesan las nuevas
+            with etapa(EXTRACCION, 'metro'):
+                for item in productos[procesados:]:
                     try:
-                        precio_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-price-1-x-sellingPriceValue")
-                        precio_text = precio_elem.text.strip()
-                        # Imprimir el texto del precio para debug
-                        
-                        # Limpiar el precio
-                        precio_text = re.sub(r'[^\d,.]', '', precio_text)
-                        precio_text = precio_text.replace(',', '.')
-                        
-                        # Manejar casos con múltiples puntos
-                        if precio_text.count('.') > 1:
-                            precio_text = precio_text.replace('.', '', precio_text.count('.') - 1)
-                        
-                        if precio_text:
-                            precio = float(precio_text)
-                    except (NoSuchElementException, ValueError) as e:
-                        continue
-                    if not precio or precio <= 0:
+                        nombre = item.find_element(By.CSS_SELECTOR, "span.vtex-product-summary-2-x-productBrand").text.strip()
+                        link = item.find_element(By.CSS_SELECTOR, "a.vtex-product-summary-2-x-clearLink").get_attribute("href")
+                        imagen = item.find_element(By.CSS_SELECTOR, "img.vtex-product-summary-2-x-imageNormal").get_attribute("src")
+
+                        # Nueva lógica para extraer precio, similar a Ripley
+                        try:
+                            precio_elem = item.find_element(By.CSS_SELECTOR, "span.vtex-product-price-1-x-sellingPriceValue")
+                            precio = precio_desde_texto(precio_elem.text.strip())
+                        except NoSuchElementException:
+                            continue
+                        if not precio or precio <= 0:
+                            continue
+
+                        # Extracción de descuento simplificada
+                        descuento = None
+                        try:
+                            descuento_tag = item.find_element(By.CSS_SELECTOR, 'span.vtex-product-price-1-x-savingsPercentage')
+                            descuento_texto = descuento_tag.text.strip()
+                            match = re.search(r'(\d+)%', descuento_texto)
+                            if match:
+                                descuento = int(match.group(1))
+                        except NoSuchElementException:
+                            pass
+
+                        if nombre and precio and link:
+                            resultados.append({
+                                'nombre': nombre,
+                                'precio': precio,
+                                'link': link,
+                                'tienda': 'metro',
+                                'imagen': imagen,
+                                'descuento': descuento
+                            })
+                    except Exception as e:
                         continue
+            # Publicar la página apenas se extrae
+            registrar_pagina(resultados[inicio_pagina:], 'metro')
+            entregar(control, resultados[inicio_pagina:])
 
-                    # Extracción de descuento simplificada
-                    descuento = None
-                    try:
-                        descuento_tag = item.find_element(By.CSS_SELECTOR, 'span.vtex-product-price-1-x-savingsPercentage')
-                        descuento_texto = descuento_tag.text.strip()
-                        match = re.search(r'(\d+)%', descuento_texto)
-                        if match:
-                            descuento = int(match.group(1))
-                    except NoSuchElementException:
-                        pass
-
-                    if nombre and precio and link:
-                        resultados.append({
-                            'nombre': nombre,
-                            'precio': precio,
-                            'link': link,
-                            'tienda': 'metro',
-                            'imagen': imagen,
-                            'descuento': descuento
-                        })
-                except Exception as e:
-                    continue
+            procesados = len(productos)
 
             # Modificación en el manejo del botón "Mostrar más"
             try:
-                show_more_button = WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.vtex-search-result-3-x-buttonShowMore button.vtex-button"))
-                )
-                driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", show_more_button)
-                time.sleep(3)  # Aumentado el tiempo de espera
-                driver.execute_script("arguments[0].click();", show_more_button)
-                time.sleep(8)  # Aumentado el tiempo de espera después del click
+                with etapa(PAGINACION, 'metro'):
+                    show_more_button = WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.vtex-search-result-3-x-buttonShowMore button.vtex-button"))
+                    )
+                esperar_cortesia('metro', "https://www.metro.pe")
+                with etapa(PAGINACION, 'metro'):
+                    driver.execute_script("arguments[0].click();", show_more_button)
+                with etapa(RESULTADOS, 'metro'):
+                    cargo_mas = esperar_cambio_conteo('metro', driver, SELECTOR_TARJETA, procesados)
+                if not cargo_mas:
+                    break
             except (TimeoutException, NoSuchElementException):
             
                 break
 
     except Exception as e:
         print(f"Error al buscar en Metro: {e}")
+        if driver is not None:
+            obtener_pool().reportar_error(driver)
     finally:
-        driver.quit()
+        if driver is not None:
+            obtener_pool().liberar(driver)
 
-    return resultados
\ No newline at end of file
+    return recortar(control, resultados)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import re
+from .async_base_scraper import AsyncBaseScraper
+from .bulk_extractor import EspecificacionTarjeta
+from . import esperas
+from .metro import SELECTOR_TARJETA, precio_desde_texto
+
+SELECTOR_MOSTRAR_MAS = "div.vtex-search-result-3-x-buttonShowMore button.vtex-button"
+
+# Selectores de la tarjeta de producto de Metro (VTEX IO)
+ESPEC_METRO = EspecificacionTarjeta(SELECTOR_TARJETA, {
+    'nombre': ("span.vtex-product-summary-2-x-productBrand", "text"),
+    'link': ("a.vtex-product-summary-2-x-clearLink", "prop:href"),
+    'imagen': ("img.vtex-product-summary-2-x-imageNormal", "prop:src"),
+    'precio': ("span.vtex-product-price-1-x-sellingPriceValue", "text"),
+    'descuento': ("span.vtex-product-price-1-x-savingsPercentage", "text"),
+})
+
+def procesar_tarjeta_metro(raw):
+    """Convierte los campos crudos de una tarjeta de Metro en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
+    precio = precio_desde_texto(raw.get('precio'))
+
+    descuento = None
+    match = re.search(r'(\d+)%', raw.get('descuento') or '')
+    if match:
+        descuento = int(match.group(1))
+
+    if not (nombre and precio and link):
+        return None
+
+    return {
+        'nombre': nombre,
+        'precio': precio,
+        'link': link,
+        'tienda': 'metro',
+        'imagen': raw.get('imagen'),
+        'descuento': descuento
+    }
+
+class MetroPlaywrightScraper(AsyncBaseScraper):
+    """
+    Scraper de Metro sobre el motor asíncrono de Playwright. Los resultados
+    se paginan con "Mostrar más", que agrega tarjetas a la misma página.
+    """
+    
+    ESPEC_TARJETA = ESPEC_METRO
+    DEDUPLICAR_LINKS = True
+    
+    def __init__(self):
+        super().__init__("metro")
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Metro."""
+        return "https://www.metro.pe"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Metro y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        # Intentar diferentes selectores para el campo de búsqueda
+        selectors = [
+            "input.vtex-styleguide-9-x-input",
+            "input[placeholder='¿Que buscas hoy?']",
+            "input.vtex-input",
+            "input#downshift-5-input"
+        ]
+        for selector in selectors:
+            search_input = await self._wait_for_element(selector, timeout=5)
+            if search_input:
+                break
+        else:
+            raise Exception("No se pudo encontrar el campo de búsqueda")
+        await search_input.fill(producto)
+        await search_input.press('Enter')
+    
+    async def _antes_de_extraer(self, page):
+        """Scroll hasta el final para cargar los productos diferidos y espera la red inactiva."""
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await esperas.esperar_red_inactiva_async(self.tienda, page, timeout=10)
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element(SELECTOR_TARJETA, timeout=30):
+            return []
+        return await self.page.query_selector_all(SELECTOR_TARJETA)
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Metro."""
+        return await self._extraer_con_espec(item)
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_metro(raw)
+    
+    async def _go_to_next_page(self):
+        """Hace clic en "Mostrar más" y espera a que aparezcan más tarjetas."""
+        boton = await self._wait_for_element(SELECTOR_MOSTRAR_MAS, timeout=15)
+        if not boton:
+            return False
+        conteo = await esperas.contar_elementos_async(self.page, SELECTOR_TARJETA)
+        await self._esperar_cortesia()
+        await boton.evaluate("boton => boton.click()")
+        return await esperas.esperar_cambio_conteo_async(self.tienda, self.page, SELECTOR_TARJETA, conteo)
+
+async def buscar_en_metro_playwright(producto, control=None):
+    """Busca en Metro con Playwright. Debe correr en el loop del runtime."""
+    scraper = MetroPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
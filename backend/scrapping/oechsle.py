@@ -1,119 +1,136 @@
 import os
-import time
-import random
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from .ripley import obtener_user_agents
-
-def buscar_en_oechsle(producto):
+from .driver_pool import obtener_driver, obtener_pool
+from .esperas import (
+    esperar_cortesia, esperar_navegacion, esperar_red_inactiva, esperar_mutaciones,
+    esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+)
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
+
+SELECTOR_TARJETA = "div.product"
+
+@limitado_por_host("https://www.oechsle.pe/")
+def buscar_en_oechsle(producto, control=None):
     resultados = []
     user_agents = obtener_user_agents()
     if not user_agents:
         print("Error: Lista de User-Agents vacía.")
         return resultados
 
-    options = ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
     
     driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = obtener_driver(user_agents, tienda='oechsle')
 
-        driver.get("https://www.oechsle.pe/")
+        esperar_cortesia('oechsle', "https://www.oechsle.pe/")
+        with etapa(INICIO, 'oechsle'):
+            driver.get("https://www.oechsle.pe/")
         print("Accediendo a Oechsle...")
         try:
-            search_input = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "input.biggy-autocomplete__input"))
-            )
+            with etapa(BUSQUEDA, 'oechsle'):
+                search_input = WebDriverWait(driver, 15).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "input.biggy-autocomplete__input"))
+                )
+
+                search_input.clear()
+                search_input.send_keys(producto)
+                url_portada = driver.current_url
+                search_input.send_keys(Keys.RETURN)
         except TimeoutException:
-            driver.quit()
             return resultados
-
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
         print(f"Buscando: {producto}")
 
-        time.sleep(5)  # Esperar a que cargue la página de resultados
+        with etapa(RESULTADOS, 'oechsle'):
+            esperar_navegacion('oechsle', driver, search_input, url_portada)
+            esperar_red_inactiva('oechsle', driver)  # Esperar a que cargue la página de resultados
 
         pagina_actual = 1
         max_paginas = 10
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
                 # Esperar a que carguen los productos
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.product"))
-                )
-                items = driver.find_elements(By.CSS_SELECTOR, "div.product")
+                with etapa(RESULTADOS, 'oechsle'):
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, SELECTOR_TARJETA))
+                    )
+                items = driver.find_elements(By.CSS_SELECTOR, SELECTOR_TARJETA)
             except TimeoutException:
                 
                 break
 
-            for item in items:
-                try:
-                    # Extraer nombre
-                    nombre_elem = item.find_element(By.CSS_SELECTOR, "span.fz-15.prod-name")
-                    nombre = nombre_elem.text.strip()
-                
-                    # Extraer link
-                    link_elem = item.find_element(By.CSS_SELECTOR, "a.prod-image")
-                    link = link_elem.get_attribute("href")
-
-                    # Extraer precio
-                    precio_elem = item.find_element(By.CSS_SELECTOR, "span.BestPrice")
-                    precio_text = precio_elem.text.strip()
-                    precio = float(re.sub(r"[^\d.]", "", precio_text))
-
-                    # Extraer descuento (si existe)
-                    descuento = None
+            with etapa(EXTRACCION, 'oechsle'):
+                for item in items:
                     try:
-                        precio_lista_elem = item.find_element(By.CSS_SELECTOR, "span.ListPrice")
-                        precio_lista_text = precio_lista_elem.text.strip()
-                        precio_lista = float(re.sub(r"[^\d.]", "", precio_lista_text))
-                        descuento = int(((precio_lista - precio) / precio_lista) * 100)
-                    except NoSuchElementException:
-                        pass
-
-                    # Extraer imagen
-                    imagen_elem = item.find_element(By.CSS_SELECTOR, "div.productImage img")
-                    imagen = imagen_elem.get_attribute("src")
-
-                    if nombre and precio and link:
-                        resultados.append({
-                            "nombre": nombre,
-                            "precio": precio,
-                            "link": link,
-                            "tienda": "oechsle",
-                            "descuento": descuento,
-                            "imagen": imagen
-                        })
-
-                except Exception as e:
-                    continue
+                        # Extraer nombre
+                        nombre_elem = item.find_element(By.CSS_SELECTOR, "span.fz-15.prod-name")
+                        nombre = nombre_elem.text.strip()
+                
+                        # Extraer link
+                        link_elem = item.find_element(By.CSS_SELECTOR, "a.prod-image")
+                        link = link_elem.get_attribute("href")
+
+                        # Extraer precio
+                        precio_elem = item.find_element(By.CSS_SELECTOR, "span.BestPrice")
+                        precio_text = precio_elem.text.strip()
+                        precio = float(re.sub(r"[^\d.]", "", precio_text))
+
+                        # Extraer descuento (si existe)
+                        descuento = None
+                        try:
+                            precio_lista_elem = item.find_element(By.CSS_SELECTOR, "span.ListPrice")
+                            precio_lista_text = precio_lista_elem.text.strip()
+                            precio_lista = float(re.sub(r"[^\d.]", "", precio_lista_text))
+                            descuento = int(((precio_lista - precio) / precio_lista) * 100)
+                        except NoSuchElementException:
+                            pass
+
+                        # Extraer imagen
+                        imagen_elem = item.find_element(By.CSS_SELECTOR, "div.productImage img")
+                        imagen = imagen_elem.get_attribute("src")
+
+                        if nombre and precio and link:
+                            resultados.append({
+                                "nombre": nombre,
+                                "precio": precio,
+                                "link": link,
+                                "tienda": "oechsle",
+                                "descuento": descuento,
+                                "imagen": imagen
+                            })
+
+                    except Exception as e:
+                        continue
+
+            # Publicar la página apenas se extrae
+            registrar_pagina(resultados[inicio_pagina:], 'oechsle')
+            entregar(control, resultados[inicio_pagina:])
 
             try:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
+                with etapa(PAGINACION, 'oechsle'):
+                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                    esperar_mutaciones('oechsle', driver, timeout=5)  # El paginador se renderiza al hacer scroll
 
-                # Actualizar selector del botón siguiente
-                next_button = driver.find_element(By.CSS_SELECTOR, "a.page-link.next")
+                    # Actualizar selector del botón siguiente
+                    next_button = driver.find_element(By.CSS_SELECTOR, "a.page-link.next")
                 if next_button and next_button.is_enabled():
-                    driver.execute_script("arguments[0].click();", next_button)
+                    identidad = identidad_primera_tarjeta(driver, SELECTOR_TARJETA)
+                    esperar_cortesia('oechsle', "https://www.oechsle.pe/")
+                    with etapa(PAGINACION, 'oechsle'):
+                        driver.execute_script("arguments[0].click();", next_button)
                     pagina_actual += 1
-                    time.sleep(random.uniform(4, 7))
+                    with etapa(RESULTADOS, 'oechsle'):
+                        esperar_cambio_primera_tarjeta('oechsle', driver, SELECTOR_TARJETA, identidad)
                 else:
                     break
             except (NoSuchElementException, TimeoutException):
@@ -121,9 +138,11 @@ def buscar_en_oechsle(producto):
 
     except Exception as e:
         print(f"Error al buscar en Oechsle: {e}")
-        return resultados
+        if driver is not None:
+            obtener_pool().reportar_error(driver)
+        return recortar(control, resultados)
     finally:
         if driver is not None:
-            driver.quit()
+            obtener_pool().liberar(driver)
 
-    return resultados
\ No newline at end of file
+    return recortar(control, resultados)
\ No newline at end of file
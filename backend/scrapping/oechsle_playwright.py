@@ -0,0 +1,82 @@
+import re
+from .async_base_scraper import AsyncBaseScraper
+from .oechsle_refactored import ESPEC_OECHSLE, procesar_tarjeta_oechsle
+
+class OechslePlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Oechsle sobre el motor asíncrono de Playwright."""
+    
+    ESPEC_TARJETA = ESPEC_OECHSLE
+    
+    def __init__(self):
+        super().__init__("oechsle")
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Oechsle."""
+        return "https://www.oechsle.pe"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Oechsle y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        search_input = await self.page.wait_for_selector("input.biggy-autocomplete__input", timeout=15000)
+        await search_input.fill(producto)
+        await search_input.press('Enter')
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element("div.product", timeout=15):
+            return []
+        return await self.page.query_selector_all("div.product")
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Oechsle."""
+        try:
+            nombre = await self._safe_get_text(item, "span.fz-15.prod-name")
+            if not nombre:
+                return None
+            
+            link_relativo = await self._safe_get_attribute(item, "a.prod-image", "href")
+            if not link_relativo:
+                return None
+            link = self._build_full_url(self._get_base_url(), link_relativo)
+            
+            precio = self._clean_price(await self._safe_get_text(item, "span.BestPrice"))
+            if precio <= 0:
+                return None
+            
+            imagen = await self._safe_get_attribute(item, "div.productImage img", "src")
+            if imagen and not imagen.startswith('http'):
+                imagen = self._build_full_url(self._get_base_url(), imagen)
+            
+            descuento_porcentaje = None
+            descuento_texto = await self._safe_get_text(item, "div.product-discount-percent")
+            if descuento_texto:
+                try:
+                    descuento_porcentaje = int(re.sub(r'[^\d]', '', descuento_texto))
+                except ValueError:
+                    descuento_porcentaje = None
+            
+            return {
+                'nombre': nombre,
+                'precio': precio,
+                'link': link,
+                'tienda': self.tienda,
+                'imagen': imagen,
+                'descuento': descuento_porcentaje
+            }
+            
+        except Exception as e:
+            print(f"Error extrayendo datos de producto en Oechsle: {e}")
+            return None
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_oechsle(self, raw)
+    
+    async def _go_to_next_page(self):
+        """Navega a la siguiente página en Oechsle."""
+        return await self._click_next("a.page-link.next:not(.disabled)")
+
+async def buscar_en_oechsle_playwright(producto, control=None):
+    """Busca en Oechsle con Playwright. Debe correr en el loop del runtime."""
+    scraper = OechslePlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
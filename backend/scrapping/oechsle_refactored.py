@@ -1,14 +1,56 @@
-import time
 import re
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from .base_scraper import BaseScraper
+from .bulk_extractor import EspecificacionTarjeta
+
+# Selectores de la tarjeta de producto de Oechsle (extracción masiva)
+ESPEC_OECHSLE = EspecificacionTarjeta("div.product", {
+    'nombre': ("span.fz-15.prod-name", "text"),
+    'link': ("a.prod-image", "href"),
+    'precio': ("span.BestPrice", "text"),
+    'imagen': ("div.productImage img", "src"),
+    'descuento': ("div.product-discount-percent", "text"),
+})
+
+def procesar_tarjeta_oechsle(scraper, raw):
+    """Convierte los campos crudos de una tarjeta de Oechsle en el dict de producto."""
+    nombre = raw.get('nombre')
+    link_relativo = raw.get('link')
+    if not nombre or not link_relativo:
+        return None
+    
+    precio = scraper._clean_price(raw.get('precio'))
+    if precio <= 0:
+        return None
+    
+    imagen = raw.get('imagen') or ""
+    if imagen and not imagen.startswith('http'):
+        imagen = scraper._build_full_url(scraper._get_base_url(), imagen)
+    
+    descuento_porcentaje = None
+    if raw.get('descuento'):
+        try:
+            descuento_porcentaje = int(re.sub(r'[^\d]', '', raw['descuento']))
+        except ValueError:
+            descuento_porcentaje = None
+    
+    return {
+        'nombre': nombre,
+        'precio': precio,
+        'link': scraper._build_full_url(scraper._get_base_url(), link_relativo),
+        'tienda': scraper.tienda,
+        'imagen': imagen,
+        'descuento': descuento_porcentaje
+    }
 
 class OechsleScraper(BaseScraper):
     """Scraper para la tienda Oechsle usando la clase base."""
     
+    ESPEC_TARJETA = ESPEC_OECHSLE
+    
     def __init__(self):
         super().__init__("oechsle")
     
@@ -92,6 +134,10 @@ class OechsleScraper(BaseScraper):
             print(f"Error extrayendo datos de producto en Oechsle: {e}")
             return None
     
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_oechsle(self, raw)
+    
     def _go_to_next_page(self):
         """Navega a la siguiente página en Oechsle."""
         try:
@@ -104,7 +150,6 @@ class OechsleScraper(BaseScraper):
             if next_button:
                 # Usar JavaScript para hacer clic para evitar problemas de visibilidad
                 self.driver.execute_script("arguments[0].click();", next_button)
-                time.sleep(2)  # Esperar a que cargue la nueva página
                 return True
             
             return False
@@ -114,7 +159,7 @@ class OechsleScraper(BaseScraper):
             return False
 
 # Función de compatibilidad con el código existente
-def buscar_en_oechsle(producto):
+def buscar_en_oechsle(producto, control=None):
     """Función de compatibilidad para mantener la interfaz existente."""
     scraper = OechsleScraper()
-    return scraper.buscar(producto)
+    return scraper.buscar(producto, control=control)
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+# Recursos que no necesitamos para leer los resultados
+TIPOS_BLOQUEADOS = {'image', 'stylesheet', 'font', 'media'}
+DOMINIOS_BLOQUEADOS = ('/analytics/', '/gtm/', 'facebook.com/', 'google-analytics.com/')
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+async def _bloquear_recursos(route):
+    """Handler único de bloqueo: aborta imágenes, CSS, fuentes y analítica."""
+    request = route.request
+    if request.resource_type in TIPOS_BLOQUEADOS or any(d in request.url for d in DOMINIOS_BLOQUEADOS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class PlaywrightRuntime:
+    """
+    Runtime de Playwright de larga duración.
+    Un hilo en segundo plano mantiene su propio event loop, una instancia de
+    Playwright y un Chromium persistente. Cada búsqueda solo crea un
+    BrowserContext nuevo (barato) con el bloqueo de recursos ya aplicado.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._lock = threading.Lock()
+        self._browser_lock = None
+
+    def _run_loop(self, listo):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._browser_lock = asyncio.Lock()
+        listo.set()
+        self._loop.run_forever()
+
+    def iniciar(self):
+        """Arranca el hilo del event loop si aún no está corriendo."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            listo = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(listo,), name="playwright-runtime", daemon=True)
+            self._thread.start()
+            listo.wait()
+
+    @property
+    def loop(self):
+        self.iniciar()
+        return self._loop
+
+    async def obtener_browser(self):
+        """Retorna el Chromium compartido, lanzándolo (o relanzándolo) si hace falta."""
+        async with self._browser_lock:
+            if self._browser and self._browser.is_connected():
+                return self._browser
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(
+                headless=True,
+                args=[
+                    '--no-sandbox',
+                    '--disable-dev-shm-usage',
+                    '--disable-gpu',
+                    '--disable-background-timer-throttling',
+                    '--disable-backgrounding-occluded-windows',
+                    '--disable-renderer-backgrounding'
+                ]
+            )
+            return self._browser
+
+    async def nuevo_contexto(self, user_agent=USER_AGENT):
+        """Crea un BrowserContext nuevo con el bloqueo de recursos aplicado."""
+        browser = await self.obtener_browser()
+        context = await browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent=user_agent
+        )
+        await context.route("**/*", _bloquear_recursos)
+        return context
+
+    @asynccontextmanager
+    async def contexto(self, user_agent=USER_AGENT):
+        """Context manager asíncrono: `async with runtime.contexto() as context: ...`"""
+        context = await self.nuevo_contexto(user_agent=user_agent)
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    def enviar(self, coro):
+        """Envía una corrutina al loop del runtime y retorna un concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def ejecutar(self, coro, timeout=None):
+        """Ejecuta una corrutina en el loop del runtime desde código síncrono."""
+        return self.enviar(coro).result(timeout)
+
+    def precalentar(self):
+        """Lanza Chromium por adelantado para que la primera búsqueda no lo pague."""
+        self.ejecutar(self.obtener_browser())
+
+    async def _cerrar(self):
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def cerrar(self):
+        """Cierra Chromium, Playwright y detiene el loop."""
+        if not self._loop:
+            return
+        try:
+            self.ejecutar(self._cerrar(), timeout=30)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+def obtener_runtime():
+    """Retorna el runtime de Playwright compartido por todo el proceso."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = PlaywrightRuntime()
+        return _runtime
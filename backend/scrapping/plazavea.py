@@ -1,6 +1,4 @@
 import os
-import time
-import random
 import re
 from selenium import webdriver
 from selenium.webdriver.edge.options import Options
@@ -11,8 +9,21 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from .ripley import obtener_user_agents
+from .bloqueo import aplicar_perfil
+from .driver_pool import argumentos_extra
+from .esperas import (
+    esperar_cortesia, esperar_navegacion, esperar_red_inactiva, esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+)
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import (
+    etapa, contar, registrar_pagina, NAVEGADOR, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION, CIERRE, ERRORES
+)
 
-def buscar_en_plazavea(producto):
+SELECTOR_TARJETA = ".Showcase--non-food"
+
+@limitado_por_host("https://www.plazavea.com.pe")
+def buscar_en_plazavea(producto, control=None):
     """Busca un producto en Plaza Vea usando Selenium."""
     resultados = []
     user_agents = obtener_user_agents()
@@ -28,94 +39,117 @@ def buscar_en_plazavea(producto):
     options.add_argument('--disable-gpu')
     options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
     options.add_experimental_option('useAutomationExtension', False)
+    for argumento in argumentos_extra():
+        options.add_argument(argumento)
 
-    service = Service(executable_path="backup/descuentos/backend/scrapping/msedgedriver.exe")
-    driver = webdriver.Edge(service=service, options=options)
+    with etapa(NAVEGADOR, 'plazavea'):
+        service = Service(executable_path="backup/descuentos/backend/scrapping/msedgedriver.exe")
+        driver = webdriver.Edge(service=service, options=options)
+        aplicar_perfil(driver, 'plazavea')
 
     try:
-        driver.get("https://www.plazavea.com.pe")
+        esperar_cortesia('plazavea', "https://www.plazavea.com.pe")
+        with etapa(INICIO, 'plazavea'):
+            driver.get("https://www.plazavea.com.pe")
         
         # Esperar y encontrar el campo de búsqueda
-        search_input = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.ID, "search_box"))
-        )
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
+        with etapa(BUSQUEDA, 'plazavea'):
+            search_input = WebDriverWait(driver, 15).until(
+                EC.element_to_be_clickable((By.ID, "search_box"))
+            )
+            search_input.clear()
+            search_input.send_keys(producto)
+            url_portada = driver.current_url
+            search_input.send_keys(Keys.RETURN)
 
-        time.sleep(3)
+        with etapa(RESULTADOS, 'plazavea'):
+            esperar_navegacion('plazavea', driver, search_input, url_portada)
+            esperar_red_inactiva('plazavea', driver)
 
         # ...existing code for pagination and product extraction...
         pagina_actual = 1
         max_paginas = 10
 
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "Showcase--non-food"))
-                )
-
-                productos = driver.find_elements(By.CLASS_NAME, "Showcase--non-food")
-
-                for item in productos:
-                    try:
-                        nombre = item.find_element(By.CLASS_NAME, "Showcase__name").text.strip()
-                        marca = item.find_element(By.CLASS_NAME, "brand").text.strip()
-                        link = item.find_element(By.CLASS_NAME, "Showcase__link").get_attribute("href")
-                        imagen = item.find_element(By.CLASS_NAME, "showcase__image").get_attribute("src")
+                with etapa(RESULTADOS, 'plazavea'):
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CLASS_NAME, "Showcase--non-food"))
+                    )
+
+                with etapa(EXTRACCION, 'plazavea'):
+                    productos = driver.find_elements(By.CLASS_NAME, "Showcase--non-food")
+
+                    for item in productos:
+                        try:
+                            nombre = item.find_element(By.CLASS_NAME, "Showcase__name").text.strip()
+                            marca = item.find_element(By.CLASS_NAME, "brand").text.strip()
+                            link = item.find_element(By.CLASS_NAME, "Showcase__link").get_attribute("href")
+                            imagen = item.find_element(By.CLASS_NAME, "showcase__image").get_attribute("src")
                         
-                        # Extraer precios
-                        precio_regular = None
-                        precio_oferta = None
-                        precio_oh = None
+                            # Extraer precios
+                            precio_regular = None
+                            precio_oferta = None
+                            precio_oh = None
                         
-                        try:
-                            precio_regular = float(re.sub(r'[^\d.]', '', 
-                                item.find_element(By.CLASS_NAME, "Showcase__oldPrice").text))
-                        except:
-                            pass
+                            try:
+                                precio_regular = float(re.sub(r'[^\d.]', '', 
+                                    item.find_element(By.CLASS_NAME, "Showcase__oldPrice").text))
+                            except:
+                                pass
                             
-                        try:
-                            precio_oferta = float(re.sub(r'[^\d.]', '', 
-                                item.find_element(By.CLASS_NAME, "Showcase__salePrice").text))
-                        except:
-                            pass
+                            try:
+                                precio_oferta = float(re.sub(r'[^\d.]', '', 
+                                    item.find_element(By.CLASS_NAME, "Showcase__salePrice").text))
+                            except:
+                                pass
                             
-                        try:
-                            precio_oh = float(re.sub(r'[^\d.]', '', 
-                                item.find_element(By.CLASS_NAME, "Showcase__ohPrice").text))
-                        except:
-                            pass
+                            try:
+                                precio_oh = float(re.sub(r'[^\d.]', '', 
+                                    item.find_element(By.CLASS_NAME, "Showcase__ohPrice").text))
+                            except:
+                                pass
                         
-                        # Usar el precio más bajo disponible
-                        precios = [p for p in [precio_regular, precio_oferta, precio_oh] if p is not None]
-                        if precios:
-                            precio_final = min(precios)
+                            # Usar el precio más bajo disponible
+                            precios = [p for p in [precio_regular, precio_oferta, precio_oh] if p is not None]
+                            if precios:
+                                precio_final = min(precios)
                             
-                            # Calcular descuento
-                            descuento = None
-                            if precio_regular and precio_final < precio_regular:
-                                descuento = int(((precio_regular - precio_final) / precio_regular) * 100)
+                                # Calcular descuento
+                                descuento = None
+                                if precio_regular and precio_final < precio_regular:
+                                    descuento = int(((precio_regular - precio_final) / precio_regular) * 100)
                             
-                            resultados.append({
-                                'nombre': f"{marca} {nombre}".strip(),
-                                'precio': precio_final,
-                                'link': link,
-                                'tienda': 'plazavea',
-                                'imagen': imagen,
-                                'descuento': descuento
-                            })
-
-                    except Exception as e:
-                        continue
+                                resultados.append({
+                                    'nombre': f"{marca} {nombre}".strip(),
+                                    'precio': precio_final,
+                                    'link': link,
+                                    'tienda': 'plazavea',
+                                    'imagen': imagen,
+                                    'descuento': descuento
+                                })
+
+                        except Exception as e:
+                            continue
+
+                # Publicar la página apenas se extrae
+                registrar_pagina(resultados[inicio_pagina:], 'plazavea')
+                entregar(control, resultados[inicio_pagina:])
 
                 # Intentar pasar a la siguiente página
                 try:
                     next_button = driver.find_element(By.CSS_SELECTOR, "button.page-link[aria-label='Siguiente']")
                     if next_button and next_button.is_enabled():
-                        driver.execute_script("arguments[0].click();", next_button)
+                        identidad = identidad_primera_tarjeta(driver, SELECTOR_TARJETA)
+                        esperar_cortesia('plazavea', "https://www.plazavea.com.pe")
+                        with etapa(PAGINACION, 'plazavea'):
+                            driver.execute_script("arguments[0].click();", next_button)
                         pagina_actual += 1
-                        time.sleep(random.uniform(4, 7))
+                        with etapa(RESULTADOS, 'plazavea'):
+                            esperar_cambio_primera_tarjeta('plazavea', driver, SELECTOR_TARJETA, identidad)
                     else:
                         break
                 except NoSuchElementException:
@@ -126,7 +160,9 @@ def buscar_en_plazavea(producto):
 
     except Exception as e:
         print(f"Error al buscar en Plaza Vea: {e}")
+        contar(ERRORES, 'plazavea')
     finally:
-        driver.quit()
+        with etapa(CIERRE, 'plazavea'):
+            driver.quit()
 
-    return resultados
+    return recortar(control, resultados)
@@ -0,0 +1,92 @@
+import re
+from .async_base_scraper import AsyncBaseScraper
+from .bulk_extractor import EspecificacionTarjeta
+from . import esperas
+from .plazavea import SELECTOR_TARJETA
+
+# Selectores de la tarjeta de producto de Plaza Vea
+ESPEC_PLAZAVEA = EspecificacionTarjeta(SELECTOR_TARJETA, {
+    'nombre': (".Showcase__name", "text"),
+    'marca': (".brand", "text"),
+    'link': (".Showcase__link", "prop:href"),
+    'imagen': (".showcase__image", "prop:src"),
+    'precio_regular': (".Showcase__oldPrice", "text"),
+    'precio_oferta': (".Showcase__salePrice", "text"),
+    'precio_oh': (".Showcase__ohPrice", "text"),
+})
+
+def _precio(texto):
+    try:
+        return float(re.sub(r'[^\d.]', '', texto or ''))
+    except ValueError:
+        return None
+
+def procesar_tarjeta_plazavea(raw):
+    """Convierte los campos crudos de una tarjeta de Plaza Vea en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
+    precio_regular = _precio(raw.get('precio_regular'))
+
+    # Usar el precio más bajo disponible
+    precios = [p for p in (precio_regular, _precio(raw.get('precio_oferta')), _precio(raw.get('precio_oh'))) if p]
+    if not (nombre and link and precios):
+        return None
+    precio_final = min(precios)
+
+    descuento = None
+    if precio_regular and precio_final < precio_regular:
+        descuento = int(((precio_regular - precio_final) / precio_regular) * 100)
+
+    return {
+        'nombre': f"{raw.get('marca') or ''} {nombre}".strip(),
+        'precio': precio_final,
+        'link': link,
+        'tienda': 'plazavea',
+        'imagen': raw.get('imagen'),
+        'descuento': descuento
+    }
+
+class PlazaVeaPlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Plaza Vea sobre el motor asíncrono de Playwright."""
+    
+    ESPEC_TARJETA = ESPEC_PLAZAVEA
+    
+    def __init__(self):
+        super().__init__("plazavea")
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Plaza Vea."""
+        return "https://www.plazavea.com.pe"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Plaza Vea y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        search_input = await self.page.wait_for_selector("#search_box", timeout=15000)
+        await search_input.fill(producto)
+        url_portada = self.page.url
+        await search_input.press('Enter')
+        await esperas.esperar_navegacion_async(self.tienda, self.page, url_portada)
+        await esperas.esperar_red_inactiva_async(self.tienda, self.page)
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element(SELECTOR_TARJETA, timeout=15):
+            return []
+        return await self.page.query_selector_all(SELECTOR_TARJETA)
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Plaza Vea."""
+        return await self._extraer_con_espec(item)
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_plazavea(raw)
+    
+    async def _go_to_next_page(self):
+        """Navega a la siguiente página en Plaza Vea."""
+        return await self._click_next("button.page-link[aria-label='Siguiente']:not([disabled])", por_js=True)
+
+async def buscar_en_plazavea_playwright(producto, control=None):
+    """Busca en Plaza Vea con Playwright. Debe correr en el loop del runtime."""
+    scraper = PlazaVeaPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
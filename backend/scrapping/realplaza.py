@@ -1,6 +1,4 @@
 import os
-import time
-import random
 import re
 from selenium import webdriver
 from selenium.webdriver.edge.options import Options
@@ -11,6 +9,19 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from .ripley import obtener_user_agents
+from .bloqueo import aplicar_perfil
+from .driver_pool import argumentos_extra
+from .esperas import (
+    esperar_cortesia, esperar_navegacion, esperar_red_inactiva, esperar_mutaciones,
+    esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+)
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import (
+    etapa, contar, registrar_pagina, NAVEGADOR, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION, CIERRE, ERRORES
+)
+
+SELECTOR_TARJETA = ".vtex-product-summary-2-x-container"
 
 def extraer_precio(texto):
     nums = re.findall(r'\d+\.?\d*', texto)
@@ -27,7 +38,14 @@ def extraer_precio_mejorado(elemento):
         precio_texto = elemento.get_attribute('innerHTML')
         if not precio_texto:
             precio_texto = elemento.text
-        
+        return precio_desde_texto(precio_texto)
+    except Exception as e:
+        print(f"Error extrayendo precio: {str(e)}")
+    return 0
+
+def precio_desde_texto(precio_texto):
+    """Precio a partir del innerHTML o el texto del bloque de precio (0 si no hay número)."""
+    if precio_texto:
         # Limpiar el texto de elementos HTML
         precio_texto = re.sub(r'<[^>]+>', '', precio_texto)
         precio_texto = precio_texto.replace('&nbsp;', ' ').strip()
@@ -51,12 +69,10 @@ def extraer_precio_mejorado(elemento):
         match = re.search(patron3, precio_texto)
         if match:
             return float(match.group(1))
-            
-    except Exception as e:
-        print(f"Error extrayendo precio: {str(e)}")
     return 0
 
-def buscar_en_realplaza(producto):
+@limitado_por_host("https://www.realplaza.com/")
+def buscar_en_realplaza(producto, control=None):
     resultados = []
     visited_links = set()
     user_agents = obtener_user_agents()
@@ -73,96 +89,120 @@ def buscar_en_realplaza(producto):
     options.add_argument('--disable-gpu')
     options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
     options.add_experimental_option('useAutomationExtension', False)
+    for argumento in argumentos_extra():
+        options.add_argument(argumento)
 
-    service = Service(executable_path="backup/descuentos/backend/scrapping/msedgedriver.exe")
-    driver = webdriver.Edge(service=service, options=options)
+    with etapa(NAVEGADOR, 'realplaza'):
+        service = Service(executable_path="backup/descuentos/backend/scrapping/msedgedriver.exe")
+        driver = webdriver.Edge(service=service, options=options)
+        aplicar_perfil(driver, 'realplaza')
 
     try:
-        driver.get('https://www.realplaza.com/')
+        esperar_cortesia('realplaza', 'https://www.realplaza.com/')
+        with etapa(INICIO, 'realplaza'):
+            driver.get('https://www.realplaza.com/')
         
-        search_input = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.CLASS_NAME, "realplaza-store-components-0-x-omnichannelSearchInput__input"))
-        )
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
-
-        time.sleep(5)
+        with etapa(BUSQUEDA, 'realplaza'):
+            search_input = WebDriverWait(driver, 15).until(
+                EC.element_to_be_clickable((By.CLASS_NAME, "realplaza-store-components-0-x-omnichannelSearchInput__input"))
+            )
+            search_input.clear()
+            search_input.send_keys(producto)
+            url_portada = driver.current_url
+            search_input.send_keys(Keys.RETURN)
+
+        with etapa(RESULTADOS, 'realplaza'):
+            esperar_navegacion('realplaza', driver, search_input, url_portada)
+            esperar_red_inactiva('realplaza', driver)
 
         pagina_actual = 1
         max_paginas = 10
         
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
-                productos = WebDriverWait(driver, 15).until(
-                    EC.presence_of_all_elements_located((By.CLASS_NAME, "vtex-product-summary-2-x-container"))
-                )
-
-                for producto in productos:
-                    try:
-                        # Extraer nombre y marca
-                        nombre_elem = producto.find_element(By.CSS_SELECTOR, ".vtex-product-summary-2-x-productBrand")
-                        marca_elem = producto.find_element(By.CSS_SELECTOR, ".realplaza-product-custom-0-x-brancNameComponent")
-                        nombre = nombre_elem.text.strip()
-                        marca = marca_elem.text.strip()
-
-                        # Extraer precios
-                        precio_regular = 0
-                        precio_oferta = 0
-                        
-                        try:
-                            precio_regular_elem = producto.find_element(By.CSS_SELECTOR, 
-                                ".realplaza-product-custom-0-x-productSummaryPrice__Option__RegularPrice")
-                            precio_regular = extraer_precio_mejorado(precio_regular_elem)
-                        except NoSuchElementException:
-                            pass
+                with etapa(RESULTADOS, 'realplaza'):
+                    productos = WebDriverWait(driver, 15).until(
+                        EC.presence_of_all_elements_located((By.CLASS_NAME, "vtex-product-summary-2-x-container"))
+                    )
 
+                with etapa(EXTRACCION, 'realplaza'):
+                    for producto in productos:
                         try:
-                            precio_oferta_elem = producto.find_element(By.CSS_SELECTOR,
-                                ".realplaza-product-custom-0-x-productSummaryPrice__Option__OfferPrice")
-                            precio_oferta = extraer_precio_mejorado(precio_oferta_elem)
-                        except NoSuchElementException:
-                            pass
-
-                        # Solo agregar si tenemos al menos un precio
-                        if precio_regular > 0 or precio_oferta > 0:
-                            imagen = producto.find_element(By.CSS_SELECTOR, 
-                                "img.vtex-product-summary-2-x-imageNormal").get_attribute("src")
-                            link = producto.find_element(By.CSS_SELECTOR, 
-                                "a.vtex-product-summary-2-x-clearLink").get_attribute("href")
-                            if link in visited_links:
-                                continue
-                            visited_links.add(link)
+                            # Extraer nombre y marca
+                            nombre_elem = producto.find_element(By.CSS_SELECTOR, ".vtex-product-summary-2-x-productBrand")
+                            marca_elem = producto.find_element(By.CSS_SELECTOR, ".realplaza-product-custom-0-x-brancNameComponent")
+                            nombre = nombre_elem.text.strip()
+                            marca = marca_elem.text.strip()
+
+                            # Extraer precios
+                            precio_regular = 0
+                            precio_oferta = 0
+                        
+                            try:
+                                precio_regular_elem = producto.find_element(By.CSS_SELECTOR, 
+                                    ".realplaza-product-custom-0-x-productSummaryPrice__Option__RegularPrice")
+                                precio_regular = extraer_precio_mejorado(precio_regular_elem)
+                            except NoSuchElementException:
+                                pass
+
+                            try:
+                                precio_oferta_elem = producto.find_element(By.CSS_SELECTOR,
+                                    ".realplaza-product-custom-0-x-productSummaryPrice__Option__OfferPrice")
+                                precio_oferta = extraer_precio_mejorado(precio_oferta_elem)
+                            except NoSuchElementException:
+                                pass
+
+                            # Solo agregar si tenemos al menos un precio
+                            if precio_regular > 0 or precio_oferta > 0:
+                                imagen = producto.find_element(By.CSS_SELECTOR, 
+                                    "img.vtex-product-summary-2-x-imageNormal").get_attribute("src")
+                                link = producto.find_element(By.CSS_SELECTOR, 
+                                    "a.vtex-product-summary-2-x-clearLink").get_attribute("href")
+                                if link in visited_links:
+                                    continue
+                                visited_links.add(link)
                             
-                            precio_final = precio_oferta if precio_oferta > 0 else precio_regular
-                            descuento = None
-                            if precio_regular > 0 and precio_oferta > 0:
-                                descuento = int(((precio_regular - precio_oferta) / precio_regular) * 100)
-
-                            resultados.append({
-                                'nombre': f"{marca} {nombre}".strip(),
-                                'precio': precio_final,
-                                'link': link,
-                                'tienda': 'realplaza',
-                                'descuento': descuento,
-                                'imagen': imagen
-                            })
-
-                    except Exception as e:
-                        continue
+                                precio_final = precio_oferta if precio_oferta > 0 else precio_regular
+                                descuento = None
+                                if precio_regular > 0 and precio_oferta > 0:
+                                    descuento = int(((precio_regular - precio_oferta) / precio_regular) * 100)
+
+                                resultados.append({
+                                    'nombre': f"{marca} {nombre}".strip(),
+                                    'precio': precio_final,
+                                    'link': link,
+                                    'tienda': 'realplaza',
+                                    'descuento': descuento,
+                                    'imagen': imagen
+                                })
+
+                        except Exception as e:
+                            continue
+
+                # Publicar la página apenas se extrae
+                registrar_pagina(resultados[inicio_pagina:], 'realplaza')
+                entregar(control, resultados[inicio_pagina:])
 
                 # Intentar pasar a la siguiente página
                 try:
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
-                    next_button = driver.find_element(
-                        By.CSS_SELECTOR, 
-                        "button.realplaza-rpweb-10-x-paginationButton.realplaza-rpweb-10-x-enabled"
-                    )
+                    with etapa(PAGINACION, 'realplaza'):
+                        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                        esperar_mutaciones('realplaza', driver, timeout=5)
+                        next_button = driver.find_element(
+                            By.CSS_SELECTOR, 
+                            "button.realplaza-rpweb-10-x-paginationButton.realplaza-rpweb-10-x-enabled"
+                        )
                     if next_button and next_button.is_enabled():
-                        driver.execute_script("arguments[0].click();", next_button)
+                        identidad = identidad_primera_tarjeta(driver, SELECTOR_TARJETA)
+                        esperar_cortesia('realplaza', 'https://www.realplaza.com/')
+                        with etapa(PAGINACION, 'realplaza'):
+                            driver.execute_script("arguments[0].click();", next_button)
                         pagina_actual += 1
-                        time.sleep(random.uniform(4, 7))
+                        with etapa(RESULTADOS, 'realplaza'):
+                            esperar_cambio_primera_tarjeta('realplaza', driver, SELECTOR_TARJETA, identidad)
                     else:
                         break
                 except NoSuchElementException:
@@ -173,7 +213,9 @@ def buscar_en_realplaza(producto):
 
     except Exception as e:
         print(f"Error al buscar en Real Plaza: {e}")
+        contar(ERRORES, 'realplaza')
     finally:
-        driver.quit()
+        with etapa(CIERRE, 'realplaza'):
+            driver.quit()
 
-    return resultados
+    return recortar(control, resultados)
@@ -0,0 +1,93 @@
+from .async_base_scraper import AsyncBaseScraper
+from .bulk_extractor import EspecificacionTarjeta
+from . import esperas
+from .realplaza import SELECTOR_TARJETA, precio_desde_texto
+
+SELECTOR_SIGUIENTE = "button.realplaza-rpweb-10-x-paginationButton.realplaza-rpweb-10-x-enabled"
+
+# Selectores de la tarjeta de producto de Real Plaza (VTEX IO)
+ESPEC_REALPLAZA = EspecificacionTarjeta(SELECTOR_TARJETA, {
+    'nombre': (".vtex-product-summary-2-x-productBrand", "text"),
+    'marca': (".realplaza-product-custom-0-x-brancNameComponent", "text"),
+    'precio_regular': (".realplaza-product-custom-0-x-productSummaryPrice__Option__RegularPrice", "prop:innerHTML"),
+    'precio_oferta': (".realplaza-product-custom-0-x-productSummaryPrice__Option__OfferPrice", "prop:innerHTML"),
+    'imagen': ("img.vtex-product-summary-2-x-imageNormal", "prop:src"),
+    'link': ("a.vtex-product-summary-2-x-clearLink", "prop:href"),
+})
+
+def procesar_tarjeta_realplaza(raw):
+    """Convierte los campos crudos de una tarjeta de Real Plaza en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
+    precio_regular = precio_desde_texto(raw.get('precio_regular'))
+    precio_oferta = precio_desde_texto(raw.get('precio_oferta'))
+
+    # Solo se conserva si tenemos al menos un precio
+    if not (nombre and link) or (precio_regular <= 0 and precio_oferta <= 0):
+        return None
+
+    precio_final = precio_oferta if precio_oferta > 0 else precio_regular
+    descuento = None
+    if precio_regular > 0 and precio_oferta > 0:
+        descuento = int(((precio_regular - precio_oferta) / precio_regular) * 100)
+
+    return {
+        'nombre': f"{raw.get('marca') or ''} {nombre}".strip(),
+        'precio': precio_final,
+        'link': link,
+        'tienda': 'realplaza',
+        'descuento': descuento,
+        'imagen': raw.get('imagen')
+    }
+
+class RealPlazaPlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Real Plaza sobre el motor asíncrono de Playwright."""
+    
+    ESPEC_TARJETA = ESPEC_REALPLAZA
+    # Como el motor de Selenium, descarta los productos que se repiten entre páginas
+    DEDUPLICAR_LINKS = True
+    
+    def __init__(self):
+        super().__init__("realplaza")
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Real Plaza."""
+        return "https://www.realplaza.com/"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Real Plaza y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        search_input = await self.page.wait_for_selector(
+            ".realplaza-store-components-0-x-omnichannelSearchInput__input", timeout=15000
+        )
+        await search_input.fill(producto)
+        url_portada = self.page.url
+        await search_input.press('Enter')
+        await esperas.esperar_navegacion_async(self.tienda, self.page, url_portada)
+        await esperas.esperar_red_inactiva_async(self.tienda, self.page)
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element(SELECTOR_TARJETA, timeout=15):
+            return []
+        return await self.page.query_selector_all(SELECTOR_TARJETA)
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Real Plaza."""
+        return await self._extraer_con_espec(item)
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_realplaza(raw)
+    
+    async def _go_to_next_page(self):
+        """Baja hasta la paginación (se renderiza al final) y pasa a la siguiente página."""
+        await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        if not await self._wait_for_element(SELECTOR_SIGUIENTE, timeout=5):
+            return False
+        return await self._click_next(SELECTOR_SIGUIENTE, por_js=True)
+
+async def buscar_en_realplaza_playwright(producto, control=None):
+    """Busca en Real Plaza con Playwright. Debe correr en el loop del runtime."""
+    scraper = RealPlazaPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
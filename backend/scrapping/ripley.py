@@ -1,16 +1,25 @@
 import os
-import time
-import random
 import re
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from .driver_pool import obtener_driver, obtener_pool
+from .bulk_extractor import EspecificacionTarjeta, extraer_con_selenium
+from .esperas import esperar_cortesia, esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
+
+# Selectores de la tarjeta de producto de Ripley (extracción masiva)
+ESPEC_RIPLEY = EspecificacionTarjeta("div.catalog-product-item", {
+    'nombre': ("div.catalog-product-details__name", "text"),
+    'link': ("a.catalog-product-item", "prop:href"),
+    'precio': ("li.catalog-prices__offer-price", "text"),
+    'imagen': [(".images-preview-item.is-active img", "prop:src"), ("img", "prop:src")],
+    'descuento': ("div.catalog-product-details__discount-tag", "text"),
+})
 
 def obtener_user_agents():
     user_agents = []
@@ -23,128 +32,111 @@ def obtener_user_agents():
         print(f"Error: Archivo '{filepath}' no encontrado.")
     return user_agents
 
-def buscar_en_ripley(producto):
+def procesar_tarjeta_ripley(raw):
+    """Convierte los campos crudos de una tarjeta de Ripley en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
+
+    try:
+        precio = float(re.sub(r"[^\d.]", "", raw.get('precio') or ""))
+    except ValueError:
+        return None
+
+    imagen = raw.get('imagen')
+    if imagen and not imagen.startswith('http'):
+        imagen = f"https://www.ripley.com.pe{imagen}"
+
+    descuento_porcentaje = None
+    if raw.get('descuento'):
+        try:
+            descuento_porcentaje = int(raw['descuento'].replace('%', '').replace('-', ''))
+        except ValueError:
+            pass
+
+    if not (nombre and precio and link):
+        return None
+
+    return {
+        'nombre': nombre,
+        'precio': precio,
+        'link': link,
+        'tienda': 'ripley',
+        'imagen': imagen,
+        'descuento': descuento_porcentaje
+    }
+
+@limitado_por_host("https://www.ripley.com.pe/")
+def buscar_en_ripley(producto, control=None):
     """Busca un producto en Ripley usando Selenium y recorre hasta 10 páginas de resultados."""
     user_agents = obtener_user_agents()
     if not user_agents:
         return []
 
-    options = ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--disable-software-rasterizer')
-    options.add_argument('--window-size=1920,1080')
-
     resultados = []
     
+    driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": random.choice(user_agents)})
+        driver = obtener_driver(user_agents, tienda='ripley')
 
-        driver.get("https://www.ripley.com.pe/")
+        esperar_cortesia('ripley', "https://www.ripley.com.pe/")
+        with etapa(INICIO, 'ripley'):
+            driver.get("https://www.ripley.com.pe/")
         try:
-            search_input = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, 'input[type="search"]'))
-            )
+            with etapa(BUSQUEDA, 'ripley'):
+                search_input = WebDriverWait(driver, 15).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, 'input[type="search"]'))
+                )
+
+                # Ingresar el producto y presionar Enter
+                search_input.clear()
+                search_input.send_keys(producto)
+                search_input.send_keys(Keys.RETURN)
         except TimeoutException:
             return resultados
-
-        # Ingresar el producto y presionar Enter
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
         pagina_actual = 1
         max_paginas = 10
 
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.catalog-product-item"))
-                )
-                items = driver.find_elements(By.CSS_SELECTOR, "div.catalog-product-item")
+                with etapa(RESULTADOS, 'ripley'):
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.catalog-product-item"))
+                    )
 
             except TimeoutException:
 
                 break
 
-            for item in items:
-                try:
-                    # Extraer nombre
-                    nombre_elem = item.find_element(By.CSS_SELECTOR, "div.catalog-product-details__name")
-                    nombre = nombre_elem.text.strip()
-
-                    # Extraer link
-                    link_elem = item.find_element(By.CSS_SELECTOR, "a.catalog-product-item")
-                    link = link_elem.get_attribute("href")
-
-                    # Extraer precio
-                    precio = None
-                    try:
-                        precio_elem = item.find_element(By.CSS_SELECTOR, "li.catalog-prices__offer-price")
-                        precio_text = precio_elem.text.strip()
-                        precio = float(re.sub(r"[^\d.]", "", precio_text))
-                    except (NoSuchElementException, ValueError):
-                        continue
-
-                    # Forzar scroll para asegurar carga de la imagen
-                    try:
-                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", item)
-                        time.sleep(1)
-                    except:
-                        pass
-
-                    # Buscar la imagen con dos selectores
-                    imagen = None
-                    try:
-                        img_elem = item.find_element(By.CSS_SELECTOR, ".images-preview-item.is-active img")
-                        imagen = img_elem.get_attribute("src")
-                    except NoSuchElementException:
-                        try:
-                            img_elem = item.find_element(By.TAG_NAME, "img")
-                            imagen = img_elem.get_attribute("src")
-                        except NoSuchElementException:
-                            print(f"No se encontró imagen para: {nombre}")
-
-                    if imagen and not imagen.startswith('http'):
-                        imagen = f"https://www.ripley.com.pe{imagen}"
-
-                    # Extraer descuento
-                    descuento_porcentaje = None
-                    try:
-                        descuento_tag = item.find_element(By.CSS_SELECTOR, 'div.catalog-product-details__discount-tag')
-                        descuento_texto = descuento_tag.text.strip().replace('%', '').replace('-', '')
-                        descuento_porcentaje = int(descuento_texto)
-                    except NoSuchElementException:
-                        pass  # No hay etiqueta de descuento
-
-                    if nombre and precio and link:
-                        resultados.append({
-                            'nombre': nombre,
-                            'precio': precio,
-                            'link': link,
-                            'tienda': 'ripley',
-                            'imagen': imagen,
-                            'descuento': descuento_porcentaje
-                        })
-
-                except Exception as e:
-                    continue
+            # Extraer toda la página en un solo viaje al navegador
+            with etapa(EXTRACCION, 'ripley'):
+                for raw in extraer_con_selenium(driver, ESPEC_RIPLEY):
+                    producto_data = procesar_tarjeta_ripley(raw)
+                    if producto_data:
+                        resultados.append(producto_data)
+            registrar_pagina(resultados[inicio_pagina:], 'ripley')
+
+            # Publicar la página apenas se extrae
+            entregar(control, resultados[inicio_pagina:])
 
             # Scroll al final de la página
             driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
 
             try:
-                next_button = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-link[aria-label='Siguiente']"))
-                )
+                with etapa(PAGINACION, 'ripley'):
+                    next_button = WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-link[aria-label='Siguiente']"))
+                    )
                 if next_button and next_button.is_enabled():
-                    driver.execute_script("arguments[0].click();", next_button)
+                    identidad = identidad_primera_tarjeta(driver, ESPEC_RIPLEY.card)
+                    esperar_cortesia('ripley', "https://www.ripley.com.pe/")
+                    with etapa(PAGINACION, 'ripley'):
+                        driver.execute_script("arguments[0].click();", next_button)
                     pagina_actual += 1
-                    time.sleep(random.uniform(4, 7))
+                    with etapa(RESULTADOS, 'ripley'):
+                        esperar_cambio_primera_tarjeta('ripley', driver, ESPEC_RIPLEY.card, identidad)
                 else:
                     break
             except (TimeoutException, NoSuchElementException):
@@ -153,9 +145,11 @@ def buscar_en_ripley(producto):
 
     except Exception as e:
         print(f"Error al buscar en Ripley: {e}")
-        return resultados
+        if driver is not None:
+            obtener_pool().reportar_error(driver)
+        return recortar(control, resultados)
     finally:
-        if 'driver' in locals():
-            driver.quit()
+        if driver is not None:
+            obtener_pool().liberar(driver)
 
-    return resultados
\ No newline at end of file
+    return recortar(control, resultados)
\ No newline at end of file
@@ -1,7 +1,8 @@
-import asyncio
 import re
-import random
-from playwright.async_api import async_playwright
+from urllib.parse import quote
+from .playwright_runtime import obtener_runtime
+from .async_base_scraper import AsyncBaseScraper
+from .ripley import ESPEC_RIPLEY, procesar_tarjeta_ripley
 
 async def _extract_product_data(item, base_url="https://simple.ripley.com.pe"):
     """Extrae los datos de un elemento de producto individual."""
@@ -63,129 +64,70 @@ async def _extract_product_data(item, base_url="https://simple.ripley.com.pe"):
     except Exception:
         return None
 
-async def _setup_browser_context():
-    """Configura el navegador con optimizaciones."""
-    p = async_playwright()
-    playwright_instance = await p.start()
+class RipleyPlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Ripley sobre el motor asíncrono de Playwright."""
     
-    browser = await playwright_instance.chromium.launch(
-        headless=True,
-        args=[
-            '--no-sandbox',
-            '--disable-dev-shm-usage',
-            '--disable-gpu',
-            '--disable-background-timer-throttling',
-            '--disable-backgrounding-occluded-windows',
-            '--disable-renderer-backgrounding'
-        ]
-    )
+    ESPEC_TARJETA = ESPEC_RIPLEY
     
-    context = await browser.new_context(
-        viewport={'width': 1920, 'height': 1080},
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    )
+    def __init__(self):
+        super().__init__("ripley")
     
-    # Bloquear recursos innecesarios
-    await context.route("**/*.{png,jpg,jpeg,gif,webp}", lambda route: route.abort())
-    await context.route("**/*.{css,woff,woff2,ttf}", lambda route: route.abort())
-    await context.route("**/analytics/**", lambda route: route.abort())
-    await context.route("**/gtm/**", lambda route: route.abort())
-    await context.route("**/facebook.com/**", lambda route: route.abort())
-    await context.route("**/google-analytics.com/**", lambda route: route.abort())
+    def _get_base_url(self):
+        """Retorna la URL base de Ripley."""
+        return "https://www.ripley.com.pe/"
     
-    return browser, context, playwright_instance
-
-async def _process_page_items(page):
-    """Procesa todos los elementos de producto en una página."""
-    items = await page.query_selector_all("div.catalog-product-item")
-    productos = []
+    async def _navigate_to_search(self, producto):
+        """Navega a Ripley y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        search_input = await self.page.wait_for_selector('input[type="search"]', timeout=15000)
+        await search_input.fill(producto)
+        await search_input.press('Enter')
     
-    for item in items:
-        producto_data = await _extract_product_data(item)
-        if producto_data:
-            productos.append(producto_data)
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element("div.catalog-product-item", timeout=15):
+            return []
+        return await self.page.query_selector_all("div.catalog-product-item")
     
-    return productos
-
-async def _navigate_to_next_page(page):
-    """Navega a la siguiente página si está disponible."""
-    next_button = await page.query_selector("a.page-link[aria-label='Siguiente']:not(.disabled)")
-    if next_button:
-        await next_button.click()
-        await page.wait_for_timeout(random.randint(2000, 4000))
-        return True
-    return False
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Ripley."""
+        return await _extract_product_data(item)
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_ripley(raw)
+    
+    def _url_pagina(self, producto, pagina):
+        """Los resultados de Ripley son direccionables por URL (?page=N)."""
+        return f"https://simple.ripley.com.pe/search/{quote(producto)}?page={pagina}"
+    
+    async def _total_paginas(self):
+        """Lee el número de la última página en la paginación."""
+        return await self._max_numero("ul.pagination a.page-link")
+    
+    async def _go_to_next_page(self):
+        """Navega a la siguiente página si está disponible."""
+        return await self._click_next("a.page-link[aria-label='Siguiente']:not(.disabled)")
 
-async def buscar_en_ripley_playwright(producto):
+async def buscar_en_ripley_playwright(producto, control=None):
     """
     Scraper de Ripley usando Playwright para mejor rendimiento.
-    Utiliza asincronía y optimizaciones de carga para mayor velocidad.
+    Debe ejecutarse en el loop del runtime compartido (ver
+    buscar_en_ripley_async_wrapper), que mantiene Chromium abierto.
     """
-    resultados = []
-    browser = None
-    context = None
-    playwright_instance = None
-    
-    try:
-        print(f"Iniciando búsqueda en Ripley con Playwright para: {producto}")
-        
-        # Configurar navegador
-        browser, context, playwright_instance = await _setup_browser_context()
-        page = await context.new_page()
-        
-        # Navegar a Ripley y buscar
-        await page.goto("https://www.ripley.com.pe/", timeout=60000)
-        search_input = await page.wait_for_selector('input[type="search"]', timeout=15000)
-        await search_input.fill(producto)
-        await search_input.press('Enter')
-        
-        # Procesar páginas
-        max_paginas = 10
-        for pagina_actual in range(1, max_paginas + 1):
-            print(f"Ripley Playwright: procesando página {pagina_actual}")
-            
-            try:
-                await page.wait_for_selector("div.catalog-product-item", timeout=15000)
-            except Exception:
-                print(f"Ripley Playwright: No se encontraron productos en la página {pagina_actual}")
-                break
-            
-            # Procesar productos de la página actual
-            productos_pagina = await _process_page_items(page)
-            resultados.extend(productos_pagina)
-            
-            print(f"Ripley Playwright: {len(productos_pagina)} productos encontrados en página {pagina_actual}")
-            
-            # Intentar ir a la siguiente página
-            if pagina_actual < max_paginas:
-                if not await _navigate_to_next_page(page):
-                    print("Ripley Playwright: No hay más páginas disponibles")
-                    break
-        
-        print(f"Ripley Playwright: Búsqueda completada. Total: {len(resultados)} productos")
-        
-    except Exception as e:
-        print(f"Error en el scraper de Ripley con Playwright: {e}")
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if playwright_instance:
-            await playwright_instance.stop()
-    
-    return resultados
+    scraper = RipleyPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
 
 def buscar_en_ripley_async_wrapper(producto):
     """Wrapper para ejecutar la función asíncrona desde código síncrono."""
-    return asyncio.run(buscar_en_ripley_playwright(producto))
+    return obtener_runtime().ejecutar(buscar_en_ripley_playwright(producto))
 
 # Para pruebas directas
 if __name__ == '__main__':
     import time
     
     start_time = time.time()
-    productos = asyncio.run(buscar_en_ripley_playwright("laptop"))
+    productos = buscar_en_ripley_async_wrapper("laptop")
     end_time = time.time()
     
     print("\n=== RESULTADOS DE PRUEBA ===")
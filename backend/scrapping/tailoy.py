@@ -1,132 +1,127 @@
 import os
-import time
-import random
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 from .ripley import obtener_user_agents
+from .driver_pool import obtener_driver, obtener_pool
+from .bulk_extractor import EspecificacionTarjeta, extraer_con_selenium
+from .esperas import esperar_cortesia, esperar_cambio_primera_tarjeta, identidad_primera_tarjeta
+from .control_host import limitado_por_host
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, INICIO, BUSQUEDA, RESULTADOS, EXTRACCION, PAGINACION
 
-def buscar_en_tailoy(producto):
+# Selectores de la tarjeta de producto de Tai Loy (extracción masiva)
+ESPEC_TAILOY = EspecificacionTarjeta("div.product-item-info", {
+    'nombre': ("a.product-item-link", "text"),
+    'link': ("a.product-item-link", "prop:href"),
+    'precio': ("span.price", "text"),
+    'imagen': [
+        ("img.product-image-photo", "prop:src"),
+        ("span.product-image-wrapper img", "prop:src"),
+        ("span.product-image-container img", "prop:src"),
+    ],
+    'descuento': ("span.price-percentage .discount-value", "text"),
+    'marca': ("div.brand-label span.label", "text"),
+})
+
+def procesar_tarjeta_tailoy(raw):
+    """Convierte los campos crudos de una tarjeta de Tai Loy en el dict de producto."""
+    nombre = raw.get('nombre')
+    link = raw.get('link')
+
+    try:
+        precio = float(re.sub(r"[^\d.]", "", raw.get('precio') or ""))
+    except ValueError:
+        return None
+
+    descuento = None
+    if raw.get('descuento'):
+        try:
+            descuento = int(raw['descuento'].replace("%", "").replace("-", "").strip())
+        except ValueError:
+            pass
+
+    if not (nombre and precio and link):
+        return None
+
+    return {
+        "nombre": nombre,
+        "precio": precio,
+        "link": link,
+        "tienda": "tailoy",
+        "imagen": raw.get('imagen'),
+        "marca": raw.get('marca'),
+        "descuento": descuento
+    }
+
+@limitado_por_host("https://www.tailoy.com.pe/")
+def buscar_en_tailoy(producto, control=None):
     """Busca un producto en Tailoy usando Selenium y recorre hasta 10 páginas de resultados."""
     user_agents = obtener_user_agents()
     if not user_agents:
         print("Error: Lista de User-Agents vacía.")
         return []
 
-    options = ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
     
     resultados = []
     
+    driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = obtener_driver(user_agents, tienda='tailoy')
 
-        driver.get("https://www.tailoy.com.pe/")
+        esperar_cortesia('tailoy', "https://www.tailoy.com.pe/")
+        with etapa(INICIO, 'tailoy'):
+            driver.get("https://www.tailoy.com.pe/")
         
-        search_input = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "input.vtex-styleguide-9-x-input"))
-        )
+        with etapa(BUSQUEDA, 'tailoy'):
+            search_input = WebDriverWait(driver, 15).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "input#search"))
+            )
 
-        search_input.clear()
-        search_input.send_keys(producto)
-        search_input.send_keys(Keys.RETURN)
+            search_input.clear()
+            search_input.send_keys(producto)
+            search_input.send_keys(Keys.RETURN)
 
         pagina_actual = 1
         max_paginas = 10
 
         while pagina_actual <= max_paginas:
+            if debe_parar(control, len(resultados)):
+                break
+            inicio_pagina = len(resultados)
             try:
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-item-info"))
-                )
-                items = driver.find_elements(By.CSS_SELECTOR, "div.product-item-info")
+                with etapa(RESULTADOS, 'tailoy'):
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.product-item-info"))
+                    )
             except TimeoutException:
                 break
 
-            for item in items:
-                try:
-                    # Extraer nombre
-                    nombre_elem = item.find_element(By.CSS_SELECTOR, "a.product-item-link")
-                    nombre = nombre_elem.text.strip()
-
-                    # Extraer link
-                    link = nombre_elem.get_attribute("href")
-
-                    # Extraer precio
-                    precio = None
-                    try:
-                        precio_elem = item.find_element(By.CSS_SELECTOR, "span.price")
-                        precio_text = precio_elem.text.strip()
-                        precio = float(re.sub(r"[^\d.]", "", precio_text))
-                    except (NoSuchElementException, ValueError):
-                        continue
-
-                    # Extraer imagen
-                    imagen = None
-                    try:
-                        img_elem = item.find_element(By.CSS_SELECTOR, "img.product-image-photo")
-                        imagen = img_elem.get_attribute("src")
-                        if not imagen:
-                            # Buscar dentro del contenedor de imagen
-                            img_container = item.find_element(By.CSS_SELECTOR, "span.product-image-wrapper img")
-                            imagen = img_container.get_attribute("src")
-                    except NoSuchElementException:
-                        try:
-                            # Intento alternativo usando el contenedor de imagen
-                            img_container = item.find_element(By.CSS_SELECTOR, "span.product-image-container")
-                            img_elem = img_container.find_element(By.TAG_NAME, "img")
-                            imagen = img_elem.get_attribute("src")
-                        except NoSuchElementException:
-                            imagen = None
-                    # También extraer el descuento si existe
-                    descuento = None
-                    try:
-                        descuento_elem = item.find_element(By.CSS_SELECTOR, "span.price-percentage .discount-value")
-                        descuento_text = descuento_elem.text.strip().replace("%", "").replace("-", "").strip()
-                        descuento = int(descuento_text)
-                    except (NoSuchElementException, ValueError):
-                        pass
-                
-                    # Extraer marca
-                    marca = None
-                    try:
-                        marca_elem = item.find_element(By.CSS_SELECTOR, "div.brand-label span.label")
-                        marca = marca_elem.text.strip()
-                    except NoSuchElementException:
-                        pass
-
-                    if nombre and precio and link:
-                        resultados.append({
-                            "nombre": nombre,
-                            "precio": precio,
-                            "link": link,
-                            "tienda": "tailoy",
-                            "imagen": imagen,
-                            "marca": marca,
-                            "descuento": descuento
-                        })
-                except Exception as e:
-                    continue
+            # Extraer toda la página en un solo viaje al navegador
+            with etapa(EXTRACCION, 'tailoy'):
+                for raw in extraer_con_selenium(driver, ESPEC_TAILOY):
+                    producto_data = procesar_tarjeta_tailoy(raw)
+                    if producto_data:
+                        resultados.append(producto_data)
+            registrar_pagina(resultados[inicio_pagina:], 'tailoy')
+
+            # Publicar la página apenas se extrae
+            entregar(control, resultados[inicio_pagina:])
 
             try:
                 # Buscar botón siguiente
                 next_button = driver.find_element(By.CSS_SELECTOR, "a.next")
                 if next_button and next_button.is_enabled():
-                    driver.execute_script("arguments[0].click();", next_button)
+                    identidad = identidad_primera_tarjeta(driver, ESPEC_TAILOY.card)
+                    esperar_cortesia('tailoy', "https://www.tailoy.com.pe/")
+                    with etapa(PAGINACION, 'tailoy'):
+                        driver.execute_script("arguments[0].click();", next_button)
                     pagina_actual += 1
-                    time.sleep(random.uniform(4, 7))
+                    with etapa(RESULTADOS, 'tailoy'):
+                        esperar_cambio_primera_tarjeta('tailoy', driver, ESPEC_TAILOY.card, identidad)
                 else:
                     break
             except NoSuchElementException:
@@ -134,9 +129,11 @@ def buscar_en_tailoy(producto):
 
     except Exception as e:
         print(f"Error al buscar en Tailoy: {e}")
-        return resultados
+        if driver is not None:
+            obtener_pool().reportar_error(driver)
+        return recortar(control, resultados)
     finally:
-        if 'driver' in locals():
-            driver.quit()
+        if driver is not None:
+            obtener_pool().liberar(driver)
 
-    return resultados
\ No newline at end of file
+    return recortar(control, resultados)
\ No newline at end of file
@@ -0,0 +1,53 @@
+from urllib.parse import quote_plus
+from .async_base_scraper import AsyncBaseScraper
+from .tailoy import ESPEC_TAILOY, procesar_tarjeta_tailoy
+
+class TailoyPlaywrightScraper(AsyncBaseScraper):
+    """Scraper de Tai Loy (Magento) sobre el motor asíncrono de Playwright."""
+    
+    ESPEC_TARJETA = ESPEC_TAILOY
+    
+    def __init__(self):
+        super().__init__("tailoy")
+    
+    def _get_base_url(self):
+        """Retorna la URL base de Tai Loy."""
+        return "https://www.tailoy.com.pe"
+    
+    async def _navigate_to_search(self, producto):
+        """Navega a Tai Loy y realiza la búsqueda del producto."""
+        await self.page.goto(self._get_base_url(), timeout=60000)
+        search_input = await self.page.wait_for_selector("input#search", timeout=15000)
+        await search_input.fill(producto)
+        await search_input.press('Enter')
+    
+    async def _get_product_elements(self):
+        """Retorna la lista de elementos de producto en la página actual."""
+        if not await self._wait_for_element(ESPEC_TAILOY.card, timeout=15):
+            return []
+        return await self.page.query_selector_all(ESPEC_TAILOY.card)
+    
+    async def _extract_data_from_element(self, item):
+        """Extrae los datos de un elemento de producto de Tai Loy."""
+        return await self._extraer_con_espec(item)
+    
+    def _procesar_datos_crudos(self, raw):
+        """Post-procesa una tarjeta obtenida con la extracción masiva."""
+        return procesar_tarjeta_tailoy(raw)
+    
+    def _url_pagina(self, producto, pagina):
+        """Los resultados de Magento son direccionables por URL (?q=...&p=N)."""
+        return f"{self._get_base_url()}/catalogsearch/result/?q={quote_plus(producto)}&p={pagina}"
+    
+    async def _total_paginas(self):
+        """Calcula las páginas con el total de productos de la barra de herramientas."""
+        return await self._paginas_por_total(".toolbar-amount .toolbar-number")
+    
+    async def _go_to_next_page(self):
+        """Navega a la siguiente página en Tai Loy."""
+        return await self._click_next("a.next")
+
+async def buscar_en_tailoy_playwright(producto, control=None):
+    """Busca en Tai Loy con Playwright. Debe correr en el loop del runtime."""
+    scraper = TailoyPlaywrightScraper()
+    return await scraper.buscar(producto, control=control)
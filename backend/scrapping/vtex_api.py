@@ -0,0 +1,237 @@
+import os
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .control_host import turno, es_bloqueo, HostNoDisponible
+from .control_busqueda import debe_parar, recortar, entregar
+from .metricas import etapa, registrar_pagina, RESULTADOS, EXTRACCION
+
+# Tiendas que corren sobre VTEX y exponen la API pública de búsqueda del catálogo.
+# La URL base se puede sobreescribir con VTEX_BASE_URL_<TIENDA> (ej. el servidor
+# local de tests/vtex_stub.py, que sirve JSON grabado).
+TIENDAS_VTEX = {
+    'metro': 'https://www.metro.pe',
+    'plazavea': 'https://www.plazavea.com.pe',
+    'oechsle': 'https://www.oechsle.pe',
+}
+
+SEARCH_PATH = "/api/catalog_system/pub/products/search"
+PAGE_SIZE = 50  # Máximo permitido por VTEX entre _from y _to
+PAGINAS_CONCURRENTES = 3  # Páginas pedidas en paralelo por tienda (PAGINAS_CONCURRENTES_<TIENDA>)
+TIMEOUT = 15
+HEADERS = {
+    'Accept': 'application/json',
+    'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def obtener_session():
+    """Retorna la sesión HTTP compartida (keep-alive y pool de conexiones)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(HEADERS)
+            _session = session
+        return _session
+
+def base_url_de(tienda):
+    return os.environ.get(f'VTEX_BASE_URL_{tienda.upper()}', TIENDAS_VTEX[tienda]).rstrip('/')
+
+def _mapear_producto(item, tienda, base_url):
+    """Convierte un producto de la API de VTEX al dict de producto de los scrapers."""
+    nombre = (item.get('productName') or '').strip()
+    sku = (item.get('items') or [{}])[0]
+    vendedor = (sku.get('sellers') or [{}])[0]
+    oferta = vendedor.get('commertialOffer') or {}
+
+    try:
+        precio = float(oferta.get('Price') or 0)
+        precio_lista = float(oferta.get('ListPrice') or 0)
+    except (TypeError, ValueError):
+        return None
+
+    link = item.get('link')
+    if not link and item.get('linkText'):
+        link = f"{base_url}/{item['linkText']}/p"
+
+    if not nombre or precio <= 0 or not link:
+        return None
+
+    descuento = None
+    if precio_lista > precio:
+        descuento = int(((precio_lista - precio) / precio_lista) * 100)
+
+    imagen = None
+    imagenes = sku.get('images') or []
+    if imagenes:
+        imagen = imagenes[0].get('imageUrl')
+
+    return {
+        'nombre': nombre,
+        'precio': precio,
+        'link': link,
+        'tienda': tienda,
+        'imagen': imagen,
+        'descuento': descuento
+    }
+
+def _pedir_pagina(session, tienda, base_url, producto, pagina):
+    """
+    Pide una página de la API y retorna (items, total_productos o None).
+    Cada petición ocupa un turno del controlador AIMD del host; 403/429 y
+    respuestas de captcha cuentan como bloqueo.
+    """
+    desde = pagina * PAGE_SIZE
+    params = {'ft': producto, '_from': desde, '_to': desde + PAGE_SIZE - 1}
+    with turno(base_url) as t:
+        try:
+            response = session.get(base_url + SEARCH_PATH, params=params, timeout=TIMEOUT)
+        except requests.exceptions.RetryError:
+            t.bloqueo()  # Se agotaron los reintentos por 429
+            raise
+        if response.status_code in (403, 429):
+            t.bloqueo()
+        response.raise_for_status()
+        try:
+            items = response.json()
+        except ValueError:
+            if es_bloqueo(response.text[:2000]):
+                t.bloqueo()
+            raise
+        if not isinstance(items, list):
+            raise ValueError(f"Respuesta inesperada de la API de {tienda}")
+        if not items:
+            t.vacia()
+
+    # VTEX informa el total en la cabecera "resources: 0-49/1234"
+    total = None
+    recursos = response.headers.get('resources', '')
+    if '/' in recursos:
+        try:
+            total = int(recursos.rsplit('/', 1)[1])
+        except ValueError:
+            total = None
+    return items, total
+
+def _concurrencia_paginas(tienda):
+    return max(1, int(os.environ.get(f'PAGINAS_CONCURRENTES_{tienda.upper()}', PAGINAS_CONCURRENTES)))
+
+def buscar_en_vtex(tienda, producto, max_paginas=10, base_url=None, control=None):
+    """
+    Busca un producto en una tienda VTEX usando solo HTTP (sin navegador).
+    Pide la página 1 (PAGE_SIZE productos, el máximo de VTEX), lee el total de
+    la cabecera `resources` y descarga el resto de páginas en paralelo,
+    conservando el orden. Lanza una excepción si la página 1 falla, para que
+    el llamador use el navegador. Con `control` (ControlBusqueda) cada página
+    se publica apenas llega, solo se piden las páginas que cubren el límite y
+    se descartan las que no llegan antes del deadline.
+    """
+    base_url = (base_url or base_url_de(tienda)).rstrip('/')
+    session = obtener_session()
+    paginas = {}  # numero -> productos mapeados
+    publicados = set()
+
+    def _pedir(pagina):
+        # Corre también en los hilos de descarga paralela: tienda y control van explícitos
+        with etapa(RESULTADOS, tienda, control):
+            return _pedir_pagina(session, tienda, base_url, producto, pagina)
+
+    def _agregar(numero, items):
+        with etapa(EXTRACCION, tienda, control):
+            productos = [data for data in (_mapear_producto(item, tienda, base_url) for item in items) if data]
+        registrar_pagina(productos, tienda, control)
+        paginas[numero] = productos
+        nuevos = [data for data in productos if data['link'] not in publicados]
+        publicados.update(data['link'] for data in nuevos)
+        entregar(control, nuevos)
+
+    items, total = _pedir(0)
+    _agregar(1, items)
+    print(f"{tienda.title()} API: {len(items)} productos en página 1")
+
+    if control is not None and control.limite:
+        max_paginas = min(max_paginas, -(-control.limite // PAGE_SIZE))
+
+    if len(items) >= PAGE_SIZE and not debe_parar(control, len(items)):
+        if total is not None:
+            total_paginas = min(max_paginas, -(-total // PAGE_SIZE))
+            executor = ThreadPoolExecutor(max_workers=_concurrencia_paginas(tienda))
+            futures = {
+                executor.submit(_pedir, pagina): pagina + 1
+                for pagina in range(1, total_paginas)
+            }
+            pendientes = set(futures)
+            while pendientes:
+                listas, pendientes = wait(
+                    pendientes, timeout=control.restante() if control is not None else None,
+                    return_when=FIRST_COMPLETED
+                )
+                if not listas:
+                    control.vencido()
+                    print(f"{tienda.title()} API: deadline alcanzado, {len(pendientes)} páginas sin descargar")
+                    break
+                for future in listas:
+                    try:
+                        _agregar(futures[future], future.result()[0])
+                    except (requests.RequestException, ValueError, HostNoDisponible) as e:
+                        print(f"{tienda.title()} API: error en la página {futures[future]}: {e}")
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            # Sin total conocido: paginar secuencialmente hasta una página incompleta
+            for pagina in range(1, max_paginas):
+                if debe_parar(control, sum(len(p) for p in paginas.values())):
+                    break
+                try:
+                    items, _ = _pedir(pagina)
+                except (requests.RequestException, ValueError, HostNoDisponible) as e:
+                    print(f"{tienda.title()} API: error en la página {pagina + 1}: {e}")
+                    break
+                _agregar(pagina + 1, items)
+                if len(items) < PAGE_SIZE:
+                    break
+
+    # El resultado final conserva el orden de las páginas aunque hayan llegado en otro orden
+    resultados = []
+    vistos = set()
+    for numero in sorted(paginas):
+        for data in paginas[numero]:
+            if data['link'] not in vistos:
+                vistos.add(data['link'])
+                resultados.append(data)
+
+    resultados = recortar(control, resultados)
+    print(f"{tienda.title()} API: Búsqueda completada. Total: {len(resultados)} productos")
+    return resultados
+
+def buscar_en_metro_api(producto, control=None):
+    return buscar_en_vtex('metro', producto, control=control)
+
+def buscar_en_plazavea_api(producto, control=None):
+    return buscar_en_vtex('plazavea', producto, control=control)
+
+def buscar_en_oechsle_api(producto, control=None):
+    return buscar_en_vtex('oechsle', producto, control=control)
+
+# Para pruebas directas (ej. contra un servidor local con JSON grabado:
+# VTEX_BASE_URL_METRO=http://127.0.0.1:8000 python -m backend.scrapping.vtex_api metro laptop)
+if __name__ == '__main__':
+    import sys
+    import time
+
+    tienda = sys.argv[1] if len(sys.argv) > 1 else 'metro'
+    consulta = sys.argv[2] if len(sys.argv) > 2 else 'laptop'
+
+    start_time = time.time()
+    productos = buscar_en_vtex(tienda, consulta)
+    print(f"Productos encontrados: {len(productos)} en {time.time() - start_time:.2f} segundos")
+    if productos:
+        print(productos[0])
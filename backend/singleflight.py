@@ -0,0 +1,117 @@
+import time
+import threading
+from concurrent.futures import Future
+
+
+class Trabajo:
+    """
+    Una búsqueda en curso de una tienda, compartida por todas las peticiones
+    que pidieron lo mismo. `future` se resuelve con los productos de la tienda
+    (el resultado de `lanzado`, el Future que retornó `lanzar()`).
+    """
+
+    def __init__(self, clave, control=None):
+        self.clave = clave
+        self.inicio = time.time()
+        self.future = Future()
+        self.lanzado = None
+        self.suscriptores = 1
+        self.activos = 1  # Suscriptores que aún esperan el resultado
+        self._control = control
+
+    @property
+    def motor(self):
+        return getattr(self.lanzado, 'motor', None)
+
+    @property
+    def control(self):
+        if self._control is not None:
+            return self._control
+        return getattr(self.lanzado, 'control', None)
+
+    @property
+    def turno(self):
+        return getattr(self.lanzado, 'turno', None)
+
+
+def _encadenar(origen, destino):
+    if origen.cancelled():
+        destino.cancel()
+    elif origen.exception() is not None:
+        destino.set_exception(origen.exception())
+    else:
+        destino.set_result(origen.result())
+
+
+class SingleFlight:
+    """
+    Deduplicación de búsquedas concurrentes por clave (tienda, consulta).
+    Si ya hay un trabajo en curso para la clave, el llamador se une a él en
+    lugar de lanzar otro navegador, y recibe el mismo resultado.
+    """
+
+    def __init__(self):
+        self._trabajos = {}
+        self._lock = threading.Lock()
+        self._coalescidas = 0
+
+    def ejecutar(self, clave, lanzar, control=None):
+        """
+        Retorna (trabajo, es_nuevo). `lanzar()` debe retornar un
+        concurrent.futures.Future y solo se llama si no hay un trabajo en curso.
+        `control` (el ControlBusqueda que usará `lanzar`) queda disponible en
+        `trabajo.control` para quien se una antes de que `lanzar()` retorne.
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(clave)
+            if trabajo is not None:
+                trabajo.suscriptores += 1
+                trabajo.activos += 1
+                self._coalescidas += 1
+                return trabajo, False
+            trabajo = Trabajo(clave, control)
+            self._trabajos[clave] = trabajo
+        trabajo.future.add_done_callback(lambda _: self._finalizar(clave, trabajo))
+
+        # Fuera del lock: lanzar() puede tardar (encolar en Redis, arrancar el
+        # loop de Playwright) y no debe frenar a las demás claves
+        try:
+            trabajo.lanzado = lanzar()
+        except Exception as e:
+            trabajo.future.set_exception(e)
+            raise
+        trabajo.lanzado.add_done_callback(lambda f: _encadenar(f, trabajo.future))
+        return trabajo, True
+
+    def abandonar(self, trabajo):
+        """
+        Un suscriptor deja de esperar el trabajo. Retorna True si era el
+        último y el trabajo sigue en curso (quien lo lanzó puede cancelarlo).
+        """
+        with self._lock:
+            trabajo.activos -= 1
+            return trabajo.activos <= 0 and not trabajo.future.done()
+
+    def _finalizar(self, clave, trabajo):
+        with self._lock:
+            if self._trabajos.get(clave) is trabajo:
+                del self._trabajos[clave]
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'en_curso': len(self._trabajos),
+                'coalescidas': self._coalescidas,
+            }
+
+
+_singleflight = None
+_singleflight_lock = threading.Lock()
+
+def obtener_singleflight():
+    """Retorna el deduplicador de búsquedas compartido por todo el proceso."""
+    global _singleflight
+    with _singleflight_lock:
+        if _singleflight is None:
+            _singleflight = SingleFlight()
+        return _singleflight
@@ -0,0 +1,85 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .motores import enviar_tienda
+from .scrapping.control_busqueda import ControlBusqueda
+from .cola_trabajos import crear_cola, COLA_TRABAJOS, TOMADO, ITEMS, FIN, ERROR
+
+# Worker de scraping: toma trabajos (tienda, consulta) de la cola, los corre con
+# los mismos motores que /buscar y publica el progreso en el canal de la app.
+WORKER_CONCURRENCIA = int(os.environ.get('WORKER_CONCURRENCIA', 2))  # Trabajos simultáneos por worker
+WORKER_HILOS = int(os.environ.get('SCRAPING_WORKERS', 8))  # Hilos para API HTTP y Selenium
+
+
+def ejecutar_trabajo(cola, trabajo, executor):
+    """Corre un trabajo y publica sus eventos: tomado, items por página y fin (o error)."""
+    canal, id = trabajo['canal'], trabajo['id']
+    control = ControlBusqueda.hasta(trabajo.get('limite'), trabajo.get('fin'))
+    if control.vencido():
+        # /buscar ya cortó la tienda mientras el trabajo esperaba en la cola
+        cola.publicar(canal, {'id': id, 'tipo': ERROR, 'error': 'Deadline vencido antes de empezar'})
+        return
+    control.suscribir(lambda lote: cola.publicar(canal, {'id': id, 'tipo': ITEMS, 'items': lote}))
+    cola.publicar(canal, {'id': id, 'tipo': TOMADO})
+    print(f"Worker: {trabajo['tienda']} '{trabajo['producto']}'")
+
+    future = enviar_tienda(trabajo['tienda'], trabajo['producto'], executor, control)
+    try:
+        resultados = future.result()
+    except Exception as e:
+        cola.publicar(canal, {'id': id, 'tipo': ERROR, 'error': str(e), 'motor': getattr(future, 'motor', None),
+                              'desglose': control.desglose()})
+        return
+    cola.publicar(canal, {
+        'id': id,
+        'tipo': FIN,
+        'resultados': resultados or [],
+        'motor': getattr(future, 'motor', None),
+        'motivo': control.motivo,
+        'desglose': control.desglose(),
+    })
+
+def _bucle(cola, executor, detener):
+    while not detener.is_set():
+        try:
+            trabajo = cola.tomar(timeout=5)
+        except Exception as e:
+            print(f"Worker: error tomando trabajos: {e}")
+            detener.wait(5)
+            continue
+        if trabajo is None:
+            continue
+        try:
+            ejecutar_trabajo(cola, trabajo, executor)
+        except Exception as e:
+            print(f"Worker: error en el trabajo {trabajo.get('id')}: {e}")
+
+def iniciar_workers(cola, concurrencia=WORKER_CONCURRENCIA, hilos=WORKER_HILOS):
+    """Arranca `concurrencia` hilos que consumen la cola; retorna el Event para detenerlos."""
+    detener = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=hilos)
+    for i in range(concurrencia):
+        threading.Thread(target=_bucle, args=(cola, executor, detener), name=f'worker-{i}', daemon=True).start()
+    return detener
+
+
+# Proceso worker independiente (en esta u otra máquina):
+# COLA_TRABAJOS=socket://app:6010 COLA_CLAVE=<secreto de la app> python -m backup.descuentos.backend.worker
+if __name__ == '__main__':
+    import sys
+    from .scrapping.driver_pool import obtener_pool
+    from .scrapping.playwright_runtime import obtener_runtime
+    from .scrapping.metricas import servir_metricas
+
+    url = sys.argv[1] if len(sys.argv) > 1 else COLA_TRABAJOS
+    if not url or url == 'local':
+        sys.exit("Indica la cola: python -m backup.descuentos.backend.worker socket://host:6010 (o redis://...)")
+
+    threading.Thread(target=obtener_pool().precalentar, daemon=True).start()
+    threading.Thread(target=obtener_runtime().precalentar, daemon=True).start()
+    # Las métricas de este proceso (tiempos por etapa, páginas, errores) para Prometheus
+    if os.environ.get('METRICAS_PUERTO'):
+        servir_metricas(int(os.environ['METRICAS_PUERTO']))
+        print(f"Métricas en http://0.0.0.0:{os.environ['METRICAS_PUERTO']}/metrics")
+    print(f"Worker escuchando {url} con {WORKER_CONCURRENCIA} trabajos simultáneos")
+    iniciar_workers(crear_cola(url)).wait()
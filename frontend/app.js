@@ -4,6 +4,9 @@ $(document).ready(function() {
     let resultadosGlobales = []; // Para almacenar todos los resultados
     let elementosPorPagina = 16; // Número de resultados por página
     let paginaActual = 1;
+    let resultSet = null; // Id del conjunto de resultados guardado en el servidor al terminar la búsqueda
+    let cursores = {}; // Cursores opacos de la página anterior y siguiente
+    let peticionPagina = 0; // Para descartar respuestas de páginas que llegan fuera de orden
 
     $('#searchForm').submit(async (e) => {
         e.preventDefault();
@@ -15,13 +18,26 @@ $(document).ready(function() {
         mostrarResultadosPaginados();
     });
 
+    // Orden y filtros actuales, con los nombres de parámetro que entiende el servidor
+    function parametrosFiltro() {
+        const params = new URLSearchParams({
+            ordenarPor: $('#ordenarPor').val(),
+            porPagina: elementosPorPagina
+        });
+        if ($('#filtroTienda').val()) params.set('tienda', $('#filtroTienda').val());
+        if ($('#minPrice').val()) params.set('min', $('#minPrice').val());
+        if ($('#maxPrice').val()) params.set('max', $('#maxPrice').val());
+        return params;
+    }
+
     async function buscarProductos() {
         const producto = $('#producto').val();
-        const ordenarPor = $('#ordenarPor').val();
 
         $('#resultados').empty();
         $('#pagination').empty();
         resultadosGlobales = [];
+        resultSet = null;
+        cursores = {};
         paginaActual = 1;
 
         // Reset and show progress bar
@@ -44,41 +60,88 @@ $(document).ready(function() {
         searchRequest = { controller, producto };
 
         try {
-            const response = await fetch(`/buscar?producto=${encodeURIComponent(producto)}&ordenarPor=${encodeURIComponent(ordenarPor)}`, { signal });
+            const params = parametrosFiltro();
+            params.set('producto', producto);
+            const response = await fetch(`/buscar?${params}`, { signal });
+            if (response.status === 429) {
+                const data = await response.json();
+                const segundos = response.headers.get('Retry-After') || data.reintentar;
+                $('#resultados').html(`<div class="col-12 text-center"><div class="alert alert-warning" role="alert">${data.error} (${segundos}s)</div></div>`);
+                return;
+            }
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
+            let buffer = '';
+            let renderPendiente = false;
+            
+            // Re-renderizar a lo más una vez por frame aunque lleguen varios lotes seguidos
+            const programarRender = () => {
+                if (renderPendiente) return;
+                renderPendiente = true;
+                requestAnimationFrame(() => {
+                    renderPendiente = false;
+                    mostrarResultadosPaginados();
+                });
+            };
             
             while (true) {
                 const { done, value } = await reader.read();
                 if (done) break;
                 
-                const chunk = decoder.decode(value);
-                try {
-                    const data = JSON.parse(chunk);
-                    if (data.type === 'progress') {
-                        const progress = (data.completed / data.total) * 100;
-                        $('#searchProgressBar').css('width', `${progress}%`).text(`${Math.round(progress)}%`);
-                        $('#currentStore').text(`${data.store}: ${data.status} (${data.resultados} resultados) - ${data.tiempo}s`);
-                        $('#progressText').text(`Buscando productos: ${data.completed}/${data.total} tiendas`);
+                // NDJSON: un evento por línea; una lectura puede traer varias líneas o una incompleta
+                buffer += decoder.decode(value, { stream: true });
+                const lineas = buffer.split('\n');
+                buffer = lineas.pop();
+                
+                for (const linea of lineas) {
+                    if (!linea.trim()) continue;
+                    try {
+                        const data = JSON.parse(linea);
+                        if (data.type === 'items') {
+                            resultadosGlobales = resultadosGlobales.concat(data.items);
+                            programarRender();
+                        } else if (data.type === 'queued') {
+                            // La tienda espera un cupo de navegador
+                            const statusEl = document.getElementById(`status-${data.store.toLowerCase()}`);
+                            if (statusEl) {
+                                statusEl.innerHTML = `${data.store}: <span class="text-muted">En cola (#${data.posicion}, ~${Math.round(data.espera_estimada)}s)</span>`;
+                            }
+                        } else if (data.type === 'progress') {
+                            const progress = (data.completed / data.total) * 100;
+                            $('#searchProgressBar').css('width', `${progress}%`).text(`${Math.round(progress)}%`);
+                            $('#currentStore').text(`${data.store}: ${data.status} (${data.resultados} resultados) - ${data.tiempo}s`);
+                            $('#progressText').text(`Buscando productos: ${data.completed}/${data.total} tiendas`);
                         
-                        // Actualizar el estado de la tienda individual
-                        const statusEl = document.getElementById(`status-${data.store.toLowerCase()}`);
-                        if (statusEl) {
-                            let statusText = `${data.store}: `;
-                            if (data.status === "✓") {
-                                statusText += `<span style="color:green;">${data.status}</span> `;
-                            } else {
-                                statusText += `<span style="color:red;">${data.status}</span> `;
+                            // Actualizar el estado de la tienda individual
+                            const statusEl = document.getElementById(`status-${data.store.toLowerCase()}`);
+                            if (statusEl) {
+                                let statusText = `${data.store}: `;
+                                if (data.status === "✓") {
+                                    statusText += `<span style="color:green;">${data.status}</span> `;
+                                } else {
+                                    statusText += `<span style="color:red;">${data.status}</span> `;
+                                }
+                                statusText += `(${data.resultados} resultados - ${data.tiempo}s)`;
+                                if (data.cache === 'hit' || data.cache === 'stale') {
+                                    statusText += ' <small class="text-muted">(cache)</small>';
+                                }
+                                if (data.parcial) {
+                                    statusText += ` <small class="text-warning">(parcial: ${data.motivo})</small>`;
+                                }
+                                statusEl.innerHTML = statusText;
+                                // Desglose por etapa (cola, navegador, resultados, extracción...) al pasar el mouse
+                                statusEl.title = Object.entries(data.etapas || {})
+                                    .map(([etapa, segundos]) => `${etapa}: ${segundos}s`).join('\n');
                             }
-                            statusText += `(${data.resultados} resultados - ${data.tiempo}s)`;
-                            statusEl.innerHTML = statusText;
+                        } else if (data.type === 'results') {
+                            // Desde aquí el servidor filtra, ordena y pagina; llega solo la primera página
+                            resultadosGlobales = [];
+                            resultSet = data.resultset;
+                            mostrarPaginaServidor(data);
                         }
-                    } else if (data.type === 'results') {
-                        resultadosGlobales = data.results;
-                        mostrarResultadosPaginados();
+                    } catch (e) {
+                        console.error('Error parsing chunk:', e);
                     }
-                } catch (e) {
-                    console.error('Error parsing chunk:', e);
                 }
             }
         } catch (error) {
@@ -96,62 +159,42 @@ $(document).ready(function() {
         }
     }
 
-    function mostrarResultadosPaginados() {
-        const resultadosFiltradosOrdenados = filtrarYOrdenarResultados(resultadosGlobales);
+    function mostrarResultadosPaginados(cursor) {
+        if (resultSet) {
+            cargarPaginaServidor(cursor);
+            return;
+        }
+        // Búsqueda en curso: vista previa de lo que ya llegó, en orden de llegada
         const indiceInicio = (paginaActual - 1) * elementosPorPagina;
-        const indiceFin = indiceInicio + elementosPorPagina;
-        const resultadosPagina = resultadosFiltradosOrdenados.slice(indiceInicio, indiceFin);
-
-        mostrarResultados(resultadosPagina);
-        actualizarPaginacion(resultadosFiltradosOrdenados.length);
+        mostrarResultados(resultadosGlobales.slice(indiceInicio, indiceInicio + elementosPorPagina));
+        actualizarPaginacion(resultadosGlobales.length);
     }
 
-    function filtrarYOrdenarResultados(resultados) {
-        if (!Array.isArray(resultados)) {
-            console.error('resultados no es un array:', resultados);
-            return [];
-        }
-
-        const filtroTienda = $('#filtroTienda').val();
-        const ordenarPor = $('#ordenarPor').val();
-        const minPrice = parseFloat($('#minPrice').val()) || 0;
-        const maxPrice = parseFloat($('#maxPrice').val()) || Infinity;
-
-        let resultadosFiltrados = [...resultados];  // Create a copy of the array
-
-        if (filtroTienda) {
-            resultadosFiltrados = resultadosFiltrados.filter(r => r.tienda === filtroTienda);
-        }
-
-        resultadosFiltrados = resultadosFiltrados.filter(r => r.precio >= minPrice && r.precio <= maxPrice);
+    async function cargarPaginaServidor(cursor) {
+        const params = cursor ? new URLSearchParams({ cursor }) : parametrosFiltro();
+        if (!cursor) params.set('pagina', paginaActual);
+        const numero = ++peticionPagina;
 
-        if (ordenarPor === 'precioAsc') {
-            resultadosFiltrados.sort((a, b) => a.precio - b.precio);
-        } else if (ordenarPor === 'precioDesc') {
-            resultadosFiltrados.sort((a, b) => b.precio - a.precio);
-        } else if (ordenarPor === 'descuentoDesc') {
-            resultadosFiltrados.sort((a, b) => (b.descuento || -1) - (a.descuento || -1));
-        } else if (ordenarPor === 'recomendados') {
-            resultadosFiltrados.sort((a, b) => {
-                let puntajeA = (a.descuento || 0) * 5;
-                const palabrasClaveA = $('#producto').val().toLowerCase().split(' '); // Split by space
-                const nombreProductoA = a.nombre.toLowerCase();
-                const coincidenciasA = palabrasClaveA.filter(palabra => nombreProductoA.includes(palabra)).length;
-                puntajeA += coincidenciasA * 2;
-                puntajeA -= (a.precio / 100);
-
-                let puntajeB = (b.descuento || 0) * 5;
-                const palabrasClaveB = $('#producto').val().toLowerCase().split(' '); // Split by space
-                const nombreProductoB = b.nombre.toLowerCase();
-                const coincidenciasB = palabrasClaveB.filter(palabra => nombreProductoB.includes(palabra)).length;
-                puntajeB += coincidenciasB * 2;
-                puntajeB -= (b.precio / 100);
-
-                return puntajeB - puntajeA;
-            });
+        try {
+            const response = await fetch(`/resultados/${encodeURIComponent(resultSet)}?${params}`);
+            const data = await response.json();
+            if (numero !== peticionPagina) return;
+            if (!response.ok) {
+                $('#resultados').html(`<div class="col-12 text-center"><div class="alert alert-warning" role="alert">${data.error}</div></div>`);
+                $('#pagination').empty();
+                return;
+            }
+            mostrarPaginaServidor(data);
+        } catch (error) {
+            console.error('Error cargando la página de resultados:', error);
         }
+    }
 
-        return resultadosFiltrados;
+    function mostrarPaginaServidor(data) {
+        paginaActual = data.pagina;
+        cursores = { anterior: data.anterior, siguiente: data.siguiente };
+        mostrarResultados(data.items);
+        actualizarPaginacion(data.total);
     }
 
     function mostrarResultados(resultados) {
@@ -162,6 +205,11 @@ $(document).ready(function() {
             // Usamos un div vacío con fondo gris si no hay imagen
             let imagenHtml = r.imagen ? `<img src="${r.imagen}" class="card-img-top" alt="${r.nombre}">` : `<div class="card-img-top" style="background-color: #eee; height: 200px;"></div>`;
             let descuentoHtml = r.descuento !== null && r.descuento !== undefined ? `<span class="badge badge-success">-${r.descuento}%</span>` : '';
+            // Mismo producto en varias tiendas: precio de cada una, de menor a mayor
+            let ofertasHtml = r.ofertas ? `
+                <ul class="list-unstyled small mb-0">
+                    ${r.ofertas.map(o => `<li><a href="${o.link}" target="_blank">${o.tienda}</a>: S/ ${o.precio.toFixed(2)}</li>`).join('')}
+                </ul>` : '';
 
             const card = $(`
                 <div class="col-md-4 mb-4 animated fadeInUp">
@@ -170,7 +218,8 @@ $(document).ready(function() {
                         <div class="card-body">
                             <h5 class="card-title">${r.nombre} ${descuentoHtml}</h5>
                             <p class="current-price">S/ ${r.precio.toFixed(2)}</p>
-                            <p class="store-name"><i class="bi bi-shop"></i> ${r.tienda}</p>
+                            <p class="store-name"><i class="bi bi-shop"></i> ${r.tienda}${r.ofertas ? ` y ${r.ofertas.length - 1} tienda(s) más` : ''}</p>
+                            ${ofertasHtml}
                             <a href="${r.link}" target="_blank" class="btn btn-primary w-100 mt-3"><i class="bi bi-eye"></i> Ver en tienda</a>
                         </div>
                     </div>
@@ -188,7 +237,7 @@ $(document).ready(function() {
         // Botón anterior
         const prevButton = $(`
             <li class="page-item ${paginaActual === 1 ? 'disabled' : ''}">
-                <a class="page-link" href="#" data-page="${paginaActual - 1}" aria-label="Previous">
+                <a class="page-link" href="#" data-page="${paginaActual - 1}" data-cursor="anterior" aria-label="Previous">
                     <span aria-hidden="true">«</span>
                     <span class="sr-only">Anterior</span>
                 </a>
@@ -223,7 +272,7 @@ $(document).ready(function() {
         // Botón siguiente
         const nextButton = $(`
             <li class="page-item ${paginaActual === numeroDePaginas ? 'disabled' : ''}">
-                <a class="page-link" href="#" data-page="${paginaActual + 1}" aria-label="Next">
+                <a class="page-link" href="#" data-page="${paginaActual + 1}" data-cursor="siguiente" aria-label="Next">
                     <span aria-hidden="true">»</span>
                     <span class="sr-only">Siguiente</span>
                 </a>
@@ -239,7 +288,8 @@ $(document).ready(function() {
 
         if (!isNaN(nuevaPagina) && nuevaPagina !== paginaActual) {
             paginaActual = nuevaPagina;
-            mostrarResultadosPaginados();
+            // Anterior/Siguiente usan el cursor del servidor; los números piden la página directamente
+            mostrarResultadosPaginados(cursores[$(this).data('cursor')]);
             // Smooth scroll to results section
             $('html, body').animate({ scrollTop: $('#resultados-section').offset().top - 100 }, 300);
         }
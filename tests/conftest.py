@@ -0,0 +1,23 @@
+import pytest
+from vtex_stub import ServidorVtex, cargar_grabados
+
+
+@pytest.fixture(scope='session')
+def grabados():
+    """Respuestas reales de la API de búsqueda de VTEX (fixtures/vtex_busqueda.json)."""
+    return cargar_grabados()
+
+
+@pytest.fixture
+def servidor_vtex(grabados):
+    """Levanta ServidorVtex con los grabados: servidor_vtex(total, estado=200, con_total=True)."""
+    servidores = []
+
+    def crear(total, **opciones):
+        servidor = ServidorVtex(grabados, total, **opciones)
+        servidores.append(servidor)
+        return servidor
+
+    yield crear
+    for servidor in servidores:
+        servidor.cerrar()
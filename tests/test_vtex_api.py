@@ -0,0 +1,55 @@
+import pytest
+import requests
+from backend.scrapping.vtex_api import buscar_en_vtex, PAGE_SIZE
+from backend.scrapping.control_busqueda import ControlBusqueda
+
+
+def test_total_conocido_pide_cada_pagina_una_vez(servidor_vtex):
+    stub = servidor_vtex(120)
+    buscar_en_vtex('metro', 'televisor', base_url=stub.url)
+    assert sorted(stub.pedidos) == [(0, 49), (50, 99), (100, 149)]
+
+
+def test_total_conocido_conserva_orden_sin_repetir(servidor_vtex):
+    stub = servidor_vtex(120)
+    productos = buscar_en_vtex('metro', 'televisor', base_url=stub.url)
+    links = [p['link'] for p in productos]
+    assert len(productos) == stub.validos()
+    assert len(set(links)) == len(links)
+    assert links[0].endswith('-0/p')
+    assert links[-1].endswith('-118/p')
+
+
+def test_link_desde_link_text(servidor_vtex, grabados):
+    stub = servidor_vtex(120)
+    productos = buscar_en_vtex('metro', 'televisor', base_url=stub.url)
+    assert f"{stub.url}/{grabados[1]['linkText']}-1/p" in [p['link'] for p in productos]
+
+
+def test_descuento_desde_precio_de_lista(servidor_vtex):
+    stub = servidor_vtex(120)
+    productos = buscar_en_vtex('metro', 'televisor', base_url=stub.url)
+    assert productos[0]['descuento'] == 26
+
+
+def test_limite_solo_pide_las_paginas_necesarias(servidor_vtex):
+    stub = servidor_vtex(120)
+    control = ControlBusqueda(limite=60)
+    productos = buscar_en_vtex('metro', 'televisor', base_url=stub.url, control=control)
+    assert len(stub.pedidos) == -(-60 // PAGE_SIZE)
+    assert len(productos) == 60
+    assert control.parcial
+
+
+def test_sin_total_pagina_hasta_la_primera_incompleta(servidor_vtex):
+    stub = servidor_vtex(70, con_total=False)
+    productos = buscar_en_vtex('metro', 'televisor', base_url=stub.url)
+    assert stub.pedidos == [(0, 49), (50, 99)]
+    assert len(productos) == stub.validos()
+
+
+def test_fallo_en_la_primera_pagina_se_propaga(servidor_vtex):
+    # motores.enviar_tienda necesita la excepción para pasar al navegador
+    stub = servidor_vtex(120, estado=403)
+    with pytest.raises(requests.HTTPError):
+        buscar_en_vtex('metro', 'televisor', base_url=stub.url)
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.scrapping.vtex_api import SEARCH_PATH  # noqa: E402
+
+# Servidor local que imita la API de búsqueda de VTEX con JSON grabado
+# (fixtures/vtex_busqueda.json): paginación con _from/_to, total en la cabecera
+# `resources` y códigos de error para simular un bloqueo. Lo usan los tests de
+# vtex_api; también se puede levantar a mano para probar la app sin red:
+#
+# python tests/vtex_stub.py    sirve en :8000 (VTEX_BASE_URL_METRO=http://127.0.0.1:8000)
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'vtex_busqueda.json')
+
+
+def cargar_grabados(ruta=FIXTURE):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+class ServidorVtex:
+    """
+    Sirve `total` productos repitiendo los grabados (cada repetición con su
+    propio linkText y link). `estado` distinto de 200 responde ese código a
+    todo; sin `con_total` no se envía la cabecera `resources`. `pedidos`
+    guarda los rangos (_from, _to) recibidos.
+    """
+
+    def __init__(self, grabados, total, estado=200, con_total=True, puerto=0):
+        self.grabados = grabados
+        self.total = total
+        self.estado = estado
+        self.con_total = con_total
+        self.pedidos = []
+        servidor = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                partes = urlparse(self.path)
+                if partes.path != SEARCH_PATH:
+                    self.send_error(404)
+                    return
+                if servidor.estado != 200:
+                    self.send_error(servidor.estado)
+                    return
+                parametros = parse_qs(partes.query)
+                desde = int(parametros['_from'][0])
+                hasta = int(parametros['_to'][0])
+                servidor.pedidos.append((desde, hasta))
+                cuerpo = json.dumps(servidor.pagina(desde, hasta), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                if servidor.con_total:
+                    self.send_header('resources', f'{desde}-{hasta}/{servidor.total}')
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *argumentos):
+                pass
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', puerto), _Manejador)
+        self.url = f'http://127.0.0.1:{self._servidor.server_address[1]}'
+        threading.Thread(target=self._servidor.serve_forever, name='vtex-stub', daemon=True).start()
+
+    def producto(self, indice):
+        item = json.loads(json.dumps(self.grabados[indice % len(self.grabados)]))
+        item['productId'] = f"{item['productId']}-{indice}"
+        item['linkText'] = f"{item['linkText']}-{indice}"
+        if item.get('link'):
+            item['link'] = f"{item['link'].removesuffix('/p')}-{indice}/p"
+        return item
+
+    def pagina(self, desde, hasta):
+        return [self.producto(i) for i in range(desde, min(hasta + 1, self.total))]
+
+    def validos(self):
+        """Productos servidos que tienen precio (el motor descarta los sin stock)."""
+        precios = [(g['items'][0]['sellers'][0]['commertialOffer'].get('Price') or 0) for g in self.grabados]
+        return sum(1 for i in range(self.total) if precios[i % len(precios)] > 0)
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+if __name__ == '__main__':
+    stub = ServidorVtex(cargar_grabados(), total=int(os.environ.get('VTEX_STUB_TOTAL', 120)), puerto=8000)
+    print(f"API VTEX grabada en {stub.url}{SEARCH_PATH}")
+    threading.Event().wait()